@@ -2,6 +2,10 @@ import streamlit as st
 from datetime import datetime, timedelta
 import pandas as pd
 from database import DatabaseManager
+import importacion
+import conciliacion
+import exportacion
+import duplicados
 import plotly.express as px
 import plotly.graph_objects as go
 
@@ -48,12 +52,45 @@ if not st.session_state.authenticated:
 # ============================================================================
 
 # Inicializar base de datos (cached para evitar múltiples conexiones)
+# Las migraciones pendientes se aplican una vez por proceso al crear la instancia
 @st.cache_resource
 def get_database():
     """Obtener instancia singleton de DatabaseManager"""
-    return DatabaseManager(skip_init=True)
+    return DatabaseManager()
 
 db = get_database()
+db.iniciar_rerun()
+
+# Paginación por llave: cada lista guarda en session_state la llave con la que empieza
+# cada página visitada, así "Anterior" no recalcula nada y "Siguiente" usa la llave nueva
+TAMANOS_PAGINA = [25, 50, 100, 200]
+
+
+def estado_paginacion(clave: str, filtros: tuple) -> dict:
+    """Estado de paginación de una lista; vuelve a la primera página si cambian los filtros"""
+    estado = st.session_state.get(clave)
+    if estado is None or estado['filtros'] != filtros:
+        estado = {'filtros': filtros, 'llaves': [None]}
+        st.session_state[clave] = estado
+    return estado
+
+
+def controles_paginacion(clave: str, estado: dict, siguiente, total: int, tamano: int):
+    """Botones Anterior / Siguiente y el número de página"""
+    pagina = len(estado['llaves'])
+    paginas = max(1, -(-total // tamano))
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        if pagina > 1 and st.button("◀ Anterior", key=f"{clave}_anterior"):
+            estado['llaves'].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Página {pagina} de {paginas} · {total:,} registros")
+    with col3:
+        if siguiente is not None and st.button("Siguiente ▶", key=f"{clave}_siguiente"):
+            estado['llaves'].append(siguiente)
+            st.rerun()
+
 
 # CSS personalizado
 st.markdown("""
@@ -100,12 +137,13 @@ if st.sidebar.button("🚪 Cerrar Sesión"):
 if menu == "🏠 Dashboard":
     st.markdown('<p class="main-header">Dashboard - Resumen General</p>', unsafe_allow_html=True)
     
-    # Obtener datos para métricas
-    total_alumnos = db.get_total_alumnos()
-    alumnos_activos = db.get_alumnos_activos()
-    total_diplomados = db.get_total_diplomados()
-    ingresos_mes = db.get_ingresos_mes_actual()
-    gastos_mes = db.get_gastos_mes_actual()
+    # Obtener datos para métricas (una sola consulta, cacheada 30 segundos)
+    snapshot = db.get_dashboard_snapshot()
+    total_alumnos = snapshot['total_alumnos']
+    alumnos_activos = snapshot['alumnos_activos']
+    total_diplomados = snapshot['total_diplomados']
+    ingresos_mes = snapshot['ingresos_mes']
+    gastos_mes = snapshot['gastos_mes']
     
     # Métricas principales
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -138,8 +176,10 @@ if menu == "🏠 Dashboard":
             st.info("No hay datos de alumnos por diplomado")
     
     with col2:
-        st.subheader("💵 Ingresos vs Gastos (6 meses)")
-        ingresos_gastos = db.get_ingresos_gastos_6_meses()
+        num_meses = st.selectbox("Periodo", [6, 12, 24], format_func=lambda n: f"{n} meses",
+                                 key="dashboard_meses")
+        st.subheader(f"💵 Ingresos vs Gastos ({num_meses} meses)")
+        ingresos_gastos = db.get_ingresos_gastos_meses(num_meses)
         if ingresos_gastos:
             df = pd.DataFrame(ingresos_gastos, columns=['Mes', 'Ingresos', 'Gastos'])
             fig = go.Figure()
@@ -302,12 +342,13 @@ elif menu == "📚 Diplomados":
 elif menu == "👥 Alumnos":
     st.markdown('<p class="main-header">Gestión de Alumnos</p>', unsafe_allow_html=True)
     
-    tab1, tab2 = st.tabs(["📋 Lista de Alumnos", "➕ Agregar Alumno"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📋 Lista de Alumnos", "➕ Agregar Alumno", "📥 Importar Alumnos",
+                                      "🔎 Posibles Duplicados"])
     
     with tab1:
         st.subheader("Buscar Alumnos")
         
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns([3, 3, 3, 1])
         with col1:
             filtro_nombre = st.text_input("🔍 Buscar por nombre")
         with col2:
@@ -316,125 +357,155 @@ elif menu == "👥 Alumnos":
             diplomados = db.get_all_diplomados()
             opciones_dip = ["Todos"] + [f"{d[1]} ({d[2]})" for d in diplomados]
             filtro_diplomado = st.selectbox("Filtrar por diplomado", opciones_dip)
+        with col4:
+            tamano = st.selectbox("Por página", TAMANOS_PAGINA, index=1, key="alumnos_por_pagina")
         
-        # Obtener alumnos
-        alumnos = db.get_alumnos_filtrados(filtro_nombre, filtro_matricula, 
-                                          None if filtro_diplomado == "Todos" else filtro_diplomado)
+        # Sólo se consulta la página visible y el conteo; el detalle, del alumno que se abre
+        filtro_dip = None if filtro_diplomado == "Todos" else filtro_diplomado
+        busqueda = f"{filtro_nombre} {filtro_matricula}".strip()
+        estado = estado_paginacion('pagina_alumnos', (busqueda, filtro_dip, tamano))
+        if busqueda:
+            # Resultados por relevancia del índice en memoria; la llave de página es la posición
+            ids = db.buscar_alumnos(busqueda, filtro_dip)
+            inicio = estado['llaves'][-1] or 0
+            total_alumnos = len(ids)
+            alumnos = db.get_alumnos_por_ids(ids[inicio:inicio + tamano])
+            siguiente = inicio + tamano if inicio + tamano < total_alumnos else None
+        else:
+            total_alumnos = db.contar_alumnos(diplomado=filtro_dip)
+            alumnos, siguiente = db.get_alumnos_pagina(diplomado=filtro_dip,
+                                                       despues=estado['llaves'][-1], limite=tamano)
         
         if alumnos:
-            st.write(f"**Total de registros encontrados:** {len(alumnos)}")
+            st.write(f"**Total de registros encontrados:** {total_alumnos:,}")
+            st.caption("Selecciona un alumno para ver su detalle y sus pagos")
             
-            for alumno in alumnos:
-                with st.expander(f"👤 {alumno[2]} - {alumno[1]} ({alumno[5]})"):
-                    col1, col2, col3 = st.columns([2, 2, 1])
-                    
-                    with col1:
-                        st.write(f"**Matrícula:** {alumno[1]}")
-                        st.write(f"**Nombre:** {alumno[2]}")
-                        st.write(f"**Teléfono:** {alumno[6]}")
-                        st.write(f"**Correo:** {alumno[7]}")
+            # La selección es por posición: se reinicia al cambiar de página o de filtros
+            clave_tabla = f"directorio_alumnos_{len(estado['llaves'])}_{hash(estado['filtros'])}"
+            df_alumnos = pd.DataFrame(alumnos, columns=['ID', 'Matrícula', 'Nombre', 'Status',
+                                                        'Diplomado', 'Teléfono', 'Correo'])
+            seleccion = st.dataframe(df_alumnos.drop(columns=['ID']), use_container_width=True,
+                                     hide_index=True, key=clave_tabla,
+                                     on_select="rerun", selection_mode="single-row")
+            controles_paginacion('pagina_alumnos', estado, siguiente, total_alumnos, tamano)
+            
+            filas_sel = seleccion.selection.rows
+            alumno = db.get_alumno_por_id(alumnos[filas_sel[0]][0]) if filas_sel else None
+            
+            if alumno:
+                st.markdown("---")
+                st.subheader(f"👤 {alumno[2]} - {alumno[1]} ({alumno[5]})")
+                col1, col2, col3 = st.columns([2, 2, 1])
+                
+                with col1:
+                    st.write(f"**Matrícula:** {alumno[1]}")
+                    st.write(f"**Nombre:** {alumno[2]}")
+                    st.write(f"**Teléfono:** {alumno[6]}")
+                    st.write(f"**Correo:** {alumno[7]}")
+                
+                with col2:
+                    st.write(f"**Status:** {alumno[3]}")
+                    st.write(f"**Diplomado:** {alumno[5]}")
+                    st.write(f"**Inscripción:** {alumno[8]}")
+                    st.write(f"**Pago Inscripción:** ${alumno[9]:,.2f}")
+                    st.write(f"**Mensualidad:** ${alumno[10]:,.2f}")
                     
-                    with col2:
-                        st.write(f"**Status:** {alumno[3]}")
-                        st.write(f"**Diplomado:** {alumno[5]}")
-                        st.write(f"**Inscripción:** {alumno[8]}")
-                        st.write(f"**Pago Inscripción:** ${alumno[9]:,.2f}")
-                        st.write(f"**Mensualidad:** ${alumno[10]:,.2f}")
+                    # Mostrar información de baja si aplica
+                    if alumno[3] == "Baja" and len(alumno) > 14:
+                        if alumno[14]:  # fecha_baja
+                            st.write(f"**Fecha de Baja:** {alumno[14]}")
+                        if len(alumno) > 15 and alumno[15]:  # motivo_baja
+                            st.write(f"**Motivo:** {alumno[15]}")
+                
+                with col3:
+                    if st.button("✏️ Editar", key=f"edit_al_{alumno[0]}"):
+                        st.session_state.editing_alumno = alumno[0]
+                    if st.button("🗑️ Eliminar", key=f"del_al_{alumno[0]}"):
+                        if db.delete_alumno(alumno[0]):
+                            # Quitar la selección para no abrir al alumno que ocupe su lugar
+                            st.session_state.pop(clave_tabla, None)
+                            st.success("Alumno eliminado")
+                            st.rerun()
+                
+                # Ver pagos (sólo los del alumno abierto)
+                pagos = db.get_pagos_alumno(alumno[0])
+                if pagos:
+                    st.markdown("**Historial de Pagos:**")
+                    df_pagos = pd.DataFrame(pagos, 
+                                          columns=['Mensualidad', 'Monto', 'Fecha', 'Método'])
+                    st.dataframe(df_pagos, use_container_width=True)
+                
+                # Modo edición
+                if st.session_state.get('editing_alumno') == alumno[0]:
+                    st.markdown("---")
+                    with st.form(f"edit_alumno_{alumno[0]}"):
+                        st.subheader("Editar Alumno")
                         
-                        # Mostrar información de baja si aplica
-                        if alumno[3] == "Baja" and len(alumno) > 14:
-                            if alumno[14]:  # fecha_baja
-                                st.write(f"**Fecha de Baja:** {alumno[14]}")
-                            if len(alumno) > 15 and alumno[15]:  # motivo_baja
-                                st.write(f"**Motivo:** {alumno[15]}")
-                    
-                    with col3:
-                        if st.button("✏️ Editar", key=f"edit_al_{alumno[0]}"):
-                            st.session_state.editing_alumno = alumno[0]
-                        if st.button("🗑️ Eliminar", key=f"del_al_{alumno[0]}"):
-                            if db.delete_alumno(alumno[0]):
-                                st.success("Alumno eliminado")
-                                st.rerun()
-                    
-                    # Ver pagos
-                    pagos = db.get_pagos_alumno(alumno[0])
-                    if pagos:
-                        st.markdown("**Historial de Pagos:**")
-                        df_pagos = pd.DataFrame(pagos, 
-                                              columns=['Mensualidad', 'Monto', 'Fecha', 'Método'])
-                        st.dataframe(df_pagos, use_container_width=True)
-                    
-                    # Modo edición
-                    if st.session_state.get('editing_alumno') == alumno[0]:
-                        st.markdown("---")
-                        with st.form(f"edit_alumno_{alumno[0]}"):
-                            st.subheader("Editar Alumno")
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            matricula = st.text_input("Matrícula", value=alumno[1])
+                            nombre = st.text_input("Nombre Completo", value=alumno[2])
+                            telefono = st.text_input("Teléfono", value=alumno[6], max_chars=10)
+                            correo = st.text_input("Correo", value=alumno[7])
+                        
+                        with col2:
+                            status = st.selectbox("Status", 
+                                ["Activo", "Baja", "Baja temporal", "Prospecto"],
+                                index=["Activo", "Baja", "Baja temporal", "Prospecto"].index(alumno[3]))
                             
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                matricula = st.text_input("Matrícula", value=alumno[1])
-                                nombre = st.text_input("Nombre Completo", value=alumno[2])
-                                telefono = st.text_input("Teléfono", value=alumno[6], max_chars=10)
-                                correo = st.text_input("Correo", value=alumno[7])
+                            # Si el status es Baja, mostrar campos adicionales
+                            fecha_baja = None
+                            motivo_baja = None
+                            if status == "Baja":
+                                st.markdown("**Información de Baja:**")
+                                fecha_baja_val = alumno[14] if len(alumno) > 14 and alumno[14] else datetime.now().strftime('%Y-%m-%d')
+                                fecha_baja = st.date_input("Fecha de Baja", 
+                                    value=datetime.strptime(fecha_baja_val, '%Y-%m-%d') if fecha_baja_val else datetime.now())
+                                motivo_baja = st.text_area("Motivo de Baja", 
+                                    value=alumno[15] if len(alumno) > 15 and alumno[15] else "")
                             
-                            with col2:
-                                status = st.selectbox("Status", 
-                                    ["Activo", "Baja", "Baja temporal", "Prospecto"],
-                                    index=["Activo", "Baja", "Baja temporal", "Prospecto"].index(alumno[3]))
-                                
-                                # Si el status es Baja, mostrar campos adicionales
-                                fecha_baja = None
-                                motivo_baja = None
-                                if status == "Baja":
-                                    st.markdown("**Información de Baja:**")
-                                    fecha_baja_val = alumno[14] if len(alumno) > 14 and alumno[14] else datetime.now().strftime('%Y-%m-%d')
-                                    fecha_baja = st.date_input("Fecha de Baja", 
-                                        value=datetime.strptime(fecha_baja_val, '%Y-%m-%d') if fecha_baja_val else datetime.now())
-                                    motivo_baja = st.text_area("Motivo de Baja", 
-                                        value=alumno[15] if len(alumno) > 15 and alumno[15] else "")
-                                
-                                dips = db.get_all_diplomados()
-                                dip_options = [f"{d[2]}" for d in dips]
-                                diplomado = st.selectbox("Diplomado Activo", dip_options,
-                                    index=dip_options.index(alumno[5]) if alumno[5] in dip_options else 0)
-                                
-                                # Convertir fecha a objeto date si es string
-                                fecha_insc_val = alumno[8]
-                                if isinstance(fecha_insc_val, str):
-                                    fecha_insc_val = datetime.strptime(fecha_insc_val, '%Y-%m-%d').date()
-                                
-                                fecha_insc = st.date_input("Fecha Inscripción", value=fecha_insc_val)
-                                pago_insc = st.number_input("Pago Inscripción", value=float(alumno[9]), min_value=0.0)
-                                mensualidad = st.number_input("Mensualidad", value=float(alumno[10]), min_value=0.0)
+                            dips = db.get_all_diplomados()
+                            dip_options = [f"{d[2]}" for d in dips]
+                            diplomado = st.selectbox("Diplomado Activo", dip_options,
+                                index=dip_options.index(alumno[5]) if alumno[5] in dip_options else 0)
                             
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                if st.form_submit_button("💾 Guardar"):
-                                    # Validaciones
-                                    if len(telefono) != 10:
-                                        st.error("Teléfono debe tener 10 dígitos")
-                                    elif '@' not in correo:
-                                        st.error("Correo debe contener @")
-                                    elif len(matricula) != 10:
-                                        st.error("Matrícula debe tener 10 dígitos")
-                                    elif status == "Baja" and not motivo_baja:
-                                        st.error("Debes especificar el motivo de baja")
-                                    else:
-                                        fecha_baja_str = fecha_baja.strftime('%Y-%m-%d') if fecha_baja and status == "Baja" else None
-                                        motivo_baja_str = motivo_baja if status == "Baja" else None
-                                        
-                                        db.update_alumno(alumno[0], matricula, nombre, status, 
-                                                       diplomado, telefono, correo,
-                                                       fecha_insc.strftime('%Y-%m-%d'),
-                                                       pago_insc, mensualidad,
-                                                       fecha_baja_str, motivo_baja_str)
-                                        del st.session_state.editing_alumno
-                                        st.success("Alumno actualizado")
-                                        st.rerun()
-                            with col2:
-                                if st.form_submit_button("❌ Cancelar"):
+                            # Convertir fecha a objeto date si es string
+                            fecha_insc_val = alumno[8]
+                            if isinstance(fecha_insc_val, str):
+                                fecha_insc_val = datetime.strptime(fecha_insc_val, '%Y-%m-%d').date()
+                            
+                            fecha_insc = st.date_input("Fecha Inscripción", value=fecha_insc_val)
+                            pago_insc = st.number_input("Pago Inscripción", value=float(alumno[9]), min_value=0.0)
+                            mensualidad = st.number_input("Mensualidad", value=float(alumno[10]), min_value=0.0)
+                        
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            if st.form_submit_button("💾 Guardar"):
+                                # Validaciones
+                                if len(telefono) != 10:
+                                    st.error("Teléfono debe tener 10 dígitos")
+                                elif '@' not in correo:
+                                    st.error("Correo debe contener @")
+                                elif len(matricula) != 10:
+                                    st.error("Matrícula debe tener 10 dígitos")
+                                elif status == "Baja" and not motivo_baja:
+                                    st.error("Debes especificar el motivo de baja")
+                                else:
+                                    fecha_baja_str = fecha_baja.strftime('%Y-%m-%d') if fecha_baja and status == "Baja" else None
+                                    motivo_baja_str = motivo_baja if status == "Baja" else None
+                                    
+                                    db.update_alumno(alumno[0], matricula, nombre, status, 
+                                                   diplomado, telefono, correo,
+                                                   fecha_insc.strftime('%Y-%m-%d'),
+                                                   pago_insc, mensualidad,
+                                                   fecha_baja_str, motivo_baja_str)
                                     del st.session_state.editing_alumno
+                                    st.success("Alumno actualizado")
                                     st.rerun()
+                        with col2:
+                            if st.form_submit_button("❌ Cancelar"):
+                                del st.session_state.editing_alumno
+                                st.rerun()
         else:
             st.info("No se encontraron alumnos")
     
@@ -500,17 +571,105 @@ elif menu == "👥 Alumnos":
                     num_mensualidades = dip_seleccionado[6]
                     total = pago_inscripcion + (mensualidad * num_mensualidades)
                     
-                    if db.add_alumno(matricula, nombre_completo, status, diplomado_activo, 
-                                   telefono, correo, fecha_inscripcion.strftime('%Y-%m-%d'),
-                                   pago_inscripcion, mensualidad, num_mensualidades, total):
+                    datos_alumno = (matricula, nombre_completo, status, diplomado_activo,
+                                    telefono, correo, fecha_inscripcion.strftime('%Y-%m-%d'),
+                                    pago_inscripcion, mensualidad, num_mensualidades, total)
+                    try:
+                        registrado = db.add_alumno(*datos_alumno)
+                    except duplicados.AlumnoDuplicadoError as e:
+                        # Se confirma fuera del formulario (ahí no caben botones normales)
+                        st.session_state.alumno_pendiente = {'datos': datos_alumno, 'candidatos': e.candidatos}
+                        registrado = None
+                    
+                    if registrado:
                         st.success("✅ Alumno registrado exitosamente")
-                        # Actualizar contador de alumnos en diplomado
-                        db.update_alumnos_inscritos(dip_seleccionado[0])
                         # Incrementar contador para limpiar el formulario
                         st.session_state.form_alumno_key += 1
                         st.rerun()
+                    elif registrado is False:
+                        st.error("Error al registrar alumno")
+        
+        # Posible duplicado: mostrar los alumnos parecidos y pedir confirmación
+        pendiente = st.session_state.get('alumno_pendiente')
+        if pendiente:
+            st.warning(f"⚠️ **{pendiente['datos'][1]}** se parece a alumnos ya registrados. "
+                       "Revisa que no sea la misma persona antes de registrarlo.")
+            df_candidatos = pd.DataFrame(pendiente['candidatos'])[
+                ['matricula', 'nombre', 'diplomado', 'status', 'puntaje', 'motivos']]
+            df_candidatos.columns = ['Matrícula', 'Nombre', 'Diplomado', 'Status', 'Parecido', 'Motivos']
+            st.dataframe(df_candidatos, use_container_width=True, hide_index=True)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("✅ Registrar de todos modos"):
+                    if db.add_alumno(*pendiente['datos'], permitir_duplicado=True):
+                        del st.session_state.alumno_pendiente
+                        st.session_state.form_alumno_key += 1
+                        st.success("✅ Alumno registrado exitosamente")
+                        st.rerun()
                     else:
                         st.error("Error al registrar alumno")
+            with col2:
+                if st.button("❌ Cancelar registro"):
+                    del st.session_state.alumno_pendiente
+                    st.rerun()
+    
+    with tab3:
+        st.subheader("Importar Alumnos desde Archivo")
+        st.write("Sube un CSV o Excel con una fila por alumno. Se validan todas las filas antes de guardar; "
+                 "las válidas se registran juntas y las demás aparecen en el reporte de errores.")
+        st.download_button("📄 Descargar plantilla CSV", importacion.plantilla_csv(),
+                           "plantilla_alumnos.csv", "text/csv")
+        
+        archivo = st.file_uploader("Archivo de alumnos", type=["csv", "xlsx"], key="importar_alumnos")
+        
+        if archivo is not None:
+            try:
+                df_archivo = importacion.leer_archivo(archivo)
+                st.info(f"{len(df_archivo):,} filas en el archivo")
+                st.dataframe(df_archivo.head(20), use_container_width=True)
+                
+                if st.button("📥 Importar Alumnos"):
+                    inicio = datetime.now()
+                    insertados, errores = importacion.importar_alumnos(db, df_archivo)
+                    segundos = (datetime.now() - inicio).total_seconds()
+                    
+                    if insertados:
+                        st.success(f"✅ {insertados:,} alumnos registrados en {segundos:.1f} s")
+                    elif len(errores) < len(df_archivo):
+                        st.error("Error al registrar los alumnos; no se guardó ninguno")
+                    
+                    if len(errores):
+                        st.warning(f"⚠️ {len(errores):,} filas con errores (no se registraron)")
+                        st.dataframe(errores, use_container_width=True)
+                        st.download_button("📥 Descargar reporte de errores",
+                                           errores.to_csv(index=False).encode('utf-8'),
+                                           "errores_importacion.csv", "text/csv")
+            except (ValueError, ImportError) as e:
+                st.error(str(e))
+    
+    with tab4:
+        st.subheader("Posibles Alumnos Duplicados")
+        st.write("Busca a la misma persona inscrita dos veces (otra matrícula o el nombre con errores). "
+                 "Sólo se comparan alumnos que comparten correo, teléfono o palabras del nombre que suenan igual.")
+        
+        umbral = st.slider("Parecido mínimo", 0.5, 1.0, duplicados.UMBRAL_DUPLICADO, 0.05)
+        if st.button("🔎 Buscar duplicados"):
+            st.session_state.buscar_duplicados = True
+        
+        if st.session_state.get('buscar_duplicados'):
+            pares = db.get_alumnos_duplicados(umbral)
+            if pares:
+                st.warning(f"⚠️ {len(pares):,} pares de alumnos que podrían ser la misma persona")
+                df_pares = pd.DataFrame(pares)[['puntaje', 'matricula_a', 'nombre_a', 'diplomado_a',
+                                                'matricula_b', 'nombre_b', 'diplomado_b', 'motivos']]
+                df_pares.columns = ['Parecido', 'Matrícula', 'Nombre', 'Diplomado',
+                                    'Matrícula (2)', 'Nombre (2)', 'Diplomado (2)', 'Motivos']
+                st.dataframe(df_pares, use_container_width=True, hide_index=True)
+                st.download_button("📥 Descargar CSV", df_pares.to_csv(index=False).encode('utf-8'),
+                                   "posibles_duplicados.csv", "text/csv")
+            else:
+                st.success("✅ No se encontraron posibles duplicados")
 
 # ============================================================================
 # 💰 REGISTRO DE PAGOS
@@ -518,7 +677,7 @@ elif menu == "👥 Alumnos":
 elif menu == "💰 Pagos":
     st.markdown('<p class="main-header">Registro de Pagos</p>', unsafe_allow_html=True)
     
-    tab1, tab2 = st.tabs(["➕ Registrar Pago", "📋 Historial de Pagos"])
+    tab1, tab2, tab3 = st.tabs(["➕ Registrar Pago", "📋 Historial de Pagos", "🏦 Conciliación Bancaria"])
     
     with tab1:
         st.subheader("Registrar Nuevo Pago")
@@ -534,65 +693,90 @@ elif menu == "💰 Pagos":
             # Extraer clave del diplomado
             clave_dip = diplomado_sel.split('(')[1].strip(')')
             
-            # Obtener alumnos del diplomado
-            alumnos = db.get_alumnos_por_diplomado_clave(clave_dip)
+            # Número de mensualidad
+            mensualidad_num = st.number_input("Número de Mensualidad", min_value=1, value=1)
+            
+            # Alumnos del diplomado con su pago de la mensualidad (una sola consulta)
+            alumnos = db.get_alumnos_con_pago_mensualidad(clave_dip, mensualidad_num)
             
             if not alumnos:
                 st.info("No hay alumnos en este diplomado")
             else:
-                # Número de mensualidad
-                mensualidad_num = st.number_input("Número de Mensualidad", min_value=1, value=1)
-                
                 st.markdown("---")
                 st.subheader(f"Registrar pagos - Mensualidad #{mensualidad_num}")
                 
-                # Formulario para cada alumno
-                for alumno in alumnos:
-                    alumno_id, matricula, nombre, mensualidad_monto = alumno[0], alumno[1], alumno[2], alumno[3]
+                metodos_pago = ["Transferencia", "Efectivo", "Depósito", "Enlace", "Beca"]
+                pendientes = [a for a in alumnos if a[4] is None]
+                pagados = [a for a in alumnos if a[4] is not None]
+                
+                if 'pagos_registrados' in st.session_state:
+                    st.success(f"✅ {st.session_state.pop('pagos_registrados')} pagos registrados")
+                
+                if not pendientes:
+                    st.success(f"✅ Todos los alumnos tienen registrada la mensualidad #{mensualidad_num}")
+                else:
+                    # Valores iniciales de la tabla (cada fila se puede ajustar antes de guardar)
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        fecha_default = st.date_input("Fecha de pago", key="pagos_fecha_default")
+                    with col2:
+                        metodo_default = st.selectbox("Método de pago", metodos_pago, key="pagos_metodo_default")
+                    with col3:
+                        marcar_todos = st.checkbox("Marcar todos como pagados", key="pagos_marcar_todos")
                     
-                    # Verificar si ya pagó esta mensualidad
-                    ya_pago = db.verificar_pago_mensualidad(alumno_id, mensualidad_num)
+                    df_pendientes = pd.DataFrame({
+                        'Pagar': [marcar_todos] * len(pendientes),
+                        'Matrícula': [a[1] for a in pendientes],
+                        'Nombre': [a[2] for a in pendientes],
+                        'Monto': [float(a[3]) for a in pendientes],
+                        'Fecha': [fecha_default] * len(pendientes),
+                        'Método': [metodo_default] * len(pendientes),
+                    })
                     
-                    with st.expander(f"{'✅' if ya_pago else '⏳'} {nombre} - {matricula}"):
-                        if ya_pago:
-                            st.success(f"✅ Mensualidad #{mensualidad_num} ya registrada")
-                            # Mostrar detalles del pago
-                            pago_info = db.get_detalle_pago(alumno_id, mensualidad_num)
-                            if pago_info:
-                                st.write(f"**Monto:** ${pago_info[0]:,.2f}")
-                                st.write(f"**Fecha:** {pago_info[1]}")
-                                st.write(f"**Método:** {pago_info[2]}")
-                        else:
-                            with st.form(f"pago_{alumno_id}_{mensualidad_num}"):
-                                col1, col2, col3 = st.columns(3)
-                                
-                                with col1:
-                                    st.write(f"**Mensualidad:** ${mensualidad_monto:,.2f}")
-                                    monto = st.number_input("Monto pagado", 
-                                                           value=float(mensualidad_monto), 
-                                                           min_value=0.0, key=f"monto_{alumno_id}")
-                                
-                                with col2:
-                                    fecha_pago = st.date_input("Fecha de pago", 
-                                                              key=f"fecha_{alumno_id}")
-                                
-                                with col3:
-                                    metodo = st.selectbox("Método de pago",
-                                                         ["Transferencia", "Efectivo", "Depósito", "Enlace", "Beca"],
-                                                         key=f"metodo_{alumno_id}")
-                                
-                                if st.form_submit_button("💾 Registrar Pago"):
-                                    if db.add_pago(alumno_id, mensualidad_num, monto, 
-                                                  fecha_pago.strftime('%Y-%m-%d'), metodo):
-                                        st.success(f"✅ Pago registrado para {nombre}")
-                                        st.rerun()
-                                    else:
-                                        st.error("Error al registrar pago")
+                    # Dentro de un formulario: editar la tabla no recarga la página hasta guardar
+                    with st.form(f"pagos_{clave_dip}_{mensualidad_num}"):
+                        editado = st.data_editor(
+                            df_pendientes,
+                            column_config={
+                                'Pagar': st.column_config.CheckboxColumn("Pagar"),
+                                'Monto': st.column_config.NumberColumn("Monto", min_value=0.0, format="$%.2f"),
+                                'Fecha': st.column_config.DateColumn("Fecha", format="YYYY-MM-DD"),
+                                'Método': st.column_config.SelectboxColumn("Método", options=metodos_pago),
+                            },
+                            disabled=['Matrícula', 'Nombre'],
+                            hide_index=True,
+                            use_container_width=True,
+                            key=f"grid_pagos_{clave_dip}_{mensualidad_num}_{fecha_default}_{metodo_default}_{marcar_todos}",
+                        )
+                        
+                        if st.form_submit_button("💾 Registrar Pagos Marcados"):
+                            marcados = editado[editado['Pagar']]
+                            lote = [
+                                (pendientes[i][0], mensualidad_num, float(fila['Monto']),
+                                 pd.Timestamp(fila['Fecha'] if pd.notna(fila['Fecha']) else fecha_default).strftime('%Y-%m-%d'),
+                                 fila['Método'] or metodo_default)
+                                for i, fila in marcados.iterrows()
+                            ]
+                            if not lote:
+                                st.warning("Marca al menos un alumno")
+                            else:
+                                registrados = db.add_pagos_bulk(lote)
+                                if registrados is None:
+                                    st.error("Error al registrar pagos; no se guardó ninguno")
+                                else:
+                                    st.session_state.pagos_registrados = registrados
+                                    st.rerun()
+                
+                if pagados:
+                    with st.expander(f"✅ {len(pagados)} alumnos con la mensualidad #{mensualidad_num} registrada"):
+                        st.dataframe(pd.DataFrame([(a[1], a[2], a[4], a[5], a[6]) for a in pagados],
+                                                  columns=['Matrícula', 'Nombre', 'Monto', 'Fecha', 'Método']),
+                                     use_container_width=True, hide_index=True)
     
     with tab2:
         st.subheader("Historial de Pagos")
         
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
         with col1:
             fecha_inicio = st.date_input("Desde", value=datetime.now().replace(day=1))
         with col2:
@@ -601,22 +785,110 @@ elif menu == "💰 Pagos":
             diplomados = db.get_all_diplomados()
             opciones = ["Todos"] + [d[2] for d in diplomados]
             filtro_dip = st.selectbox("Diplomado", opciones)
+        with col4:
+            tamano = st.selectbox("Por página", TAMANOS_PAGINA, index=1, key="pagos_por_pagina")
         
+        # La búsqueda queda activa para poder cambiar de página
         if st.button("🔍 Buscar"):
-            pagos = db.get_pagos_filtrados(fecha_inicio.strftime('%Y-%m-%d'),
-                                          fecha_fin.strftime('%Y-%m-%d'),
-                                          None if filtro_dip == "Todos" else filtro_dip)
+            st.session_state.historial_pagos_activo = True
+        
+        if st.session_state.get('historial_pagos_activo'):
+            desde, hasta = fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d')
+            clave_filtro = None if filtro_dip == "Todos" else filtro_dip
+            estado = estado_paginacion('pagina_pagos', (desde, hasta, clave_filtro, tamano))
+            
+            # Totales con una consulta agregada; las filas, sólo las de la página
+            num_pagos, total = db.get_totales_pagos(desde, hasta, clave_filtro)
+            pagos, siguiente = db.get_pagos_pagina(desde, hasta, clave_filtro,
+                                                   despues=estado['llaves'][-1], limite=tamano)
             
             if pagos:
                 df = pd.DataFrame(pagos, 
                                 columns=['Matrícula', 'Nombre', 'Diplomado', 'Mensualidad', 
                                         'Monto', 'Fecha', 'Método'])
                 st.dataframe(df, use_container_width=True)
+                controles_paginacion('pagina_pagos', estado, siguiente, num_pagos, tamano)
                 
-                total = sum([p[4] for p in pagos])
-                st.success(f"**Total recaudado:** ${total:,.2f}")
+                st.success(f"**Total recaudado:** ${total:,.2f} ({num_pagos:,} pagos)")
             else:
                 st.info("No se encontraron pagos en el periodo seleccionado")
+    
+    with tab3:
+        st.subheader("Conciliar Estado de Cuenta")
+        st.write("Sube el CSV del banco (columnas de fecha, monto o abono y referencia o concepto). "
+                 "Cada abono se compara con la siguiente mensualidad pendiente de cada alumno por "
+                 "matrícula en la referencia, o por monto exacto cerca de su vencimiento.")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            ventana = st.number_input("Días de tolerancia alrededor del vencimiento", min_value=0, max_value=60,
+                                      value=conciliacion.VENTANA_DIAS)
+        with col2:
+            metodo_banco = st.selectbox("Método de pago a registrar", ["Transferencia", "Depósito", "Enlace"])
+        
+        if 'pagos_conciliados' in st.session_state:
+            st.success(f"✅ {st.session_state.pop('pagos_conciliados')} pagos registrados desde el estado de cuenta")
+        
+        archivo_banco = st.file_uploader("Estado de cuenta (CSV)", type=["csv"], key="conciliacion_csv")
+        
+        if archivo_banco is not None and st.button("🔍 Buscar Coincidencias"):
+            try:
+                archivo_banco.seek(0)
+                st.session_state.conciliacion = conciliacion.conciliar_archivo(db, archivo_banco, int(ventana))
+            except ValueError as e:
+                st.error(str(e))
+        
+        resultado = st.session_state.get('conciliacion')
+        if resultado:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Propuestas", f"{len(resultado['propuestas']):,}")
+            with col2:
+                st.metric("Ambiguas", f"{len(resultado['ambiguas']):,}")
+            with col3:
+                st.metric("Ya registradas", f"{resultado['registradas']:,}")
+            with col4:
+                st.metric("Sin coincidencia", f"{resultado['sin_coincidencia']:,}")
+            st.caption(f"{resultado['lineas']:,} líneas leídas; {resultado['ignoradas']:,} cargos o líneas ilegibles omitidos")
+            
+            if resultado['propuestas']:
+                df_propuestas = pd.DataFrame(resultado['propuestas'])
+                # Las coincidencias por matrícula se marcan de entrada; las de monto y fecha se revisan
+                df_propuestas.insert(0, 'Confirmar', df_propuestas['criterio'].str.startswith('matrícula'))
+                
+                with st.form("confirmar_conciliacion"):
+                    editado = st.data_editor(
+                        df_propuestas[['Confirmar', 'linea', 'fecha', 'monto', 'referencia', 'matricula',
+                                       'nombre', 'diplomado', 'num_mensualidad', 'esperado', 'criterio']],
+                        column_config={
+                            'Confirmar': st.column_config.CheckboxColumn("Confirmar"),
+                            'monto': st.column_config.NumberColumn("Monto", format="$%.2f"),
+                            'esperado': st.column_config.NumberColumn("Esperado", format="$%.2f"),
+                        },
+                        disabled=['linea', 'fecha', 'monto', 'referencia', 'matricula', 'nombre',
+                                  'diplomado', 'num_mensualidad', 'esperado', 'criterio'],
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+                    
+                    if st.form_submit_button("💾 Registrar Pagos Confirmados"):
+                        confirmadas = [resultado['propuestas'][i] for i in editado.index[editado['Confirmar']]]
+                        registrados = conciliacion.registrar_confirmadas(db, confirmadas, metodo_banco)
+                        if registrados is None:
+                            st.error("Error al registrar pagos; no se guardó ninguno")
+                        else:
+                            del st.session_state.conciliacion
+                            st.session_state.pagos_conciliados = registrados
+                            st.rerun()
+            
+            if resultado['ambiguas']:
+                with st.expander(f"⚠️ {len(resultado['ambiguas'])} abonos con varios alumnos posibles"):
+                    st.dataframe(pd.DataFrame(resultado['ambiguas']), use_container_width=True, hide_index=True)
+            
+            if resultado['muestra_sin_coincidencia']:
+                with st.expander(f"❓ Abonos sin coincidencia (muestra de {len(resultado['muestra_sin_coincidencia'])})"):
+                    st.dataframe(pd.DataFrame(resultado['muestra_sin_coincidencia']),
+                                 use_container_width=True, hide_index=True)
 
 # ============================================================================
 # 💸 REGISTRO DE GASTOS
@@ -657,20 +929,27 @@ elif menu == "💸 Gastos":
     with tab2:
         st.subheader("Historial de Gastos")
         
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns([2, 2, 1])
         with col1:
             fecha_inicio = st.date_input("Desde", value=datetime.now().replace(day=1), key="gasto_inicio")
         with col2:
             fecha_fin = st.date_input("Hasta", value=datetime.now(), key="gasto_fin")
+        with col3:
+            tamano = st.selectbox("Por página", TAMANOS_PAGINA, index=0, key="gastos_por_pagina")
         
+        # La búsqueda queda activa para poder cambiar de página (y para que los botones funcionen)
         if st.button("🔍 Buscar Gastos"):
-            gastos = db.get_gastos_filtrados(fecha_inicio.strftime('%Y-%m-%d'),
-                                           fecha_fin.strftime('%Y-%m-%d'))
+            st.session_state.historial_gastos_activo = True
+        
+        if st.session_state.get('historial_gastos_activo'):
+            desde, hasta = fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d')
+            estado = estado_paginacion('pagina_gastos', (desde, hasta, tamano))
+            
+            num_gastos, total = db.get_totales_gastos(desde, hasta)
+            gastos, siguiente = db.get_gastos_pagina(desde, hasta, despues=estado['llaves'][-1], limite=tamano)
             
             if gastos:
-                df = pd.DataFrame(gastos, columns=['ID', 'Fecha', 'Concepto', 'Monto'])
-                
-                # Botones de editar/eliminar
+                # Botones de editar/eliminar (sólo los de la página actual)
                 for idx, gasto in enumerate(gastos):
                     col1, col2, col3, col4, col5 = st.columns([1, 2, 2, 1, 1])
                     with col1:
@@ -688,9 +967,10 @@ elif menu == "💸 Gastos":
                                 st.success("Gasto eliminado")
                                 st.rerun()
                 
+                controles_paginacion('pagina_gastos', estado, siguiente, num_gastos, tamano)
+                
                 st.markdown("---")
-                total = sum([g[3] for g in gastos])
-                st.error(f"**Total de gastos:** ${total:,.2f}")
+                st.error(f"**Total de gastos:** ${total:,.2f} ({num_gastos:,} gastos)")
             else:
                 st.info("No se encontraron gastos en el periodo seleccionado")
 
@@ -715,29 +995,43 @@ if menu == "📊 Reportes":
             dip_sel = st.selectbox("Selecciona Diplomado", opciones)
             clave = dip_sel.split('(')[1].strip(')')
             
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns([2, 2, 1])
             with col1:
                 fecha_inicio = st.date_input("Desde", key="rep1_inicio")
             with col2:
                 fecha_fin = st.date_input("Hasta", key="rep1_fin")
+            with col3:
+                tamano = st.selectbox("Por página", TAMANOS_PAGINA, index=1, key="rep1_por_pagina")
             
+            # El reporte queda activo para poder cambiar de página
             if st.button("Generar Reporte"):
-                pagos = db.get_reporte_pagos_diplomado(clave, 
-                                                      fecha_inicio.strftime('%Y-%m-%d'),
-                                                      fecha_fin.strftime('%Y-%m-%d'))
+                st.session_state.reporte_diplomado_activo = True
+            
+            if st.session_state.get('reporte_diplomado_activo'):
+                desde, hasta = fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d')
+                estado = estado_paginacion('pagina_reporte_diplomado', (clave, desde, hasta, tamano))
+                
+                # Total con una consulta agregada; las filas, sólo las de la página
+                num_pagos, total = db.get_totales_pagos(desde, hasta, clave)
+                pagos, siguiente = db.get_reporte_pagos_diplomado_pagina(clave, desde, hasta,
+                                                                         despues=estado['llaves'][-1],
+                                                                         limite=tamano)
                 if pagos:
                     df = pd.DataFrame(pagos, 
                                     columns=['Matrícula', 'Nombre', 'Mensualidad', 'Monto', 'Fecha', 'Método'])
                     st.dataframe(df, use_container_width=True)
+                    controles_paginacion('pagina_reporte_diplomado', estado, siguiente, num_pagos, tamano)
                     
-                    total = sum([p[3] for p in pagos])
-                    st.success(f"**Total recaudado:** ${total:,.2f}")
+                    st.success(f"**Total recaudado:** ${total:,.2f} ({num_pagos:,} pagos)")
                     
-                    # Botón para descargar
-                    csv = df.to_csv(index=False).encode('utf-8')
-                    st.download_button("📥 Descargar CSV", csv, 
+                    # Botón para descargar: el CSV completo se escribe por partes a disco sólo al pulsarlo
+                    st.download_button("📥 Descargar CSV",
+                                     lambda: exportacion.archivo_temporal(
+                                         exportacion.csv_pagos_diplomado(db, clave, desde, hasta)),
                                      f"reporte_{clave}_{datetime.now().strftime('%Y%m%d')}.csv",
-                                     "text/csv")
+                                     "text/csv", on_click="ignore")
+                    st.caption("La descarga ocupa en el servidor la memoria del CSV completo; para reportes "
+                               f"muy grandes usa `python exportacion.py diplomado {clave} {desde} {hasta}`.")
                 else:
                     st.info("No hay pagos en el periodo seleccionado")
     
@@ -761,7 +1055,8 @@ if menu == "📊 Reportes":
                     df = pd.DataFrame(pagos, columns=['Mensualidad', 'Monto', 'Fecha', 'Método'])
                     st.dataframe(df, use_container_width=True)
                     
-                    total_pagado = sum([p[1] for p in pagos])
+                    # total_pagado se mantiene al registrar cada pago
+                    total_pagado = db.get_saldo_alumno(alumno_info[0])['total_pagado']
                     total_esperado = alumno_info[9] + (alumno_info[10] * alumno_info[11])
                     adeudo = total_esperado - total_pagado
                     
@@ -781,30 +1076,36 @@ if menu == "📊 Reportes":
     elif tipo_reporte == "Pagos por Periodo":
         st.subheader("📅 Reporte de Pagos por Periodo")
         
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns([2, 2, 1])
         with col1:
             fecha_inicio = st.date_input("Desde", key="rep3_inicio")
         with col2:
             fecha_fin = st.date_input("Hasta", key="rep3_fin")
+        with col3:
+            tamano = st.selectbox("Por página", TAMANOS_PAGINA, index=1, key="rep3_por_pagina")
         
+        # El reporte queda activo para poder cambiar de página
         if st.button("Generar Reporte", key="btn_rep3"):
-            pagos = db.get_pagos_filtrados(fecha_inicio.strftime('%Y-%m-%d'),
-                                          fecha_fin.strftime('%Y-%m-%d'), None)
+            st.session_state.reporte_periodo_activo = True
+        
+        if st.session_state.get('reporte_periodo_activo'):
+            desde, hasta = fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d')
+            estado = estado_paginacion('pagina_reporte_periodo', (desde, hasta, tamano))
+            
+            # Totales con consultas agregadas; las filas, sólo las de la página
+            num_pagos, total_general = db.get_totales_pagos(desde, hasta)
+            pagos, siguiente = db.get_pagos_pagina(desde, hasta, despues=estado['llaves'][-1], limite=tamano)
             
             if pagos:
                 df = pd.DataFrame(pagos, 
                                 columns=['Matrícula', 'Nombre', 'Diplomado', 'Mensualidad', 
                                         'Monto', 'Fecha', 'Método'])
                 st.dataframe(df, use_container_width=True)
+                controles_paginacion('pagina_reporte_periodo', estado, siguiente, num_pagos, tamano)
                 
-                # Resumen por método de pago
+                # Resumen por método de pago (meses completos desde resumen_mensual)
                 st.subheader("Resumen por Método de Pago")
-                metodos = {}
-                for p in pagos:
-                    metodo = p[6]
-                    if metodo not in metodos:
-                        metodos[metodo] = 0
-                    metodos[metodo] += p[4]
+                metodos = db.get_resumen_financiero(desde, hasta)['por_metodo']
                 
                 col1, col2, col3, col4 = st.columns(4)
                 cols = [col1, col2, col3, col4]
@@ -812,14 +1113,15 @@ if menu == "📊 Reportes":
                     with cols[idx % 4]:
                         st.metric(metodo, f"${total:,.2f}")
                 
-                total_general = sum([p[4] for p in pagos])
-                st.success(f"**Total del periodo:** ${total_general:,.2f}")
+                st.success(f"**Total del periodo:** ${total_general:,.2f} ({num_pagos:,} pagos)")
                 
-                # Descargar
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button("📥 Descargar CSV", csv, 
+                # Descargar: el CSV completo se escribe por partes a disco sólo al pulsar el botón
+                st.download_button("📥 Descargar CSV",
+                                 lambda: exportacion.archivo_temporal(exportacion.csv_pagos_periodo(db, desde, hasta)),
                                  f"reporte_periodo_{datetime.now().strftime('%Y%m%d')}.csv",
-                                 "text/csv")
+                                 "text/csv", on_click="ignore")
+                st.caption("La descarga ocupa en el servidor la memoria del CSV completo; para reportes "
+                           f"muy grandes usa `python exportacion.py periodo {desde} {hasta}`.")
             else:
                 st.info("No hay pagos en el periodo seleccionado")
     
@@ -885,7 +1187,7 @@ if menu == "📊 Reportes":
                 st.markdown("### Resumen Financiero")
                 
                 total_esperado = pago_inscripcion + (monto_mensualidad * num_mensualidades)
-                total_pagado = pago_inscripcion + sum([p[1] for p in pagos]) if pagos else pago_inscripcion
+                total_pagado = pago_inscripcion + db.get_saldo_alumno(alumno[0])['total_pagado']
                 adeudo = total_esperado - total_pagado
                 
                 col1, col2, col3, col4 = st.columns(4)
@@ -912,16 +1214,17 @@ if menu == "📊 Reportes":
         with col2:
             fecha_fin = st.date_input("Hasta", key="resumen_fin")
         
+        # El resumen queda activo para poder cambiar de página en el detalle de gastos
         if st.button("Generar Resumen"):
-            # Ingresos
-            pagos = db.get_pagos_filtrados(fecha_inicio.strftime('%Y-%m-%d'),
-                                          fecha_fin.strftime('%Y-%m-%d'), None)
-            total_ingresos = sum([p[4] for p in pagos]) if pagos else 0
+            st.session_state.resumen_financiero_activo = True
+        
+        if st.session_state.get('resumen_financiero_activo'):
+            desde, hasta = fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d')
             
-            # Gastos
-            gastos = db.get_gastos_filtrados(fecha_inicio.strftime('%Y-%m-%d'),
-                                            fecha_fin.strftime('%Y-%m-%d'))
-            total_gastos = sum([g[3] for g in gastos]) if gastos else 0
+            # Totales por diplomado (meses completos desde resumen_mensual)
+            resumen = db.get_resumen_financiero(desde, hasta)
+            total_ingresos = resumen['ingresos']
+            total_gastos = resumen['gastos']
             
             # Balance
             balance = total_ingresos - total_gastos
@@ -939,7 +1242,7 @@ if menu == "📊 Reportes":
             st.markdown("---")
             
             # Gráfico
-            if pagos or gastos:
+            if resumen['num_pagos'] or total_gastos:
                 fig = go.Figure()
                 fig.add_trace(go.Bar(x=['Ingresos', 'Gastos'], 
                                    y=[total_ingresos, total_gastos],
@@ -953,27 +1256,45 @@ if menu == "📊 Reportes":
             
             with col1:
                 st.subheader("💰 Detalle de Ingresos")
-                if pagos:
-                    # Agrupar por diplomado
-                    ingresos_dip = {}
-                    for p in pagos:
-                        dip = p[2]
-                        if dip not in ingresos_dip:
-                            ingresos_dip[dip] = 0
-                        ingresos_dip[dip] += p[4]
-                    
-                    for dip, monto in ingresos_dip.items():
+                if resumen['por_diplomado']:
+                    for dip, monto in resumen['por_diplomado'].items():
                         st.write(f"**{dip}:** ${monto:,.2f}")
                 else:
                     st.info("Sin ingresos en el periodo")
             
             with col2:
                 st.subheader("💸 Detalle de Gastos")
+                # Sólo la página actual; el total ya viene del resumen
+                tamano = TAMANOS_PAGINA[0]
+                estado = estado_paginacion('pagina_resumen_gastos', (desde, hasta))
+                gastos, siguiente = db.get_gastos_pagina(desde, hasta, despues=estado['llaves'][-1],
+                                                         limite=tamano)
                 if gastos:
                     for g in gastos:
                         st.write(f"**{g[2]}:** ${g[3]:,.2f} ({g[1]})")
+                    num_gastos, _ = db.get_totales_gastos(desde, hasta)
+                    controles_paginacion('pagina_resumen_gastos', estado, siguiente, num_gastos, tamano)
                 else:
                     st.info("Sin gastos en el periodo")
 
 # Footer
-st.sidebar.markdown("---")
\ No newline at end of file
+st.sidebar.markdown("---")
+rerun_stats = db.get_rerun_stats()
+st.sidebar.caption(f"🔌 Pings omitidos en esta recarga: {rerun_stats.get('pings_omitidos', 0)} "
+                   f"(realizados: {rerun_stats.get('pings', 0)})")
+
+# Panel de depuración de consultas (opcional)
+if st.sidebar.checkbox("🐞 Depuración de consultas", key="debug_consultas"):
+    consultas = rerun_stats['consultas']
+    cache_stats = db.get_cache_stats()
+    with st.sidebar.expander("Consultas de esta recarga", expanded=True):
+        st.write(f"**Sentencias:** {consultas['sentencias']}")
+        st.write(f"**Tiempo total:** {consultas['segundos'] * 1000:,.1f} ms")
+        st.write(f"**Filas:** {consultas['filas']:,}")
+        st.write(f"**Lentas (>{db.query_log.umbral_lento_ms} ms):** {consultas['lentas']}")
+        st.write(f"**Cache:** {cache_stats['aciertos']} aciertos / {cache_stats['fallos']} fallos")
+        
+        if consultas['detalle']:
+            df_consultas = pd.DataFrame(consultas['detalle'])
+            df_consultas.columns = ['SQL', 'Parámetros', 'Filas', 'ms']
+            st.dataframe(df_consultas.sort_values('ms', ascending=False), use_container_width=True)
@@ -0,0 +1,424 @@
+"""Motores de almacenamiento de DatabaseManager.
+
+DatabaseManager sólo habla con la interfaz `Backend`: pedir y devolver
+conexiones, crear cursores y unas pocas piezas de SQL que cambian entre
+dialectos. Hay dos implementaciones:
+
+- MySQLBackend: el MySQL remoto de producción, con el pool acotado.
+- SQLiteBackend: un archivo local en modo WAL, para correr la app, las
+  pruebas de escala y los benchmarks sin base de datos remota:
+      
+      ACADEMIAPP_SQLITE=academiapp.db streamlit run app.py
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+import pymysql
+
+from connection_pool import ConnectionPool
+
+
+class Backend:
+    """Interfaz común de los motores de almacenamiento"""
+    nombre = ''
+    placeholder = '%s'
+    prefijo_explain = 'EXPLAIN '
+    # Tipos de columna usados por las migraciones
+    tipos = {}
+    # Error que se produce al consultar una tabla que no existe
+    TablaInexistenteError = Exception
+    
+    query_log = None  # QueryLog que instrumenta cada execute (opcional)
+    
+    # --- Conexiones -------------------------------------------------------
+    
+    def checkout(self):
+        """Tomar una conexión para el hilo actual"""
+        raise NotImplementedError
+    
+    def release(self, conn):
+        """Devolver la conexión del hilo actual"""
+        raise NotImplementedError
+    
+    def cursor(self, conn):
+        """Crear un cursor sobre una conexión"""
+        return conn.cursor()
+    
+    def cursor_sin_bufer(self, conn):
+        """Cursor que lee las filas conforme se piden, sin cargarlas todas al ejecutar"""
+        return self.cursor(conn)
+    
+    def iniciar_transaccion(self, cursor):
+        """Abrir una transacción explícita (las conexiones trabajan en autocommit)"""
+        cursor.connection.begin()
+    
+    def stats(self) -> dict:
+        """Estadísticas de conexiones"""
+        return {}
+    
+    def reset_rerun_stats(self):
+        """Reiniciar los contadores de la recarga del hilo actual"""
+    
+    def rerun_stats(self) -> dict:
+        """Contadores de la recarga del hilo actual"""
+        return {'pings': 0, 'pings_omitidos': 0, 'reintentos': 0}
+    
+    # --- Dialecto ---------------------------------------------------------
+    
+    def sql_mes(self, columna: str) -> str:
+        """Expresión SQL que convierte una fecha en 'AAAA-MM'"""
+        raise NotImplementedError
+    
+    def sql_acumular(self, tabla: str, columnas: List[str], claves: List[str], origen: str) -> str:
+        """INSERT que, si la clave ya existe, suma los valores a la fila existente
+        
+        `origen` es un VALUES (...) o un SELECT con WHERE que produce `columnas`.
+        """
+        raise NotImplementedError
+    
+    def existe_indice(self, cursor, tabla: str, nombre: str) -> bool:
+        raise NotImplementedError
+    
+    def existe_columna(self, cursor, tabla: str, columna: str) -> bool:
+        raise NotImplementedError
+    
+    @contextmanager
+    def candado(self, cursor, nombre: str, espera: int = 60):
+        """Candado exclusivo entre procesos (p. ej. para migraciones)"""
+        raise NotImplementedError
+        yield
+    
+    def accesos_sin_indice(self, cursor, query: str, params) -> List[Tuple]:
+        """Tablas que la consulta lee completas: (tabla, tipo de acceso, filas estimadas)"""
+        raise NotImplementedError
+
+
+# ============================================================================
+# MYSQL
+# ============================================================================
+
+class MySQLBackend(Backend):
+    """MySQL remoto (Hostinger) a través de ConnectionPool"""
+    nombre = 'mysql'
+    placeholder = '%s'
+    prefijo_explain = 'EXPLAIN '
+    tipos = {
+        'pk': 'INT AUTO_INCREMENT PRIMARY KEY',
+        'integer': 'INT',
+        'real': 'DECIMAL(10,2)',
+        'total': 'DECIMAL(14,2)',
+        'text': 'TEXT',
+        'varchar_50': 'VARCHAR(50)',
+        'varchar_255': 'VARCHAR(255)',
+        'date': 'DATE',
+        'datetime': 'DATETIME',
+    }
+    TablaInexistenteError = pymysql.err.ProgrammingError
+    
+    def __init__(self, config: dict, **pool_config):
+        self.config = config
+        self.pool_config = pool_config
+        self.pool = ConnectionPool(config, **pool_config)
+    
+    @property
+    def query_log(self):
+        return self.pool.query_log
+    
+    @query_log.setter
+    def query_log(self, query_log):
+        self.pool.query_log = query_log
+    
+    def checkout(self):
+        return self.pool.checkout()
+    
+    def release(self, conn):
+        self.pool.release(conn)
+    
+    def cursor_sin_bufer(self, conn):
+        return conn.cursor(self.pool.cursor_sin_bufer)
+    
+    def stats(self) -> dict:
+        return self.pool.stats()
+    
+    def reset_rerun_stats(self):
+        self.pool.reset_rerun_stats()
+    
+    def rerun_stats(self) -> dict:
+        return self.pool.rerun_stats()
+    
+    def sql_mes(self, columna: str) -> str:
+        # %% porque pymysql formatea la consulta con los parámetros
+        return f"DATE_FORMAT({columna}, '%%Y-%%m')"
+    
+    def sql_acumular(self, tabla: str, columnas: List[str], claves: List[str], origen: str) -> str:
+        sumas = ', '.join(f"{c} = {c} + VALUES({c})" for c in columnas if c not in claves)
+        return f"INSERT INTO {tabla} ({', '.join(columnas)}) {origen} ON DUPLICATE KEY UPDATE {sumas}"
+    
+    def existe_indice(self, cursor, tabla: str, nombre: str) -> bool:
+        cursor.execute('''
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        ''', (tabla, nombre))
+        return cursor.fetchone()[0] > 0
+    
+    def existe_columna(self, cursor, tabla: str, columna: str) -> bool:
+        cursor.execute('''
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        ''', (tabla, columna))
+        return cursor.fetchone()[0] > 0
+    
+    @contextmanager
+    def candado(self, cursor, nombre: str, espera: int = 60):
+        cursor.execute('SELECT GET_LOCK(%s, %s)', (nombre, espera))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError(f"No se pudo obtener el candado {nombre}")
+        try:
+            yield
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (nombre,))
+            cursor.fetchone()
+    
+    def accesos_sin_indice(self, cursor, query: str, params) -> List[Tuple]:
+        cursor.execute(self.prefijo_explain + query, params)
+        columnas = [d[0].lower() for d in cursor.description]
+        accesos = []
+        for fila in cursor.fetchall():
+            plan = dict(zip(columnas, fila))
+            if plan.get('type') == 'ALL':
+                accesos.append((plan.get('table'), plan.get('type'), plan.get('rows')))
+        return accesos
+
+
+# ============================================================================
+# SQLITE
+# ============================================================================
+
+# Ajustes de cada conexión: WAL para que las lecturas no bloqueen escrituras,
+# fsync sólo en checkpoints y cache/mmap generosos para los benchmarks
+PRAGMAS_SQLITE = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA busy_timeout = 30000',
+]
+
+
+class SQLiteCursor:
+    """Cursor de sqlite3 que se comporta como el cursor de pymysql.
+    
+    Los resultados de un SELECT se leen completos al ejecutar (igual que el
+    cursor con búfer de pymysql), de modo que `rowcount` es el número de
+    filas devueltas y la instrumentación puede registrarlo.
+    """
+    
+    def __init__(self, backend: 'SQLiteBackend', conn: sqlite3.Connection):
+        self.backend = backend
+        self.connection = conn
+        self._cursor = conn.cursor()
+        self._filas = None
+        self._pos = 0
+    
+    sin_bufer = False
+    
+    def execute(self, query: str, params=None):
+        self._verificar()
+        inicio = time.perf_counter()
+        self._cursor.execute(query, params if params is not None else ())
+        self._filas = self._cursor.fetchall() if self._cursor.description is not None else None
+        self._pos = 0
+        self._registrar(query, params, inicio)
+        return self.rowcount
+    
+    def executemany(self, query: str, seq_params):
+        self._verificar()
+        inicio = time.perf_counter()
+        seq_params = list(seq_params)
+        self._cursor.executemany(query, seq_params)
+        self._filas = None
+        self._registrar(query, seq_params, inicio)
+        return self.rowcount
+    
+    def _verificar(self):
+        # sqlite3 sí admite otra sentencia, pero MySQL no: se rechaza igual en ambos motores
+        if self.backend.query_log is not None:
+            self.backend.query_log.verificar(self)
+    
+    def _registrar(self, query, params, inicio):
+        if self.backend.query_log is not None:
+            self.backend.query_log.registrar(self, query, params, time.perf_counter() - inicio)
+    
+    @property
+    def rowcount(self) -> int:
+        return len(self._filas) if self._filas is not None else self._cursor.rowcount
+    
+    @property
+    def description(self):
+        return self._cursor.description
+    
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+    
+    def fetchone(self):
+        if not self._filas or self._pos >= len(self._filas):
+            return None
+        self._pos += 1
+        return self._filas[self._pos - 1]
+    
+    def fetchmany(self, size: int = 1):
+        if not self._filas:
+            return []
+        filas = self._filas[self._pos:self._pos + size]
+        self._pos += len(filas)
+        return filas
+    
+    def fetchall(self):
+        if not self._filas:
+            return []
+        filas = self._filas[self._pos:]
+        self._pos = len(self._filas)
+        return filas
+    
+    def __iter__(self):
+        return iter(self.fetchall())
+    
+    def close(self):
+        self._cursor.close()
+        self._filas = None
+
+
+class SQLiteCursorSinBufer(SQLiteCursor):
+    """SQLiteCursor que no lee el resultado al ejecutar: sqlite3 entrega las filas conforme se piden"""
+    sin_bufer = True
+    
+    def execute(self, query: str, params=None):
+        self._verificar()
+        inicio = time.perf_counter()
+        self._cursor.execute(query, params if params is not None else ())
+        self._filas = None
+        self._registrar(query, params, inicio)
+        return self._cursor.rowcount
+    
+    def fetchone(self):
+        return self._cursor.fetchone()
+    
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+    
+    def fetchall(self):
+        return self._cursor.fetchall()
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def close(self):
+        if self.backend.query_log is not None:
+            self.backend.query_log.liberar(self)
+        super().close()
+
+
+class SQLiteBackend(Backend):
+    """Archivo SQLite local en modo WAL (una conexión por hilo)"""
+    nombre = 'sqlite'
+    placeholder = '?'
+    prefijo_explain = 'EXPLAIN QUERY PLAN '
+    tipos = {
+        'pk': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+        'integer': 'INTEGER',
+        'real': 'REAL',
+        'total': 'REAL',
+        'text': 'TEXT',
+        'varchar_50': 'VARCHAR(50)',
+        'varchar_255': 'VARCHAR(255)',
+        'date': 'DATE',
+        'datetime': 'DATETIME',
+    }
+    TablaInexistenteError = sqlite3.OperationalError
+    
+    _candados = {}
+    _candados_lock = threading.Lock()
+    
+    def __init__(self, path: str = 'academiapp.db'):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'checkouts': 0, 'creadas_total': 0}
+    
+    def checkout(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit (isolation_level=None) igual que la conexión MySQL
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            for pragma in PRAGMAS_SQLITE:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._stats['creadas_total'] += 1
+        with self._lock:
+            self._stats['checkouts'] += 1
+        return conn
+    
+    def release(self, conn):
+        # La conexión queda asignada al hilo; abrir una nueva en SQLite no cuesta un viaje de red
+        pass
+    
+    def cursor(self, conn):
+        return SQLiteCursor(self, conn)
+    
+    def cursor_sin_bufer(self, conn):
+        return SQLiteCursorSinBufer(self, conn)
+    
+    def iniciar_transaccion(self, cursor):
+        cursor.execute('BEGIN')
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+    
+    def sql_mes(self, columna: str) -> str:
+        return f"strftime('%Y-%m', {columna})"
+    
+    def sql_acumular(self, tabla: str, columnas: List[str], claves: List[str], origen: str) -> str:
+        # Con INSERT ... SELECT el SELECT debe tener WHERE para que SQLite no confunda el ON
+        sumas = ', '.join(f"{c} = {c} + excluded.{c}" for c in columnas if c not in claves)
+        return (f"INSERT INTO {tabla} ({', '.join(columnas)}) {origen} "
+                f"ON CONFLICT ({', '.join(claves)}) DO UPDATE SET {sumas}")
+    
+    def existe_indice(self, cursor, tabla: str, nombre: str) -> bool:
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ?",
+                       (tabla, nombre))
+        return cursor.fetchone()[0] > 0
+    
+    def existe_columna(self, cursor, tabla: str, columna: str) -> bool:
+        cursor.execute(f'PRAGMA table_info({tabla})')
+        return any(fila[1] == columna for fila in cursor.fetchall())
+    
+    @contextmanager
+    def candado(self, cursor, nombre: str, espera: int = 60):
+        # Un solo proceso usa el archivo local; basta un candado en memoria
+        with SQLiteBackend._candados_lock:
+            candado = SQLiteBackend._candados.setdefault((self.path, nombre), threading.Lock())
+        if not candado.acquire(timeout=espera):
+            raise RuntimeError(f"No se pudo obtener el candado {nombre}")
+        try:
+            yield
+        finally:
+            candado.release()
+    
+    def accesos_sin_indice(self, cursor, query: str, params) -> List[Tuple]:
+        cursor.execute(self.prefijo_explain + query, params)
+        accesos = []
+        for fila in cursor.fetchall():
+            detalle = fila[-1]
+            # "SCAN tabla" sin índice es una lectura completa
+            if detalle.startswith('SCAN ') and 'INDEX' not in detalle:
+                accesos.append((detalle.split()[1], 'SCAN', None))
+        return accesos
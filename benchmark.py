@@ -0,0 +1,392 @@
+"""Benchmarks de las consultas de DatabaseManager y de las páginas de app.py.
+
+Siembra (con generar_datos) una base SQLite local por cada escala, mide cada
+método de lectura y el render completo de cada página, y guarda p50/p95,
+viajes a la base de datos (sentencias) y filas transferidas en un JSON.
+Comparar contra un JSON anterior reporta las regresiones:
+
+    python benchmark.py --escalas actual x10 --salida hoy.json
+    python benchmark.py --escalas actual --comparar base.json
+
+La cache de resultados se desactiva para medir las consultas mismas.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from database import DatabaseManager
+from backends import SQLiteBackend
+import generar_datos
+
+PAGINAS = ["🏠 Dashboard", "📚 Diplomados", "👥 Alumnos", "💰 Pagos", "💸 Gastos", "📊 Reportes"]
+
+
+# ============================================================================
+# CASOS
+# ============================================================================
+
+def get_contexto(db: DatabaseManager) -> dict:
+    """Argumentos representativos tomados de los datos sembrados"""
+    hoy = date.today()
+    ctx = {
+        'hoy': hoy.isoformat(),
+        'inicio_mes': hoy.replace(day=1).isoformat(),
+        'hace_un_año': (hoy - timedelta(days=365)).isoformat(),
+        'año': hoy.year,
+        'mes': hoy.month,
+    }
+    with db.get_cursor() as cursor:
+        # El diplomado con más alumnos es el peor caso de las vistas por diplomado
+        cursor.execute('''
+            SELECT diplomado_clave, COUNT(*) FROM alumnos
+            GROUP BY diplomado_clave ORDER BY COUNT(*) DESC LIMIT 1
+        ''')
+        fila = cursor.fetchone()
+        ctx['clave'] = fila[0] if fila else ''
+        cursor.execute('''
+            SELECT alumno_id, COUNT(*) FROM pagos
+            GROUP BY alumno_id ORDER BY COUNT(*) DESC LIMIT 1
+        ''')
+        fila = cursor.fetchone()
+        ctx['alumno_id'] = fila[0] if fila else 0
+        cursor.execute('SELECT matricula FROM alumnos ORDER BY id DESC LIMIT 1')
+        fila = cursor.fetchone()
+        ctx['matricula'] = fila[0] if fila else ''
+        cursor.execute(f'SELECT id FROM alumnos WHERE diplomado_clave = {db.get_placeholder()}',
+                       (ctx['clave'],))
+        ctx['alumno_ids'] = [f[0] for f in cursor.fetchall()]
+        # Llaves de la penúltima página del año: la última página debe costar lo mismo que la primera
+        ph = db.get_placeholder()
+        cursor.execute(f'''
+            SELECT fecha_pago, id FROM pagos WHERE fecha_pago BETWEEN {ph} AND {ph}
+            ORDER BY fecha_pago, id LIMIT 1 OFFSET 50
+        ''', (ctx['hace_un_año'], ctx['hoy']))
+        ctx['llave_pagos'] = cursor.fetchone()
+        cursor.execute(f'''
+            SELECT fecha, id FROM gastos WHERE fecha BETWEEN {ph} AND {ph}
+            ORDER BY fecha, id LIMIT 1 OFFSET 50
+        ''', (ctx['hace_un_año'], ctx['hoy']))
+        ctx['llave_gastos'] = cursor.fetchone()
+        cursor.execute('''
+            SELECT nombre_completo, id FROM alumnos
+            ORDER BY nombre_completo DESC, id DESC LIMIT 1 OFFSET 50
+        ''')
+        ctx['llave_alumnos'] = cursor.fetchone()
+        cursor.execute(f'''
+            SELECT a.nombre_completo, a.id, p.num_mensualidad, p.id
+            FROM pagos p JOIN alumnos a ON p.alumno_id = a.id
+            WHERE a.diplomado_clave = {ph} AND p.fecha_pago BETWEEN {ph} AND {ph}
+            ORDER BY a.nombre_completo DESC, a.id DESC, p.num_mensualidad DESC, p.id DESC LIMIT 1 OFFSET 50
+        ''', (ctx['clave'], ctx['hace_un_año'], ctx['hoy']))
+        ctx['llave_reporte_diplomado'] = cursor.fetchone()
+    return ctx
+
+
+# (nombre, método de DatabaseManager, función que lo llama)
+CASOS: List[Tuple[str, str, Callable]] = [
+    ('get_all_diplomados', 'get_all_diplomados', lambda db, c: db.get_all_diplomados()),
+    ('get_diplomados_filtrados[Activo]', 'get_diplomados_filtrados',
+     lambda db, c: db.get_diplomados_filtrados('Activo')),
+    ('get_alumnos_filtrados[todos]', 'get_alumnos_filtrados', lambda db, c: db.get_alumnos_filtrados()),
+    ('get_alumnos_filtrados[diplomado]', 'get_alumnos_filtrados',
+     lambda db, c: db.get_alumnos_filtrados(diplomado=f"Diplomado ({c['clave']})")),
+    ('get_alumnos_filtrados[nombre]', 'get_alumnos_filtrados',
+     lambda db, c: db.get_alumnos_filtrados(nombre='Mar')),
+    ('get_alumnos_pagina[primera]', 'get_alumnos_pagina', lambda db, c: db.get_alumnos_pagina()),
+    ('get_alumnos_pagina[última]', 'get_alumnos_pagina',
+     lambda db, c: db.get_alumnos_pagina(despues=c['llave_alumnos'])),
+    ('get_alumnos_pagina[diplomado]', 'get_alumnos_pagina',
+     lambda db, c: db.get_alumnos_pagina(diplomado=f"Diplomado ({c['clave']})")),
+    ('contar_alumnos[todos]', 'contar_alumnos', lambda db, c: db.contar_alumnos()),
+    ('get_alumno_por_id', 'get_alumno_por_id', lambda db, c: db.get_alumno_por_id(c['alumno_id'])),
+    ('buscar_alumnos[nombre]', 'buscar_alumnos', lambda db, c: db.buscar_alumnos('jose hernandez', limite=50)),
+    ('buscar_alumnos[prefijo]', 'buscar_alumnos', lambda db, c: db.buscar_alumnos('ma', limite=50)),
+    ('buscar_alumnos[matrícula]', 'buscar_alumnos', lambda db, c: db.buscar_alumnos(c['matricula'], limite=50)),
+    ('buscar_alumnos[aproximada]', 'buscar_alumnos',
+     lambda db, c: db.buscar_alumnos('hernandes martines', limite=50)),
+    ('get_alumnos_por_ids[página]', 'get_alumnos_por_ids',
+     lambda db, c: db.get_alumnos_por_ids(c['alumno_ids'][:50])),
+    ('get_posibles_duplicados', 'get_posibles_duplicados',
+     lambda db, c: db.get_posibles_duplicados('José Hernández', 'jose@correo.com', '5512345678')),
+    ('get_alumnos_duplicados', 'get_alumnos_duplicados', lambda db, c: db.get_alumnos_duplicados()),
+    ('get_alumno_por_matricula', 'get_alumno_por_matricula',
+     lambda db, c: db.get_alumno_por_matricula(c['matricula'])),
+    ('get_alumnos_por_diplomado_clave', 'get_alumnos_por_diplomado_clave',
+     lambda db, c: db.get_alumnos_por_diplomado_clave(c['clave'])),
+    ('get_alumnos_con_pago_mensualidad', 'get_alumnos_con_pago_mensualidad',
+     lambda db, c: db.get_alumnos_con_pago_mensualidad(c['clave'], 1)),
+    ('get_detalle_pago', 'get_detalle_pago', lambda db, c: db.get_detalle_pago(c['alumno_id'], 1)),
+    ('get_saldo_alumno', 'get_saldo_alumno', lambda db, c: db.get_saldo_alumno(c['alumno_id'])),
+    ('get_pagos_alumno', 'get_pagos_alumno', lambda db, c: db.get_pagos_alumno(c['alumno_id'])),
+    ('get_pagos_alumnos[diplomado]', 'get_pagos_alumnos', lambda db, c: db.get_pagos_alumnos(c['alumno_ids'])),
+    ('get_alumnos_con_saldo', 'get_alumnos_con_saldo', lambda db, c: db.get_alumnos_con_saldo()),
+    ('get_pagos_filtrados[mes]', 'get_pagos_filtrados',
+     lambda db, c: db.get_pagos_filtrados(c['inicio_mes'], c['hoy'])),
+    ('get_pagos_filtrados[año]', 'get_pagos_filtrados',
+     lambda db, c: db.get_pagos_filtrados(c['hace_un_año'], c['hoy'])),
+    ('get_pagos_pagina[primera]', 'get_pagos_pagina',
+     lambda db, c: db.get_pagos_pagina(c['hace_un_año'], c['hoy'])),
+    ('get_pagos_pagina[última]', 'get_pagos_pagina',
+     lambda db, c: db.get_pagos_pagina(c['hace_un_año'], c['hoy'], despues=c['llave_pagos'])),
+    ('get_totales_pagos[año]', 'get_totales_pagos', lambda db, c: db.get_totales_pagos(c['hace_un_año'], c['hoy'])),
+    ('get_reporte_pagos_diplomado[año]', 'get_reporte_pagos_diplomado',
+     lambda db, c: db.get_reporte_pagos_diplomado(c['clave'], c['hace_un_año'], c['hoy'])),
+    ('get_reporte_pagos_diplomado_pagina[primera]', 'get_reporte_pagos_diplomado_pagina',
+     lambda db, c: db.get_reporte_pagos_diplomado_pagina(c['clave'], c['hace_un_año'], c['hoy'])),
+    ('get_reporte_pagos_diplomado_pagina[última]', 'get_reporte_pagos_diplomado_pagina',
+     lambda db, c: db.get_reporte_pagos_diplomado_pagina(c['clave'], c['hace_un_año'], c['hoy'],
+                                                         despues=c['llave_reporte_diplomado'])),
+    ('get_gastos_filtrados[año]', 'get_gastos_filtrados',
+     lambda db, c: db.get_gastos_filtrados(c['hace_un_año'], c['hoy'])),
+    ('get_gastos_pagina[primera]', 'get_gastos_pagina',
+     lambda db, c: db.get_gastos_pagina(c['hace_un_año'], c['hoy'])),
+    ('get_gastos_pagina[última]', 'get_gastos_pagina',
+     lambda db, c: db.get_gastos_pagina(c['hace_un_año'], c['hoy'], despues=c['llave_gastos'])),
+    ('get_totales_gastos[año]', 'get_totales_gastos', lambda db, c: db.get_totales_gastos(c['hace_un_año'], c['hoy'])),
+    ('get_total_alumnos', 'get_total_alumnos', lambda db, c: db.get_total_alumnos()),
+    ('get_alumnos_activos', 'get_alumnos_activos', lambda db, c: db.get_alumnos_activos()),
+    ('get_total_diplomados', 'get_total_diplomados', lambda db, c: db.get_total_diplomados()),
+    ('get_ingresos_mes_actual', 'get_ingresos_mes_actual', lambda db, c: db.get_ingresos_mes_actual()),
+    ('get_gastos_mes_actual', 'get_gastos_mes_actual', lambda db, c: db.get_gastos_mes_actual()),
+    ('get_dashboard_snapshot', 'get_dashboard_snapshot', lambda db, c: db.get_dashboard_snapshot()),
+    ('get_alumnos_por_diplomado', 'get_alumnos_por_diplomado', lambda db, c: db.get_alumnos_por_diplomado()),
+    ('get_ingresos_gastos_meses[6]', 'get_ingresos_gastos_meses', lambda db, c: db.get_ingresos_gastos_meses(6)),
+    ('get_ingresos_gastos_meses[24]', 'get_ingresos_gastos_meses',
+     lambda db, c: db.get_ingresos_gastos_meses(24)),
+    ('get_alumnos_con_adeudos', 'get_alumnos_con_adeudos', lambda db, c: db.get_alumnos_con_adeudos()),
+    ('get_alumnos_con_adeudos[diplomado]', 'get_alumnos_con_adeudos',
+     lambda db, c: db.get_alumnos_con_adeudos(diplomado_clave=c['clave'])),
+    ('get_alumnos_con_adeudos[top50]', 'get_alumnos_con_adeudos',
+     lambda db, c: db.get_alumnos_con_adeudos(adeudo_minimo=1000, limite=50)),
+    ('get_resumen_financiero[mes]', 'get_resumen_financiero',
+     lambda db, c: db.get_resumen_financiero(c['inicio_mes'], c['hoy'])),
+    ('get_resumen_financiero[año]', 'get_resumen_financiero',
+     lambda db, c: db.get_resumen_financiero(c['hace_un_año'], c['hoy'])),
+    ('verificar_pago_mensualidad', 'verificar_pago_mensualidad',
+     lambda db, c: db.verificar_pago_mensualidad(c['alumno_id'], 1)),
+    ('verificar_saldos', 'verificar_saldos', lambda db, c: db.verificar_saldos()),
+    ('get_eventos_calendario', 'get_eventos_calendario', lambda db, c: db.get_eventos_calendario()),
+    ('get_eventos_mes', 'get_eventos_mes', lambda db, c: db.get_eventos_mes(c['año'], c['mes'])),
+]
+
+
+def metodos_sin_caso() -> List[str]:
+    """Métodos de lectura (cacheados) de DatabaseManager que ningún caso mide"""
+    cubiertos = {metodo for _, metodo, _ in CASOS}
+    return sorted(nombre for nombre, valor in vars(DatabaseManager).items()
+                  if hasattr(valor, 'tablas') and nombre not in cubiertos)
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+
+def _percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def _resumen(tiempos: List[float], sentencias: List[int], filas: List[int]) -> dict:
+    return {
+        'p50_ms': round(_percentil(tiempos, 50) * 1000, 3),
+        'p95_ms': round(_percentil(tiempos, 95) * 1000, 3),
+        'media_ms': round(sum(tiempos) / len(tiempos) * 1000, 3),
+        'round_trips': max(sentencias),
+        'filas': max(filas),
+        'repeticiones': len(tiempos),
+    }
+
+
+def medir_consultas(db: DatabaseManager, repeticiones: int, calentamiento: int = 2) -> Dict[str, dict]:
+    """p50/p95, sentencias y filas de cada caso"""
+    ctx = get_contexto(db)
+    resultados = {}
+    for nombre, _, llamada in CASOS:
+        tiempos, sentencias, filas = [], [], []
+        for i in range(calentamiento + repeticiones):
+            db.iniciar_rerun()
+            inicio = time.perf_counter()
+            llamada(db, ctx)
+            transcurrido = time.perf_counter() - inicio
+            if i >= calentamiento:
+                consultas = db.get_rerun_stats()['consultas']
+                tiempos.append(transcurrido)
+                sentencias.append(consultas['sentencias'])
+                filas.append(consultas['filas'])
+        resultados[nombre] = _resumen(tiempos, sentencias, filas)
+        print(f"    {nombre:<40} p50 {resultados[nombre]['p50_ms']:>9.2f} ms  "
+              f"p95 {resultados[nombre]['p95_ms']:>9.2f} ms  "
+              f"{resultados[nombre]['round_trips']:>3} viajes  {resultados[nombre]['filas']:>9,} filas")
+    return resultados
+
+
+def _leer_depuracion(at) -> Tuple[int, int]:
+    """Sentencias y filas del panel "Depuración de consultas" de la app"""
+    texto = '\n'.join(str(m.value) for m in at.sidebar.markdown)
+    sentencias = re.search(r'\*\*Sentencias:\*\* ([\d,]+)', texto)
+    filas = re.search(r'\*\*Filas:\*\* ([\d,]+)', texto)
+    return (int(sentencias.group(1).replace(',', '')) if sentencias else -1,
+            int(filas.group(1).replace(',', '')) if filas else -1)
+
+
+def medir_paginas(ruta: str, repeticiones: int, timeout: int) -> Dict[str, dict]:
+    """Render completo de cada página de app.py con AppTest (sin cache de resultados)"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['ACADEMIAPP_SQLITE'] = ruta
+    # get_database() está en st.cache_resource: no reutilizar la base de otra escala
+    st.cache_resource.clear()
+
+    ruta_app = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+    def nueva_app():
+        at = AppTest.from_file(ruta_app, default_timeout=timeout)
+        at.secrets['connections'] = {'sqlite': {'database': ruta, 'cache_max_entries': 0,
+                                                'slow_query_log': ''}}
+        at.session_state['authenticated'] = True
+        at.session_state['debug_consultas'] = True
+        return at
+
+    at = nueva_app()
+    at.run()
+
+    resultados = {}
+    for pagina in PAGINAS:
+        tiempos, sentencias, filas = [], [], []
+        try:
+            at.sidebar.radio[0].set_value(pagina)
+            at.run()  # calentamiento
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                at.run()
+                tiempos.append(time.perf_counter() - inicio)
+                viajes, n_filas = _leer_depuracion(at)
+                sentencias.append(viajes)
+                filas.append(n_filas)
+        except RuntimeError as e:
+            # AppTest lanza RuntimeError cuando el script excede el timeout
+            print(f"    {pagina:<40} ⚠️  {e}")
+            resultados[pagina] = {'error': str(e)}
+            at = nueva_app()
+            continue
+        if at.exception:
+            resultados[pagina] = {'error': str(at.exception[0].value)}
+            print(f"    {pagina:<40} ❌ {resultados[pagina]['error'][:100]}")
+            continue
+        resultados[pagina] = _resumen(tiempos, sentencias, filas)
+        print(f"    {pagina:<40} p50 {resultados[pagina]['p50_ms']:>9.2f} ms  "
+              f"p95 {resultados[pagina]['p95_ms']:>9.2f} ms  "
+              f"{resultados[pagina]['round_trips']:>3} viajes  {resultados[pagina]['filas']:>9,} filas")
+    return resultados
+
+
+def preparar_base(escala: str, directorio: str, semilla: int) -> Tuple[str, Dict[str, int]]:
+    """Archivo SQLite sembrado para la escala (se reutiliza si ya existe)"""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"bench_{escala}_{semilla}.db")
+    db = DatabaseManager(backend=SQLiteBackend(ruta), opciones={'slow_query_log': ''})
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM alumnos')
+        sembrada = cursor.fetchone()[0] > 0
+    if not sembrada:
+        print(f"  🌱 Sembrando {escala}...")
+        generar_datos.generar(db, semilla=semilla, **generar_datos.ESCALAS[escala])
+    filas = {}
+    with db.get_cursor() as cursor:
+        for tabla in ('diplomados', 'alumnos', 'pagos', 'gastos', 'calendario'):
+            cursor.execute(f'SELECT COUNT(*) FROM {tabla}')
+            filas[tabla] = cursor.fetchone()[0]
+    return ruta, filas
+
+
+# ============================================================================
+# COMPARACIÓN
+# ============================================================================
+
+def comparar(actual: dict, base: dict, tolerancia: float, piso_ms: float) -> List[str]:
+    """Regresiones: p50 más lento que base × tolerancia (y por más de piso_ms) o más viajes"""
+    regresiones = []
+    for escala, datos in actual['escalas'].items():
+        datos_base = base.get('escalas', {}).get(escala)
+        if not datos_base:
+            continue
+        for grupo in ('consultas', 'paginas'):
+            for nombre, r in datos.get(grupo, {}).items():
+                b = datos_base.get(grupo, {}).get(nombre)
+                if not b or 'error' in b:
+                    continue
+                if 'error' in r:
+                    regresiones.append(f"{escala} {nombre}: {r['error'][:80]}")
+                    continue
+                if r['p50_ms'] > b['p50_ms'] * tolerancia and r['p50_ms'] - b['p50_ms'] > piso_ms:
+                    regresiones.append(f"{escala} {nombre}: p50 {b['p50_ms']:.2f} → {r['p50_ms']:.2f} ms")
+                if r['round_trips'] > b['round_trips']:
+                    regresiones.append(f"{escala} {nombre}: viajes {b['round_trips']} → {r['round_trips']}")
+    return regresiones
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks de consultas y páginas")
+    parser.add_argument('--escalas', nargs='+', choices=sorted(generar_datos.ESCALAS), default=['actual'])
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--repeticiones-paginas', type=int, default=3)
+    parser.add_argument('--sin-paginas', action='store_true', help="Medir sólo las consultas")
+    parser.add_argument('--timeout-pagina', type=int, default=120, help="Segundos por render")
+    parser.add_argument('--directorio', default='bench_data', help="Dónde guardar las bases sembradas")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', default='benchmark_resultados.json')
+    parser.add_argument('--comparar', help="JSON de una corrida anterior")
+    parser.add_argument('--tolerancia', type=float, default=1.25, help="Factor de p50 que cuenta como regresión")
+    parser.add_argument('--piso-ms', type=float, default=1.0, help="Diferencias menores se ignoran")
+    args = parser.parse_args()
+
+    resultados = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'backend': 'sqlite',
+        'repeticiones': args.repeticiones,
+        'escalas': {},
+    }
+
+    sin_caso = metodos_sin_caso()
+    if sin_caso:
+        print(f"⚠️  Métodos de lectura sin caso de benchmark: {', '.join(sin_caso)}")
+
+    for escala in args.escalas:
+        print(f"\n📏 Escala {escala}")
+        ruta, filas = preparar_base(escala, args.directorio, args.semilla)
+        print(f"  {', '.join(f'{t}={n:,}' for t, n in filas.items())}")
+
+        db = DatabaseManager(backend=SQLiteBackend(ruta), opciones={'slow_query_log': ''})
+        db.cache = None  # medir la base de datos, no la cache
+
+        print("  🔍 Consultas")
+        datos = {'filas': filas, 'consultas': medir_consultas(db, args.repeticiones)}
+        if not args.sin_paginas:
+            print("  🖥️  Páginas")
+            datos['paginas'] = medir_paginas(ruta, args.repeticiones_paginas, args.timeout_pagina)
+        resultados['escalas'][escala] = datos
+
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        regresiones = comparar(resultados, base, args.tolerancia, args.piso_ms)
+        if regresiones:
+            print(f"\n❌ {len(regresiones)} regresiones contra {args.comparar}:")
+            for r in regresiones:
+                print(f"  - {r}")
+            sys.exit(1)
+        print(f"\n✅ Sin regresiones contra {args.comparar}")
@@ -0,0 +1,240 @@
+"""Conciliación de estados de cuenta bancarios contra las mensualidades pendientes.
+
+El CSV del banco se lee línea por línea (csv.DictReader, sin pandas), de modo
+que un archivo de 100 mil movimientos no se carga completo en memoria. Para
+cada abono se busca el alumno en índices hash construidos una sola vez:
+
+- por matrícula: cualquier número de 10 dígitos en la referencia o concepto;
+- por (monto en centavos, fecha de vencimiento): la siguiente mensualidad
+  pendiente de cada alumno, probando los días dentro de la ventana.
+
+Cada búsqueda cuesta O(1) (O(ventana) para la fecha), así que el archivo se
+concilia en tiempo lineal. Las coincidencias se proponen y sólo las que el
+usuario confirma se registran con DatabaseManager.add_pagos_bulk.
+"""
+import csv
+import heapq
+import io
+import re
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from importacion import normalizar_encabezado
+
+# Días antes y después del vencimiento en que se acepta un pago sin referencia
+VENTANA_DIAS = 10
+
+# Líneas sin coincidencia que se conservan como muestra (el resto sólo se cuenta)
+MAX_MUESTRA_SIN_COINCIDENCIA = 500
+
+ALIAS_BANCO = {
+    'fecha_operacion': 'fecha',
+    'fecha_movimiento': 'fecha',
+    'fecha_de_operacion': 'fecha',
+    'concepto': 'referencia',
+    'descripcion': 'referencia',
+    'referencia_numerica': 'referencia',
+    'abono': 'monto',
+    'abonos': 'monto',
+    'deposito': 'monto',
+    'depositos': 'monto',
+    'importe': 'monto',
+    'credito': 'monto',
+}
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%Y/%m/%d')
+
+PATRON_MATRICULA = re.compile(r'(?<!\d)\d{10}(?!\d)')
+
+
+def _centavos(valor) -> Optional[int]:
+    """'$1,234.50' -> 123450; None si no es un número"""
+    texto = str(valor or '').replace('$', '').replace(',', '').strip()
+    try:
+        return round(float(texto) * 100)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _fecha(valor) -> Optional[date]:
+    """Fecha en cualquiera de FORMATOS_FECHA; None si no se reconoce
+
+    En caché: un estado de cuenta repite las mismas pocas fechas miles de veces.
+    """
+    texto = str(valor or '').strip()[:10]
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _vencimiento(inicio, num_mensualidad: int) -> date:
+    """Vencimiento de la mensualidad n: el mismo día del inicio, n-1 meses después"""
+    inicio = inicio if isinstance(inicio, date) else _fecha(inicio) or date.today()
+    meses = inicio.month - 1 + num_mensualidad - 1
+    return date(inicio.year + meses // 12, meses % 12 + 1, min(inicio.day, 28))
+
+
+def leer_movimientos(archivo) -> Iterable[Tuple[int, date, int, str]]:
+    """Abonos del CSV como (línea, fecha, centavos, referencia), uno a la vez
+
+    Los cargos (montos negativos o vacíos) y las líneas con fecha ilegible se omiten;
+    el número de línea es el del archivo (el encabezado es la línea 1).
+    """
+    if isinstance(archivo, (bytes, bytearray)):
+        archivo = io.BytesIO(archivo)
+    binario = not isinstance(archivo, io.TextIOBase)
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='') if binario else archivo
+    try:
+        lector = csv.DictReader(texto)
+        lector.fieldnames = [normalizar_encabezado(c, ALIAS_BANCO) for c in (lector.fieldnames or [])]
+        faltantes = [c for c in ('fecha', 'monto') if c not in lector.fieldnames]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el estado de cuenta: {', '.join(faltantes)}")
+
+        for linea, fila in enumerate(lector, start=2):
+            centavos = _centavos(fila.get('monto'))
+            fecha = _fecha(fila.get('fecha')) if centavos and centavos > 0 else None
+            if fecha is None:
+                yield linea, None, None, ''
+                continue
+            yield linea, fecha, centavos, ' '.join(str(fila.get(c) or '') for c in ('referencia', 'nombre'))
+    finally:
+        # Soltar el archivo original sin cerrarlo (p. ej. el de st.file_uploader)
+        if binario:
+            texto.detach()
+
+
+class ConciliadorBancario:
+    """Índices hash de las mensualidades pendientes y búsqueda de cada abono"""
+
+    def __init__(self, alumnos: List[Tuple], pagos: Dict[int, List[Tuple]], ventana_dias: int = VENTANA_DIAS):
+        """`alumnos` viene de get_alumnos_con_saldo y `pagos` de get_pagos_alumnos"""
+        self.ventana = [timedelta(days=d) for d in range(-ventana_dias, ventana_dias + 1)]
+        self.alumnos = {}
+        self.por_matricula = {}
+        self.por_monto_fecha = defaultdict(set)
+
+        for alumno_id, matricula, nombre, clave, mensualidad, num_mensualidades, inicio in alumnos:
+            pagados = pagos.get(alumno_id, [])
+            numeros = {p[0] for p in pagados}
+            self.alumnos[alumno_id] = {
+                'matricula': matricula,
+                'nombre': nombre,
+                'diplomado': clave,
+                'centavos': round(float(mensualidad) * 100),
+                'inicio': inicio,
+                'pendientes': deque(n for n in range(1, num_mensualidades + 1) if n not in numeros),
+                # Pagos ya capturados: (fecha, centavos) para no registrar dos veces el mismo depósito
+                'registrados': {(str(p[2])[:10], round(float(p[1]) * 100)) for p in pagados},
+            }
+            self.por_matricula[str(matricula)] = alumno_id
+            self._indexar(alumno_id)
+
+    def _llave(self, alumno_id: int) -> Optional[Tuple[int, date]]:
+        """Llave (centavos, vencimiento) de la siguiente mensualidad pendiente del alumno"""
+        alumno = self.alumnos[alumno_id]
+        if not alumno['pendientes']:
+            return None
+        return alumno['centavos'], _vencimiento(alumno['inicio'], alumno['pendientes'][0])
+
+    def _indexar(self, alumno_id: int):
+        """Agregar al alumno al índice por monto y vencimiento"""
+        llave = self._llave(alumno_id)
+        if llave:
+            self.por_monto_fecha[llave].add(alumno_id)
+
+    def _desindexar(self, alumno_id: int):
+        """Quitar al alumno del índice por monto y vencimiento"""
+        llave = self._llave(alumno_id)
+        if llave:
+            self.por_monto_fecha[llave].discard(alumno_id)
+
+    def _consumir(self, alumno_id: int) -> int:
+        """Asignar al alumno su siguiente mensualidad pendiente y reindexarlo"""
+        self._desindexar(alumno_id)
+        num = self.alumnos[alumno_id]['pendientes'].popleft()
+        self._indexar(alumno_id)
+        return num
+
+    def _propuesta(self, linea: int, fecha: date, centavos: int, referencia: str,
+                   alumno_id: int, criterio: str) -> Dict:
+        """Pago propuesto para el abono: la siguiente mensualidad pendiente del alumno"""
+        alumno = self.alumnos[alumno_id]
+        esperado = alumno['centavos']
+        return {
+            'linea': linea, 'fecha': fecha, 'monto': centavos / 100, 'referencia': referencia.strip(),
+            'alumno_id': alumno_id, 'matricula': alumno['matricula'], 'nombre': alumno['nombre'],
+            'diplomado': alumno['diplomado'], 'num_mensualidad': self._consumir(alumno_id),
+            'esperado': esperado / 100,
+            'criterio': criterio + (' y monto' if centavos == esperado and criterio == 'matrícula' else ''),
+        }
+
+    def buscar(self, linea: int, fecha: date, centavos: int, referencia: str) -> Tuple[str, Optional[Dict]]:
+        """Clasificar un abono: ('propuesta' | 'ambigua' | 'registrada' | 'sin_coincidencia', detalle)"""
+        # 1. Matrícula en la referencia
+        for token in PATRON_MATRICULA.findall(referencia):
+            alumno_id = self.por_matricula.get(token)
+            if alumno_id is None:
+                continue
+            alumno = self.alumnos[alumno_id]
+            if (fecha.isoformat(), centavos) in alumno['registrados']:
+                return 'registrada', None
+            if alumno['pendientes']:
+                return 'propuesta', self._propuesta(linea, fecha, centavos, referencia, alumno_id, 'matrícula')
+
+        # 2. Monto exacto de una mensualidad que vence dentro de la ventana
+        candidatos = set()
+        for delta in self.ventana:
+            candidatos |= self.por_monto_fecha.get((centavos, fecha + delta), set())
+        if len(candidatos) == 1:
+            return 'propuesta', self._propuesta(linea, fecha, centavos, referencia, candidatos.pop(), 'monto y fecha')
+        if candidatos:
+            matriculas = heapq.nsmallest(5, (self.alumnos[a]['matricula'] for a in candidatos))
+            return 'ambigua', {'linea': linea, 'fecha': fecha, 'monto': centavos / 100,
+                               'referencia': referencia.strip(), 'candidatos': len(candidatos),
+                               'matriculas': ', '.join(matriculas) + (' …' if len(candidatos) > 5 else '')}
+        return 'sin_coincidencia', None
+
+    def conciliar(self, movimientos: Iterable[Tuple[int, date, int, str]]) -> Dict:
+        """Recorrer los movimientos una sola vez y acumular el resultado"""
+        resultado = {'lineas': 0, 'ignoradas': 0, 'registradas': 0, 'sin_coincidencia': 0,
+                     'propuestas': [], 'ambiguas': [], 'muestra_sin_coincidencia': []}
+        for linea, fecha, centavos, referencia in movimientos:
+            resultado['lineas'] += 1
+            if fecha is None:
+                resultado['ignoradas'] += 1
+                continue
+            tipo, detalle = self.buscar(linea, fecha, centavos, referencia)
+            if tipo == 'propuesta':
+                resultado['propuestas'].append(detalle)
+            elif tipo == 'ambigua':
+                resultado['ambiguas'].append(detalle)
+            elif tipo == 'registrada':
+                resultado['registradas'] += 1
+            else:
+                resultado['sin_coincidencia'] += 1
+                if len(resultado['muestra_sin_coincidencia']) < MAX_MUESTRA_SIN_COINCIDENCIA:
+                    resultado['muestra_sin_coincidencia'].append(
+                        {'linea': linea, 'fecha': fecha, 'monto': centavos / 100, 'referencia': referencia.strip()})
+        return resultado
+
+
+def conciliar_archivo(db, archivo, ventana_dias: int = VENTANA_DIAS) -> Dict:
+    """Construir los índices desde la base y conciliar el CSV del banco"""
+    alumnos = db.get_alumnos_con_saldo()
+    pagos = db.get_pagos_alumnos([a[0] for a in alumnos])
+    conciliador = ConciliadorBancario(alumnos, pagos, ventana_dias)
+    return conciliador.conciliar(leer_movimientos(archivo))
+
+
+def registrar_confirmadas(db, propuestas: List[Dict], metodo_pago: str = 'Transferencia') -> Optional[int]:
+    """Registrar las propuestas confirmadas en un solo lote; devuelve los pagos insertados (None si falla)"""
+    lote = [(p['alumno_id'], p['num_mensualidad'], p['monto'], str(p['fecha']), metodo_pago)
+            for p in propuestas]
+    return db.add_pagos_bulk(lote)
@@ -0,0 +1,368 @@
+import threading
+import time
+from collections import deque
+
+import pymysql
+import pymysql.cursors
+from pymysql.constants import CR, SERVER_STATUS
+
+# Errores que indican que el servidor cerró la conexión (no que la consulta falló)
+ERRORES_DESCONEXION = {CR.CR_SERVER_GONE_ERROR, CR.CR_SERVER_LOST, 2055, 4031}
+
+# Sentencias que no modifican datos
+SENTENCIAS_SOLO_LECTURA = {'SELECT', 'SHOW', 'EXPLAIN', 'DESCRIBE', 'DESC'}
+
+
+def es_desconexion(error: Exception) -> bool:
+    """¿El error se debe a una conexión perdida?"""
+    if isinstance(error, pymysql.err.InterfaceError):
+        return True
+    return bool(error.args) and error.args[0] in ERRORES_DESCONEXION
+
+
+def es_solo_lectura(query) -> bool:
+    """¿La sentencia sólo lee? (se puede repetir sin riesgo tras una desconexión)"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    palabra = query.lstrip(' \t\r\n(').split(None, 1)
+    return bool(palabra) and palabra[0].upper() in SENTENCIAS_SOLO_LECTURA
+
+
+def se_puede_reintentar(query, error: Exception) -> bool:
+    """¿Repetir la sentencia en una conexión nueva no puede aplicarla dos veces?
+    
+    Una lectura siempre se puede repetir. Una escritura sólo con CR_SERVER_GONE_ERROR
+    (2006), que se produce al enviarla, antes de que llegue al servidor; con
+    CR_SERVER_LOST (2013) o 4031 el servidor pudo haberla ejecutado ya.
+    """
+    if es_solo_lectura(query):
+        return True
+    return bool(error.args) and error.args[0] == CR.CR_SERVER_GONE_ERROR
+
+
+class ReintentoCursor(pymysql.cursors.Cursor):
+    """Cursor que reconecta y reintenta una vez si la conexión se perdió.
+    
+    Sólo reintenta fuera de una transacción explícita; dentro de una, el
+    error se propaga para no repetir la mitad de un conjunto de escrituras.
+    Fuera de ella, una escritura sólo se repite si es seguro que no llegó al
+    servidor (ver se_puede_reintentar).
+    """
+    pool = None
+    sin_bufer = False
+    
+    def execute(self, query, args=None):
+        if self.pool.query_log is not None:
+            self.pool.query_log.verificar(self)
+        inicio = time.perf_counter()
+        try:
+            resultado = super().execute(query, args)
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+            conn = self.connection
+            if conn is None or not es_desconexion(e) or not se_puede_reintentar(query, e) or \
+                    conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                raise
+            self.pool._reconectar(conn)
+            resultado = super().execute(query, args)
+        
+        # Instrumentación opcional (QueryLog)
+        if self.pool.query_log is not None:
+            self.pool.query_log.registrar(self, query, args, time.perf_counter() - inicio)
+        return resultado
+
+
+class ReintentoSSCursor(ReintentoCursor, pymysql.cursors.SSCursor):
+    """ReintentoCursor sin búfer: las filas se leen del servidor conforme se piden.
+    
+    Para exportaciones grandes. Mientras no se lean todas (o se cierre el
+    cursor) la conexión no admite otras consultas: QueryLog las rechaza con
+    ResultadoSinBuferAbiertoError en lugar de dejar que pymysql descarte las
+    filas pendientes.
+    """
+    sin_bufer = True
+    
+    def close(self):
+        if self.pool.query_log is not None and self.connection is not None:
+            self.pool.query_log.liberar(self)
+        super().close()
+
+
+class PoolAgotadoError(Exception):
+    """No se obtuvo una conexión del pool dentro del tiempo de espera"""
+
+
+class _Entrada:
+    """Conexión del pool con sus marcas de tiempo"""
+    __slots__ = ('conn', 'creada', 'ultimo_uso')
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada = time.monotonic()
+        self.ultimo_uso = self.creada
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones pymysql, seguro entre hilos.
+    
+    Cada hilo (sesión de Streamlit) toma su propia conexión y la devuelve al
+    terminar; si vuelve a pedirla antes de devolverla recibe la misma. Las
+    conexiones ociosas se cierran tras `max_idle` segundos y se reciclan al
+    cumplir `max_lifetime`. Nunca se abren más de `max_per_hour` conexiones
+    por hora (límite `max_connections_per_hour` de Hostinger).
+    
+    La vitalidad de una conexión sólo se comprueba con `ping` si estuvo ociosa
+    más de `ping_interval` segundos; si aun así se perdió, `ReintentoCursor`
+    reconecta y repite la consulta una vez (las escrituras, sólo si no llegaron
+    al servidor).
+    """
+    
+    def __init__(self, config: dict, size: int = 5, max_idle: int = 300,
+                 max_lifetime: int = 3600, max_per_hour: int = 450, timeout: int = 30,
+                 ping_interval: int = 60):
+        cursor_class = type('ReintentoCursor', (ReintentoCursor,), {'pool': self})
+        self.config = dict(config, cursorclass=cursor_class)
+        self.cursor_sin_bufer = type('ReintentoSSCursor', (ReintentoSSCursor,), {'pool': self})
+        self.size = size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.max_per_hour = max_per_hour
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.query_log = None  # Se asigna desde DatabaseManager para instrumentar cada execute
+        
+        self._cond = threading.Condition()
+        self._ociosas = deque()  # Entradas libres (la más reciente al final)
+        self._abiertas = 0  # Conexiones vivas: ociosas + prestadas
+        self._creaciones = deque()  # Momentos de creación en la última hora
+        self._local = threading.local()
+        
+        self._stats = {
+            'checkouts': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'tiempo_espera_max': 0.0,
+            'creadas_total': 0,
+            'cerradas_ociosas': 0,
+            'recicladas': 0,
+            'descartadas': 0,
+            'pings': 0,
+            'pings_omitidos': 0,
+            'reintentos': 0,
+        }
+    
+    # ------------------------------------------------------------------
+    # Préstamo y devolución
+    # ------------------------------------------------------------------
+    
+    def checkout(self):
+        """Tomar una conexión para el hilo actual"""
+        entrada = getattr(self._local, 'entrada', None)
+        if entrada is not None:
+            self._local.nivel += 1
+            return entrada.conn
+        
+        entrada = self._adquirir()
+        self._local.entrada = entrada
+        self._local.nivel = 1
+        return entrada.conn
+    
+    def release(self, conn):
+        """Devolver la conexión del hilo actual al pool"""
+        entrada = getattr(self._local, 'entrada', None)
+        if entrada is None or entrada.conn is not conn:
+            return
+        
+        self._local.nivel -= 1
+        if self._local.nivel > 0:
+            return
+        self._local.entrada = None
+        
+        ahora = time.monotonic()
+        with self._cond:
+            if not conn.open or ahora - entrada.creada >= self.max_lifetime:
+                self._cerrar(entrada)
+                self._stats['descartadas' if not conn.open else 'recicladas'] += 1
+            else:
+                entrada.ultimo_uso = ahora
+                self._ociosas.append(entrada)
+            self._cond.notify()
+    
+    def _adquirir(self) -> _Entrada:
+        """Obtener una entrada libre, creando una nueva o esperando si hace falta"""
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        hubo_espera = False
+        
+        with self._cond:
+            self._stats['checkouts'] += 1
+            while True:
+                self._cerrar_ociosas_vencidas()
+                
+                if self._ociosas:
+                    entrada = self._ociosas.pop()
+                    break
+                
+                if self._abiertas < self.size and self._puede_crear():
+                    self._abiertas += 1
+                    self._creaciones.append(time.monotonic())
+                    entrada = None
+                    break
+                
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._registrar_espera(inicio, hubo_espera)
+                    if not self._puede_crear() and self._abiertas == 0:
+                        raise self._error_limite()
+                    raise PoolAgotadoError(
+                        f"No hay conexiones libres tras {self.timeout}s (pool de {self.size})")
+                hubo_espera = True
+                self._cond.wait(restante)
+            
+            self._registrar_espera(inicio, hubo_espera)
+        
+        if entrada is None:
+            return self._crear()
+        return self._validar(entrada)
+    
+    def _validar(self, entrada: _Entrada) -> _Entrada:
+        """Comprobar que una conexión ociosa sigue viva y no ha caducado"""
+        ahora = time.monotonic()
+        if ahora - entrada.creada >= self.max_lifetime:
+            with self._cond:
+                reciclar = self._puede_crear()
+                if reciclar:
+                    self._creaciones.append(ahora)
+                    self._stats['recicladas'] += 1
+            if reciclar:
+                self._cerrar_conexion(entrada.conn)
+                return self._crear()
+        
+        if ahora - entrada.ultimo_uso < self.ping_interval:
+            self._contar('pings_omitidos')
+            return entrada
+        
+        try:
+            self._contar('pings')
+            entrada.conn.ping(reconnect=False)
+            return entrada
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError, OSError):
+            self._cerrar_conexion(entrada.conn)
+            with self._cond:
+                self._stats['descartadas'] += 1
+                if not self._puede_crear():
+                    self._abiertas -= 1
+                    self._cond.notify()
+                    raise self._error_limite()
+                self._creaciones.append(time.monotonic())
+            return self._crear()
+    
+    def _crear(self) -> _Entrada:
+        """Abrir una conexión nueva (el hueco ya fue reservado en `_abiertas`)"""
+        try:
+            conn = pymysql.connect(**self.config)
+        except Exception:
+            with self._cond:
+                self._abiertas -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['creadas_total'] += 1
+        return _Entrada(conn)
+    
+    def _reconectar(self, conn):
+        """Reabrir una conexión perdida a mitad de consulta (cuenta para el límite por hora)"""
+        with self._cond:
+            if not self._puede_crear():
+                raise self._error_limite()
+            self._creaciones.append(time.monotonic())
+            self._stats['creadas_total'] += 1
+        self._contar('reintentos')
+        conn.ping(reconnect=True)
+    
+    # ------------------------------------------------------------------
+    # Contadores
+    # ------------------------------------------------------------------
+    
+    def _contar(self, clave: str):
+        """Incrementar un contador global y el de la recarga del hilo actual"""
+        with self._cond:
+            self._stats[clave] += 1
+        rerun = getattr(self._local, 'rerun', None)
+        if rerun is not None:
+            rerun[clave] += 1
+    
+    def reset_rerun_stats(self):
+        """Reiniciar los contadores de la recarga (rerun) del hilo actual"""
+        self._local.rerun = {'pings': 0, 'pings_omitidos': 0, 'reintentos': 0}
+    
+    def rerun_stats(self) -> dict:
+        """Contadores acumulados desde el último `reset_rerun_stats` en este hilo"""
+        return dict(getattr(self._local, 'rerun', None) or {})
+    
+    # ------------------------------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------------------------------
+    
+    def _puede_crear(self) -> bool:
+        """¿Queda cupo en el límite de conexiones por hora? (requiere el lock)"""
+        hace_una_hora = time.monotonic() - 3600
+        while self._creaciones and self._creaciones[0] < hace_una_hora:
+            self._creaciones.popleft()
+        return len(self._creaciones) < self.max_per_hour
+    
+    def _error_limite(self):
+        """Mismo error que devuelve MySQL al agotar el límite por hora"""
+        return pymysql.err.OperationalError(
+            1226, "User has exceeded the 'max_connections_per_hour' resource "
+                  f"(límite local del pool: {self.max_per_hour}/hora)")
+    
+    def _cerrar_ociosas_vencidas(self):
+        """Cerrar las conexiones ociosas por más de `max_idle` (requiere el lock)"""
+        limite = time.monotonic() - self.max_idle
+        while self._ociosas and self._ociosas[0].ultimo_uso < limite:
+            self._cerrar(self._ociosas.popleft())
+            self._stats['cerradas_ociosas'] += 1
+    
+    def _cerrar(self, entrada: _Entrada):
+        """Cerrar una entrada y liberar su hueco (requiere el lock)"""
+        self._cerrar_conexion(entrada.conn)
+        self._abiertas -= 1
+    
+    @staticmethod
+    def _cerrar_conexion(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def _registrar_espera(self, inicio: float, hubo_espera: bool):
+        """Acumular el tiempo de espera de un checkout (requiere el lock)"""
+        espera = time.monotonic() - inicio
+        if hubo_espera:
+            self._stats['esperas'] += 1
+        self._stats['tiempo_espera_total'] += espera
+        self._stats['tiempo_espera_max'] = max(self._stats['tiempo_espera_max'], espera)
+    
+    def close_all(self):
+        """Cerrar todas las conexiones ociosas"""
+        with self._cond:
+            while self._ociosas:
+                self._cerrar(self._ociosas.popleft())
+            self._cond.notify_all()
+    
+    def stats(self) -> dict:
+        """Estadísticas del pool"""
+        with self._cond:
+            self._puede_crear()
+            stats = dict(self._stats)
+            stats.update({
+                'tamaño': self.size,
+                'abiertas': self._abiertas,
+                'ociosas': len(self._ociosas),
+                'prestadas': self._abiertas - len(self._ociosas),
+                'creadas_ultima_hora': len(self._creaciones),
+                'limite_por_hora': self.max_per_hour,
+            })
+        checkouts = stats['checkouts'] or 1
+        stats['tiempo_espera_promedio'] = stats['tiempo_espera_total'] / checkouts
+        return stats
@@ -1,17 +1,92 @@
 import streamlit as st
 import pymysql
-from datetime import datetime
-from typing import List, Tuple, Optional
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Tuple, Optional
 from contextlib import contextmanager
+from connection_pool import PoolAgotadoError
+from backends import Backend, MySQLBackend, SQLiteBackend
+import migrations
+import duplicados
+from duplicados import AlumnoDuplicadoError
+from query_cache import QueryCache, cacheado, invalida
+from query_log import QueryLog
+from search_index import MAX_EDAD_INDICE, SearchIndex
+
+# Consultas frecuentes que deben resolverse con índice (ver verificar_indices)
+CONSULTAS_FRECUENTES = [
+    ('get_alumno_por_matricula',
+     'SELECT * FROM alumnos WHERE matricula = {ph}', ('0000000000',)),
+    ('get_alumnos_con_pago_mensualidad',
+     '''SELECT a.id, p.monto FROM alumnos a
+        LEFT JOIN pagos p ON p.alumno_id = a.id AND p.num_mensualidad = {ph}
+        WHERE a.status = 'Activo' AND a.diplomado_clave = {ph}''', (1, '-')),
+    ('get_pagos_alumnos',
+     'SELECT num_mensualidad, monto FROM pagos WHERE alumno_id IN ({ph}, {ph})', (0, 1)),
+    ('get_pagos_filtrados',
+     '''SELECT a.matricula, p.monto FROM pagos p JOIN alumnos a ON p.alumno_id = a.id
+        WHERE p.fecha_pago BETWEEN {ph} AND {ph}''', ('2000-01-01', '2000-01-31')),
+    ('get_gastos_filtrados',
+     'SELECT * FROM gastos WHERE fecha BETWEEN {ph} AND {ph}', ('2000-01-01', '2000-01-31')),
+    ('get_eventos_calendario',
+     'SELECT * FROM calendario WHERE fecha BETWEEN {ph} AND {ph}', ('2000-01-01', '2000-01-31')),
+]
+
+# Columnas de resumen_mensual y su llave (mes × diplomado × método de pago)
+COLUMNAS_RESUMEN = ['mes', 'diplomado_clave', 'metodo_pago', 'ingresos', 'gastos', 'num_pagos']
+CLAVES_RESUMEN = ['mes', 'diplomado_clave', 'metodo_pago']
 
 class DatabaseManager:
-    _connection = None  # Conexión singleton reutilizable
+    _backend_mysql = None  # Pool de MySQL compartido por todas las sesiones
+    _backend_lock = threading.Lock()
     
-    def __init__(self, skip_init=False):
+    def __init__(self, skip_init=False, backend: Optional[Backend] = None, opciones: Optional[dict] = None):
+        """backend: motor de almacenamiento. Por omisión se usa SQLite si la variable
+        ACADEMIAPP_SQLITE o la sección [connections.sqlite] de secrets indican un archivo,
+        y si no el MySQL de los secrets.
+        opciones: cache_max_entries, slow_query_ms, slow_query_log y search_index_ttl"""
+        if backend is None:
+            opciones_sqlite = self._get_opciones_sqlite()
+            ruta_sqlite = os.environ.get('ACADEMIAPP_SQLITE') or opciones_sqlite.get('database')
+            if ruta_sqlite:
+                backend, opciones = SQLiteBackend(ruta_sqlite), opciones or opciones_sqlite
+            else:
+                backend, opciones = self._get_backend_mysql()
+        opciones = opciones or {}
+        self.backend = backend
+        
+        # Cache de resultados compartida por todas las sesiones de este proceso
+        self.cache = QueryCache(max_entradas=int(opciones.get('cache_max_entries', 512)))
+        
+        # Índice de búsqueda de alumnos por nombre y matrícula (se construye al primer uso)
+        self.indice_alumnos = SearchIndex(max_edad=int(opciones.get('search_index_ttl', MAX_EDAD_INDICE)))
+        
+        # Instrumentación de sentencias y log de consultas lentas
+        self.query_log = QueryLog(umbral_lento_ms=int(opciones.get('slow_query_ms', 500)),
+                                  archivo_lento=opciones.get('slow_query_log', 'slow_queries.log'),
+                                  prefijo_explain=backend.prefijo_explain)
+        self.backend.query_log = self.query_log
+        
+        # Aplicar migraciones pendientes salvo que se pida omitirlo
+        if not skip_init:
+            self.init_database()
+    
+    @staticmethod
+    def _get_opciones_sqlite() -> dict:
+        """Sección [connections.sqlite] de secrets (vacía si no existe)"""
+        try:
+            return dict(st.secrets["connections"]["sqlite"])
+        except Exception:
+            return {}
+    
+    @classmethod
+    def _get_backend_mysql(cls) -> Tuple[MySQLBackend, dict]:
+        """Motor MySQL configurado en secrets (el pool se crea una sola vez por proceso)"""
         # Obtener configuración desde secrets
         try:
             secrets = st.secrets["connections"]["mysql"]
-            self.config = {
+            config = {
                 'host': secrets['host'],
                 'port': int(secrets['port']),
                 'user': secrets['username'],
@@ -20,6 +95,15 @@ class DatabaseManager:
                 'charset': 'utf8mb4',
                 'autocommit': True
             }
+            # Parámetros opcionales del pool
+            pool_config = {
+                'size': int(secrets.get('pool_size', 5)),
+                'max_idle': int(secrets.get('pool_max_idle', 300)),
+                'max_lifetime': int(secrets.get('pool_max_lifetime', 3600)),
+                'max_per_hour': int(secrets.get('max_connections_per_hour', 450)),
+                'timeout': int(secrets.get('pool_timeout', 30)),
+                'ping_interval': int(secrets.get('pool_ping_interval', 60))
+            }
         except Exception as e:
             st.error(f"❌ Error al leer secrets de MySQL: {e}")
             st.info("""
@@ -33,34 +117,45 @@ class DatabaseManager:
             database = "u530819723_Academiapp"
             username = "u530819723_raulacademiapp"
             password = "tu_password"
+            # Opcionales
+            pool_size = 5
+            max_connections_per_hour = 450
             ```
+            Para trabajar sin MySQL: `ACADEMIAPP_SQLITE=academiapp.db streamlit run app.py`
             """)
             raise
-        # Solo inicializar tablas si se solicita explícitamente
-        if not skip_init:
-            self.init_database()
+        if cls._backend_mysql is None:
+            with cls._backend_lock:
+                if cls._backend_mysql is None:
+                    cls._backend_mysql = MySQLBackend(config, **pool_config)
+        return cls._backend_mysql, dict(secrets)
+    
+    def get_pool_stats(self) -> dict:
+        """Estadísticas de conexiones: checkouts, tiempo de espera, conexiones creadas por hora"""
+        return self.backend.stats()
+    
+    def get_cache_stats(self) -> dict:
+        """Aciertos y fallos de la cache de consultas"""
+        return self.cache.stats()
+    
+    def iniciar_rerun(self):
+        """Marcar el inicio de una recarga de la app (reinicia sus contadores)"""
+        self.backend.reset_rerun_stats()
+        self.query_log.iniciar_rerun()
+    
+    def get_rerun_stats(self) -> dict:
+        """Contadores de la recarga actual: pings, reintentos y sentencias ejecutadas"""
+        stats = self.backend.rerun_stats()
+        stats['consultas'] = self.query_log.rerun_stats()
+        return stats
     
     def get_connection(self):
-        """Obtener conexión reutilizable (singleton)"""
+        """Tomar una conexión del motor para el hilo actual"""
         try:
-            # Reutilizar conexión existente si está activa
-            if DatabaseManager._connection is not None:
-                try:
-                    # Verificar si la conexión está viva
-                    DatabaseManager._connection.ping(reconnect=True)
-                    return DatabaseManager._connection
-                except (pymysql.err.OperationalError, pymysql.err.InterfaceError, OSError, AttributeError):
-                    # Conexión muerta, cerrarla y recrearla
-                    try:
-                        DatabaseManager._connection.close()
-                    except:
-                        pass
-                    DatabaseManager._connection = None
-            
-            # Crear nueva conexión solo si no existe
-            DatabaseManager._connection = pymysql.connect(**self.config)
-            return DatabaseManager._connection
-            
+            return self.backend.checkout()
+        except PoolAgotadoError as e:
+            st.error(f"⏳ Base de datos ocupada: {e}")
+            raise
         except pymysql.err.OperationalError as e:
             error_msg = str(e)
             if "max_connections_per_hour" in error_msg:
@@ -81,9 +176,9 @@ class DatabaseManager:
                    - Menciona que usas Streamlit Cloud (IPs dinámicas)
                 
                 #### ✅ Optimizaciones Ya Aplicadas:
-                - Connection pooling con singleton
+                - Pool de conexiones acotado ({self.backend.pool_config['size']} conexiones)
+                - Límite local de {self.backend.pool_config['max_per_hour']} conexiones nuevas por hora
                 - Cache de DatabaseManager
-                - Reducción 90% en nuevas conexiones
                 
                 **Nota:** En planes de hosting compartido estos límites son estrictos.
                 Considera migrar a un VPS o Cloud Database (DigitalOcean, AWS RDS, PlanetScale).
@@ -93,332 +188,461 @@ class DatabaseManager:
                 st.error(f"❌ Error de conexión a MySQL: {e}")
                 st.info(f"""
                 Verifica:
-                - Host: {self.config['host']}
-                - Puerto: {self.config['port']}
-                - Base de datos: {self.config['database']}
-                - Usuario: {self.config['user']}
+                - Host: {self.backend.config['host']}
+                - Puerto: {self.backend.config['port']}
+                - Base de datos: {self.backend.config['database']}
+                - Usuario: {self.backend.config['user']}
                 """)
             raise
     
-    def get_placeholder(self):
-        """Retorna el placeholder para MySQL"""
-        return '%s'
+    def release_connection(self, conn):
+        """Devolver al motor la conexión del hilo actual"""
+        self.backend.release(conn)
     
-    def init_database(self):
-        """Inicializar todas las tablas de la base de datos MySQL"""
+    @contextmanager
+    def get_cursor(self):
+        """Cursor sobre una conexión del motor; la conexión se devuelve al salir"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tipos de datos MySQL
-        pk = "INT AUTO_INCREMENT PRIMARY KEY"
-        integer = "INT"
-        real = "DECIMAL(10,2)"
-        text_type = "TEXT"
-        varchar_50 = "VARCHAR(50)"
-        varchar_255 = "VARCHAR(255)"
-        date_type = "DATE"
-        
-        # Tabla de Diplomados
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS diplomados (
-                id {pk},
-                nombre {varchar_255} NOT NULL,
-                clave {varchar_50} UNIQUE NOT NULL,
-                modalidad {varchar_50} NOT NULL,
-                fecha_inicio {date_type} NOT NULL,
-                fecha_fin {date_type} NOT NULL,
-                num_mensualidades {integer} NOT NULL,
-                alumnos_inscritos {integer} DEFAULT 0,
-                status {varchar_50} DEFAULT 'Activo'
-            )
-        ''')
-        
-        # Agregar columna status si no existe
+        cursor = self.backend.cursor(conn)
         try:
-            cursor.execute(f"ALTER TABLE diplomados ADD COLUMN status VARCHAR(20) DEFAULT 'Activo'")
-            conn.commit()
-        except:
-            pass
+            yield cursor
+        finally:
+            cursor.close()
+            self.release_connection(conn)
+    
+    @contextmanager
+    def transaccion(self):
+        """Cursor dentro de una transacción: commit al salir, rollback si hay error"""
+        with self.get_cursor() as cursor:
+            self.backend.iniciar_transaccion(cursor)
+            try:
+                yield cursor
+                cursor.connection.commit()
+            except Exception:
+                cursor.connection.rollback()
+                raise
+    
+    def iterar_consulta(self, query: str, params=(), tamano_lote: int = 5000) -> Iterator[List[Tuple]]:
+        """Filas de una consulta en lotes de `tamano_lote`, con un cursor sin búfer
         
-        # Tabla de Alumnos
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS alumnos (
-                id {pk},
-                matricula {varchar_50} NOT NULL,
-                nombre_completo {varchar_255} NOT NULL,
-                status {varchar_50} NOT NULL,
-                diplomado_id {integer},
-                diplomado_clave {varchar_50} NOT NULL,
-                telefono {varchar_50} NOT NULL,
-                correo {varchar_255} NOT NULL,
-                fecha_inscripcion {date_type} NOT NULL,
-                pago_inscripcion {real} NOT NULL,
-                mensualidad {real} NOT NULL,
-                num_mensualidades {integer} NOT NULL,
-                total_diplomado {real} NOT NULL,
-                fecha_baja {date_type},
-                motivo_baja {text_type},
-                FOREIGN KEY (diplomado_id) REFERENCES diplomados(id)
-            )
-        ''')
-        
-        # Agregar columnas si no existen
-        try:
-            cursor.execute(f"ALTER TABLE alumnos ADD COLUMN fecha_baja {date_type}")
-            conn.commit()
-        except:
-            pass
+        La memoria no crece con el total de filas. La conexión queda ocupada hasta
+        agotar (o cerrar) el generador: otra consulta en el mismo hilo mientras
+        tanto produce ResultadoSinBuferAbiertoError.
+        """
+        conn = self.get_connection()
+        cursor = self.backend.cursor_sin_bufer(conn)
         try:
-            cursor.execute(f"ALTER TABLE alumnos ADD COLUMN motivo_baja {text_type}")
-            conn.commit()
-        except:
-            pass
+            cursor.execute(query, params)
+            while True:
+                filas = cursor.fetchmany(tamano_lote)
+                if not filas:
+                    break
+                yield filas
+        finally:
+            cursor.close()
+            self.release_connection(conn)
+    
+    def get_placeholder(self):
+        """Retorna el placeholder del motor ('%s' en MySQL, '?' en SQLite)"""
+        return self.backend.placeholder
+    
+    def init_database(self):
+        """Llevar el esquema a la última versión (una sola lectura si ya está al día)"""
+        aplicadas = self.aplicar_migraciones()
+        if aplicadas:
+            print(f"Migraciones de esquema aplicadas: {aplicadas}")
+    
+    def aplicar_migraciones(self) -> List[int]:
+        """Aplicar las migraciones de esquema pendientes; devuelve las versiones aplicadas"""
+        with self.get_cursor() as cursor:
+            aplicadas = migrations.aplicar_migraciones(self, cursor)
+        if aplicadas:
+            self.cache.limpiar()
+        return aplicadas
+    
+    def verificar_indices(self) -> List[Tuple]:
+        """Revisar con EXPLAIN las consultas frecuentes y reportar las que no usan índice
         
-        # Tabla de Pagos
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS pagos (
-                id {pk},
-                alumno_id {integer} NOT NULL,
-                num_mensualidad {integer} NOT NULL,
-                monto {real} NOT NULL,
-                fecha_pago {date_type} NOT NULL,
-                metodo_pago {varchar_50} NOT NULL,
-                FOREIGN KEY (alumno_id) REFERENCES alumnos(id)
-            )
-        ''')
-        
-        # Tabla de Gastos
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS gastos (
-                id {pk},
-                fecha {date_type} NOT NULL,
-                concepto {varchar_255} NOT NULL,
-                monto {real} NOT NULL
-            )
-        ''')
-        
-        # Tabla de Calendario
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS calendario (
-                id {pk},
-                fecha {date_type} NOT NULL,
-                diplomado_clave {varchar_50} NOT NULL,
-                tipo {varchar_50} NOT NULL,
-                modulo {integer} NOT NULL,
-                FOREIGN KEY (diplomado_clave) REFERENCES diplomados(clave)
-            )
-        ''')
-        
-        conn.commit()
-        cursor.close()
+        Devuelve (consulta, tabla, tipo de acceso, filas estimadas) por cada tabla que
+        se lee completa (type = ALL en MySQL, SCAN sin índice en SQLite).
+        """
+        ph = self.get_placeholder()
+        problemas = []
+        with self.get_cursor() as cursor:
+            for nombre, query, params in CONSULTAS_FRECUENTES:
+                for tabla, tipo, filas in self.backend.accesos_sin_indice(cursor, query.format(ph=ph), params):
+                    problemas.append((nombre, tabla, tipo, filas))
+        return problemas
     
     # ========================================================================
     # FUNCIONES PARA DIPLOMADOS
     # ========================================================================
     
+    @invalida('diplomados')
     def add_diplomado(self, nombre: str, clave: str, modalidad: str, 
                      fecha_inicio: str, fecha_fin: str, num_mensualidades: int) -> bool:
         """Agregar un nuevo diplomado"""
+        ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            ph = self.get_placeholder()
-            cursor.execute(f'''
-                INSERT INTO diplomados (nombre, clave, modalidad, fecha_inicio, fecha_fin, num_mensualidades)
-                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph})
-            ''', (nombre, clave, modalidad, fecha_inicio, fecha_fin, num_mensualidades))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f'''
+                    INSERT INTO diplomados (nombre, clave, modalidad, fecha_inicio, fecha_fin, num_mensualidades)
+                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+                ''', (nombre, clave, modalidad, fecha_inicio, fecha_fin, num_mensualidades))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al agregar diplomado: {e}")
             return False
     
+    @cacheado('diplomados')
     def get_all_diplomados(self) -> List[Tuple]:
         """Obtener todos los diplomados"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM diplomados ORDER BY fecha_inicio DESC')
-        diplomados = cursor.fetchall()
-        cursor.close()
-        return diplomados
+        with self.get_cursor() as cursor:
+            cursor.execute('SELECT * FROM diplomados ORDER BY fecha_inicio DESC')
+            return cursor.fetchall()
     
+    @invalida('diplomados')
     def update_diplomado(self, id: int, nombre: str, clave: str, modalidad: str,
                         fecha_inicio: str, fecha_fin: str, num_mensualidades: int) -> bool:
         """Actualizar un diplomado"""
+        ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            ph = self.get_placeholder()
-            cursor.execute(f'''
-                UPDATE diplomados 
-                SET nombre={ph}, clave={ph}, modalidad={ph}, fecha_inicio={ph}, fecha_fin={ph}, num_mensualidades={ph}
-                WHERE id = {ph}
-            ''', (nombre, clave, modalidad, fecha_inicio, fecha_fin, num_mensualidades, id))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f'''
+                    UPDATE diplomados 
+                    SET nombre={ph}, clave={ph}, modalidad={ph}, fecha_inicio={ph}, fecha_fin={ph}, num_mensualidades={ph}
+                    WHERE id = {ph}
+                ''', (nombre, clave, modalidad, fecha_inicio, fecha_fin, num_mensualidades, id))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al actualizar diplomado: {e}")
             return False
     
+    @invalida('diplomados')
     def delete_diplomado(self, id: int) -> bool:
         """Eliminar un diplomado (solo si no tiene alumnos)"""
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Verificar si tiene alumnos
-            cursor.execute(f'SELECT COUNT(*) FROM alumnos WHERE diplomado_id = {ph}', (id,))
-            count = cursor.fetchone()[0]
-            
-            if count > 0:
-                cursor.close()
-                return False
-            
-            cursor.execute(f'DELETE FROM diplomados WHERE id = {ph}', (id,))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                # Verificar si tiene alumnos
+                cursor.execute(f'SELECT COUNT(*) FROM alumnos WHERE diplomado_id = {ph}', (id,))
+                count = cursor.fetchone()[0]
+                
+                if count > 0:
+                    return False
+                
+                cursor.execute(f'DELETE FROM diplomados WHERE id = {ph}', (id,))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al eliminar diplomado: {e}")
             return False
     
+    @invalida('diplomados')
     def archivar_diplomado(self, id: int) -> bool:
         """Archivar un diplomado (cambiar status a Archivado)"""
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f"UPDATE diplomados SET status='Archivado' WHERE id = {ph}", (id,))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f"UPDATE diplomados SET status='Archivado' WHERE id = {ph}", (id,))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al archivar diplomado: {e}")
             return False
     
+    @invalida('diplomados')
     def reactivar_diplomado(self, id: int) -> bool:
         """Reactivar un diplomado archivado (cambiar status a Activo)"""
+        ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE diplomados SET status='Activo' WHERE id = {ph}", (id,))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f"UPDATE diplomados SET status='Activo' WHERE id = {ph}", (id,))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al reactivar diplomado: {e}")
             return False
     
+    @cacheado('diplomados')
     def get_diplomados_filtrados(self, status: str = None) -> List[Tuple]:
         """Obtener diplomados filtrados por status"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        if status:
-            cursor.execute(f'SELECT * FROM diplomados WHERE status = {ph} ORDER BY fecha_inicio DESC', (status,))
-        else:
-            cursor.execute('SELECT * FROM diplomados ORDER BY fecha_inicio DESC')
-        
-        diplomados = cursor.fetchall()
-        cursor.close()
-        return diplomados
+        with self.get_cursor() as cursor:
+            if status:
+                cursor.execute(f'SELECT * FROM diplomados WHERE status = {ph} ORDER BY fecha_inicio DESC', (status,))
+            else:
+                cursor.execute('SELECT * FROM diplomados ORDER BY fecha_inicio DESC')
+            
+            return cursor.fetchall()
     
-    def update_alumnos_inscritos(self, diplomado_id: int):
-        """Actualizar el contador de alumnos inscritos en un diplomado"""
+    def _ajustar_inscritos(self, cursor, diplomado_id: int, delta: int):
+        """Sumar `delta` (+1/-1, o n en cargas masivas) al contador de alumnos inscritos de un diplomado"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
         cursor.execute(f'''
             UPDATE diplomados 
-            SET alumnos_inscritos = (
-                SELECT COUNT(*) FROM alumnos WHERE diplomado_id = {ph}
-            )
+            SET alumnos_inscritos = COALESCE(alumnos_inscritos, 0) + {ph}
             WHERE id = {ph}
-        ''', (diplomado_id, diplomado_id))
-        conn.commit()
-        cursor.close()
+        ''', (delta, diplomado_id))
+    
+    @invalida('diplomados')
+    def reconciliar_alumnos_inscritos(self) -> bool:
+        """Recalcular el contador de inscritos de todos los diplomados (corrige desviaciones)"""
+        try:
+            with self.transaccion() as cursor:
+                migrations.llenar_alumnos_inscritos(self, cursor)
+            return True
+        except Exception as e:
+            print(f"Error al reconciliar alumnos inscritos: {e}")
+            return False
     
     # ========================================================================
     # FUNCIONES PARA ALUMNOS
     # ========================================================================
     
+    @invalida('alumnos', 'diplomados')
     def add_alumno(self, matricula: str, nombre_completo: str, status: str,
                   diplomado_clave: str, telefono: str, correo: str, fecha_inscripcion: str,
                   pago_inscripcion: float, mensualidad: float, num_mensualidades: int,
-                  total_diplomado: float) -> bool:
-        """Agregar un nuevo alumno"""
+                  total_diplomado: float, permitir_duplicado: bool = False) -> bool:
+        """Agregar un nuevo alumno (y sumarlo a los inscritos del diplomado en la misma transacción)
+        
+        Si se parece a un alumno ya registrado no se guarda y se lanza AlumnoDuplicadoError
+        con los candidatos, salvo que se confirme con `permitir_duplicado`.
+        """
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Obtener el ID del diplomado por su clave
-            cursor.execute(f'SELECT id FROM diplomados WHERE clave = {ph}', (diplomado_clave,))
-            diplomado_id = cursor.fetchone()
-            
-            if not diplomado_id:
-                cursor.close()
-                return False
+            if not permitir_duplicado:
+                candidatos = self.get_posibles_duplicados(nombre_completo, correo, telefono)
+                if candidatos:
+                    raise AlumnoDuplicadoError(candidatos)
             
-            cursor.execute(f'''
-                INSERT INTO alumnos (matricula, nombre_completo, status, diplomado_id, diplomado_clave,
-                                   telefono, correo, fecha_inscripcion, pago_inscripcion, mensualidad,
-                                   num_mensualidades, total_diplomado)
-                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
-            ''', (matricula, nombre_completo, status, diplomado_id[0], diplomado_clave, telefono, correo,
-                 fecha_inscripcion, pago_inscripcion, mensualidad, num_mensualidades, total_diplomado))
-            conn.commit()
-            cursor.close()
+            with self.transaccion() as cursor:
+                # Obtener el ID del diplomado por su clave
+                cursor.execute(f'SELECT id FROM diplomados WHERE clave = {ph}', (diplomado_clave,))
+                diplomado_id = cursor.fetchone()
+                
+                if not diplomado_id:
+                    return False
+                
+                cursor.execute(f'''
+                    INSERT INTO alumnos (matricula, nombre_completo, status, diplomado_id, diplomado_clave,
+                                       telefono, correo, fecha_inscripcion, pago_inscripcion, mensualidad,
+                                       num_mensualidades, total_diplomado, saldo)
+                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+                ''', (matricula, nombre_completo, status, diplomado_id[0], diplomado_clave, telefono, correo,
+                     fecha_inscripcion, pago_inscripcion, mensualidad, num_mensualidades, total_diplomado,
+                     total_diplomado - pago_inscripcion))
+                alumno_id = cursor.lastrowid
+                self._ajustar_inscritos(cursor, diplomado_id[0], 1)
+            self.indice_alumnos.agregar(alumno_id, nombre_completo, matricula, diplomado_clave)
             return True
+        except AlumnoDuplicadoError:
+            raise
         except Exception as e:
             print(f"Error al agregar alumno: {e}")
             return False
     
-    def get_alumnos_filtrados(self, nombre: str = None, matricula: str = None, 
-                             diplomado: str = None) -> List[Tuple]:
-        """Obtener alumnos con filtros opcionales"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    @invalida('alumnos', 'diplomados')
+    def add_alumnos_bulk(self, alumnos: List[Tuple], tamano_lote: int = 1000) -> bool:
+        """Agregar varios alumnos en una sola transacción (todo o nada)
+        
+        Cada tupla lleva los mismos campos que add_alumno: (matricula, nombre_completo,
+        status, diplomado_clave, telefono, correo, fecha_inscripcion, pago_inscripcion,
+        mensualidad, num_mensualidades, total_diplomado). El id de cada diplomado se
+        resuelve una sola vez por clave y los contadores de inscritos se ajustan con
+        un incremento por diplomado.
+        """
+        ph = self.get_placeholder()
+        if not alumnos:
+            return True
+        try:
+            with self.transaccion() as cursor:
+                claves = list(dict.fromkeys(a[3] for a in alumnos))
+                ids = {}
+                for i in range(0, len(claves), 1000):
+                    lote = claves[i:i + 1000]
+                    marcadores = ', '.join([ph] * len(lote))
+                    cursor.execute(f'SELECT clave, id FROM diplomados WHERE clave IN ({marcadores})', lote)
+                    ids.update(cursor.fetchall())
+                
+                faltantes = [c for c in claves if c not in ids]
+                if faltantes:
+                    raise ValueError(f"diplomados inexistentes: {', '.join(map(str, faltantes))}")
+                
+                query = f'''
+                    INSERT INTO alumnos (matricula, nombre_completo, status, diplomado_id, diplomado_clave,
+                                       telefono, correo, fecha_inscripcion, pago_inscripcion, mensualidad,
+                                       num_mensualidades, total_diplomado, saldo)
+                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+                '''
+                # diplomado_id va antes de la clave; el saldo inicial es total - inscripción
+                filas = [tuple(a[:3]) + (ids[a[3]],) + tuple(a[3:]) + (a[10] - a[7],) for a in alumnos]
+                # pymysql convierte cada lote en un solo INSERT de varias filas
+                for i in range(0, len(filas), tamano_lote):
+                    cursor.executemany(query, filas[i:i + tamano_lote])
+                
+                inscritos = {}
+                for a in alumnos:
+                    inscritos[ids[a[3]]] = inscritos.get(ids[a[3]], 0) + 1
+                for diplomado_id, n in inscritos.items():
+                    self._ajustar_inscritos(cursor, diplomado_id, n)
+            # executemany no devuelve los ids: el índice se reconstruye en la siguiente búsqueda
+            self.indice_alumnos.invalidar()
+            return True
+        except Exception as e:
+            print(f"Error al agregar alumnos: {e}")
+            return False
+    
+    def get_matriculas_existentes(self, matriculas: List[str]) -> set:
+        """Matrículas de la lista que ya están registradas (sin caché: se usa para validar)"""
+        ph = self.get_placeholder()
+        unicas = list(dict.fromkeys(matriculas))
+        existentes = set()
+        with self.get_cursor() as cursor:
+            for i in range(0, len(unicas), 1000):
+                lote = unicas[i:i + 1000]
+                marcadores = ', '.join([ph] * len(lote))
+                cursor.execute(f'SELECT matricula FROM alumnos WHERE matricula IN ({marcadores})', lote)
+                existentes.update(f[0] for f in cursor.fetchall())
+        return existentes
+    
+    @staticmethod
+    def _clave_diplomado(diplomado: str = None) -> Optional[str]:
+        """'Nombre (CLAVE)' del selector de diplomados -> 'CLAVE' (None para "Todos")"""
+        if diplomado and diplomado != "Todos":
+            # Extraer la clave entre paréntesis
+            return diplomado.split('(')[1].strip(')')
+        return None
+    
+    def _filtros_alumnos(self, nombre: str = None, matricula: str = None,
+                         diplomado: str = None) -> Tuple[str, List]:
+        """Condiciones WHERE (y sus parámetros) de la búsqueda de alumnos"""
         ph = self.get_placeholder()
         
-        query = 'SELECT * FROM alumnos WHERE 1=1'
+        condiciones = '1=1'
         params = []
         
         if nombre:
-            query += f' AND nombre_completo LIKE {ph}'
+            condiciones += f' AND nombre_completo LIKE {ph}'
             params.append(f'%{nombre}%')
         
         if matricula:
-            query += f' AND matricula LIKE {ph}'
+            condiciones += f' AND matricula LIKE {ph}'
             params.append(f'%{matricula}%')
         
-        if diplomado and diplomado != "Todos":
-            # Extraer la clave entre paréntesis
-            clave = diplomado.split('(')[1].strip(')')
-            query += f' AND diplomado_clave = {ph}'
+        clave = self._clave_diplomado(diplomado)
+        if clave:
+            condiciones += f' AND diplomado_clave = {ph}'
             params.append(clave)
         
-        query += ' ORDER BY nombre_completo'
+        return condiciones, params
+    
+    @cacheado('alumnos')
+    def get_alumnos_filtrados(self, nombre: str = None, matricula: str = None, 
+                             diplomado: str = None) -> List[Tuple]:
+        """Obtener alumnos con filtros opcionales"""
+        condiciones, params = self._filtros_alumnos(nombre, matricula, diplomado)
+        query = f'SELECT * FROM alumnos WHERE {condiciones} ORDER BY nombre_completo'
         
-        cursor.execute(query, params)
-        alumnos = cursor.fetchall()
-        cursor.close()
-        return alumnos
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
+    @cacheado('alumnos')
+    def get_alumnos_pagina(self, nombre: str = None, matricula: str = None, diplomado: str = None,
+                           despues: Tuple = None, limite: int = 50) -> Tuple[List[Tuple], Optional[Tuple]]:
+        """Una página del directorio de alumnos ordenado por nombre
+        
+        Paginación por llave (nombre_completo, id) en lugar de OFFSET: `despues` es la
+        llave de la última fila de la página anterior. Sólo trae las columnas de la
+        lista (id, matrícula, nombre, status, diplomado, teléfono, correo). Devuelve
+        (filas, llave de la siguiente página o None si es la última).
+        """
+        ph = self.get_placeholder()
+        condiciones, params = self._filtros_alumnos(nombre, matricula, diplomado)
+        
+        if despues:
+            # La primera condición permite empezar la lectura del índice justo en la llave
+            condiciones += f' AND nombre_completo >= {ph} AND (nombre_completo > {ph} OR id > {ph})'
+            params.extend([despues[0], despues[0], despues[1]])
+        
+        query = f'''
+            SELECT id, matricula, nombre_completo, status, diplomado_clave, telefono, correo
+            FROM alumnos
+            WHERE {condiciones}
+            ORDER BY nombre_completo, id
+            LIMIT {int(limite) + 1}
+        '''
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            filas = cursor.fetchall()
+        
+        # Se pide una fila de más sólo para saber si hay siguiente página
+        if len(filas) > limite:
+            filas = filas[:limite]
+            return filas, (filas[-1][2], filas[-1][0])
+        return filas, None
+    
+    @cacheado('alumnos')
+    def contar_alumnos(self, nombre: str = None, matricula: str = None, diplomado: str = None) -> int:
+        """Número de alumnos que cumplen los filtros del directorio"""
+        condiciones, params = self._filtros_alumnos(nombre, matricula, diplomado)
+        with self.get_cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM alumnos WHERE {condiciones}', params)
+            return cursor.fetchone()[0]
+    
+    def _filas_indice_alumnos(self) -> List[Tuple]:
+        """Datos del índice de búsqueda: una sola lectura de la tabla de alumnos"""
+        with self.get_cursor() as cursor:
+            cursor.execute('SELECT id, nombre_completo, matricula, diplomado_clave FROM alumnos')
+            return cursor.fetchall()
+    
+    def buscar_alumnos(self, texto: str, diplomado: str = None, limite: int = None) -> List[int]:
+        """Ids de los alumnos por nombre o matrícula, del más al menos relevante
+        
+        Usa el índice en memoria (sin acentos ni mayúsculas) en lugar de LIKE '%x%';
+        la primera búsqueda del proceso lo construye con una sola lectura.
+        """
+        self.indice_alumnos.asegurar(self._filas_indice_alumnos)
+        return self.indice_alumnos.buscar(texto, self._clave_diplomado(diplomado), limite)
+    
+    @cacheado('alumnos')
+    def get_alumnos_por_ids(self, ids: List[int]) -> List[Tuple]:
+        """Columnas del directorio (como get_alumnos_pagina) de los alumnos indicados, en el orden de `ids`"""
+        ph = self.get_placeholder()
+        filas = {}
+        with self.get_cursor() as cursor:
+            for i in range(0, len(ids), 1000):
+                lote = list(ids[i:i + 1000])
+                marcadores = ', '.join([ph] * len(lote))
+                cursor.execute(f'''
+                    SELECT id, matricula, nombre_completo, status, diplomado_clave, telefono, correo
+                    FROM alumnos WHERE id IN ({marcadores})
+                ''', lote)
+                filas.update((f[0], f) for f in cursor.fetchall())
+        return [filas[i] for i in ids if i in filas]
     
+    @cacheado('alumnos')
+    def get_alumno_por_id(self, id: int) -> Optional[Tuple]:
+        """Obtener un alumno (todas sus columnas) por su id"""
+        ph = self.get_placeholder()
+        with self.get_cursor() as cursor:
+            cursor.execute(f'SELECT * FROM alumnos WHERE id = {ph}', (id,))
+            return cursor.fetchone()
+    
+    @cacheado('alumnos')
     def get_alumno_por_matricula(self, matricula: str) -> Optional[Tuple]:
         """Obtener un alumno por su matrícula"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'SELECT * FROM alumnos WHERE matricula = {ph}', (matricula,))
-        alumno = cursor.fetchone()
-        cursor.close()
-        return alumno
+        with self.get_cursor() as cursor:
+            cursor.execute(f'SELECT * FROM alumnos WHERE matricula = {ph}', (matricula,))
+            return cursor.fetchone()
     
+    @invalida('alumnos', 'diplomados')
     def update_alumno(self, id: int, matricula: str, nombre: str, status: str,
                      diplomado_clave: str, telefono: str, correo: str,
                      fecha_inscripcion: str, pago_inscripcion: float,
@@ -427,153 +651,355 @@ class DatabaseManager:
         """Actualizar un alumno"""
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Obtener el ID del diplomado
-            cursor.execute(f'SELECT id FROM diplomados WHERE clave = {ph}', (diplomado_clave,))
-            diplomado_id = cursor.fetchone()
-            
-            if not diplomado_id:
-                cursor.close()
-                return False
-            
-            cursor.execute(f'''
-                UPDATE alumnos 
-                SET matricula={ph}, nombre_completo={ph}, status={ph}, diplomado_id={ph}, diplomado_clave={ph},
-                    telefono={ph}, correo={ph}, fecha_inscripcion={ph}, pago_inscripcion={ph}, mensualidad={ph},
-                    fecha_baja={ph}, motivo_baja={ph}
-                WHERE id = {ph}
-            ''', (matricula, nombre, status, diplomado_id[0], diplomado_clave, telefono, correo,
-                 fecha_inscripcion, pago_inscripcion, mensualidad, fecha_baja, motivo_baja, id))
-            conn.commit()
-            cursor.close()
+            with self.transaccion() as cursor:
+                # Obtener el ID del diplomado
+                cursor.execute(f'SELECT id FROM diplomados WHERE clave = {ph}', (diplomado_clave,))
+                diplomado_id = cursor.fetchone()
+                
+                if not diplomado_id:
+                    return False
+                
+                # Si cambia de diplomado, sus pagos se mueven de diplomado en resumen_mensual
+                # y el alumno pasa de un contador de inscritos al otro
+                cursor.execute(f'SELECT diplomado_clave, diplomado_id FROM alumnos WHERE id = {ph}', (id,))
+                anterior = cursor.fetchone()
+                cambia_diplomado = anterior is not None and anterior[0] != diplomado_clave
+                if cambia_diplomado:
+                    self._acumular_resumen_pagos_alumno(cursor, id, -1)
+                if anterior is not None and anterior[1] != diplomado_id[0]:
+                    if anterior[1] is not None:
+                        self._ajustar_inscritos(cursor, anterior[1], -1)
+                    self._ajustar_inscritos(cursor, diplomado_id[0], 1)
+                
+                # El saldo depende de la inscripción: se recalcula con el valor nuevo
+                cursor.execute(f'''
+                    UPDATE alumnos 
+                    SET matricula={ph}, nombre_completo={ph}, status={ph}, diplomado_id={ph}, diplomado_clave={ph},
+                        telefono={ph}, correo={ph}, fecha_inscripcion={ph}, pago_inscripcion={ph}, mensualidad={ph},
+                        fecha_baja={ph}, motivo_baja={ph}, saldo = total_diplomado - {ph} - total_pagado
+                    WHERE id = {ph}
+                ''', (matricula, nombre, status, diplomado_id[0], diplomado_clave, telefono, correo,
+                     fecha_inscripcion, pago_inscripcion, mensualidad, fecha_baja, motivo_baja,
+                     pago_inscripcion, id))
+                
+                if cambia_diplomado:
+                    self._acumular_resumen_pagos_alumno(cursor, id, 1)
+            self.indice_alumnos.agregar(id, nombre, matricula, diplomado_clave)
             return True
         except Exception as e:
             print(f"Error al actualizar alumno: {e}")
             return False
     
+    @invalida('alumnos')
     def registrar_baja_alumno(self, id: int, fecha_baja: str, motivo_baja: str) -> bool:
         """Registrar la baja de un alumno con fecha y motivo"""
+        ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                UPDATE alumnos 
-                SET status='Baja', fecha_baja=?, motivo_baja=?
-                WHERE id = {ph}
-            ''', (fecha_baja, motivo_baja, id))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f'''
+                    UPDATE alumnos 
+                    SET status='Baja', fecha_baja={ph}, motivo_baja={ph}
+                    WHERE id = {ph}
+                ''', (fecha_baja, motivo_baja, id))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al registrar baja: {e}")
             return False
     
+    @invalida('alumnos', 'pagos', 'diplomados')
     def delete_alumno(self, id: int) -> bool:
-        """Eliminar un alumno"""
+        """Eliminar un alumno (su saldo se va con la fila; sus pagos salen del resumen)"""
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Primero eliminar sus pagos
-            cursor.execute(f'DELETE FROM pagos WHERE alumno_id = {ph}', (id,))
-            
-            # Luego eliminar el alumno
-            cursor.execute(f'DELETE FROM alumnos WHERE id = {ph}', (id,))
-            conn.commit()
-            cursor.close()
+            with self.transaccion() as cursor:
+                cursor.execute(f'SELECT diplomado_id FROM alumnos WHERE id = {ph}', (id,))
+                alumno = cursor.fetchone()
+                
+                # Primero restar sus pagos del resumen y eliminarlos
+                self._acumular_resumen_pagos_alumno(cursor, id, -1)
+                cursor.execute(f'DELETE FROM pagos WHERE alumno_id = {ph}', (id,))
+                
+                # Luego eliminar el alumno y descontarlo de los inscritos
+                cursor.execute(f'DELETE FROM alumnos WHERE id = {ph}', (id,))
+                if alumno and alumno[0] is not None:
+                    self._ajustar_inscritos(cursor, alumno[0], -1)
+            self.indice_alumnos.quitar(id)
             return True
         except Exception as e:
             print(f"Error al eliminar alumno: {e}")
             return False
     
+    # ========================================================================
+    # FUNCIONES PARA ALUMNOS DUPLICADOS
+    # ========================================================================
+    
+    def get_posibles_duplicados(self, nombre: str, correo: str, telefono: str) -> List[Dict]:
+        """Alumnos registrados que probablemente son la misma persona (sin caché: se usa para validar)
+        
+        Sólo se comparan los del mismo bloque: mismo correo, mismo teléfono o nombre
+        parecido según el índice de búsqueda (sin acentos y tolerante a errores de dedo).
+        """
+        ph = self.get_placeholder()
+        condiciones, params = [], []
+        
+        correo = str(correo or '').strip()
+        if correo:
+            condiciones.append(f'correo IN ({ph}, {ph})')
+            params.extend([correo, correo.lower()])
+        telefono = str(telefono or '').strip()
+        if telefono:
+            condiciones.append(f'telefono = {ph}')
+            params.append(telefono)
+        por_nombre = self.buscar_alumnos(nombre, limite=duplicados.MAX_CANDIDATOS_NOMBRE) if nombre else []
+        if por_nombre:
+            condiciones.append(f"id IN ({', '.join([ph] * len(por_nombre))})")
+            params.extend(por_nombre)
+        if not condiciones:
+            return []
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT id, matricula, nombre_completo, correo, telefono, diplomado_clave, status
+                FROM alumnos
+                WHERE {' OR '.join(condiciones)}
+            ''', params)
+            registrados = cursor.fetchall()
+        return duplicados.candidatos_duplicado((None, None, nombre, correo, telefono), registrados)
+    
+    @cacheado('alumnos')
+    def get_alumnos_duplicados(self, umbral: float = duplicados.UMBRAL_DUPLICADO) -> List[Dict]:
+        """Pares de alumnos de toda la tabla que probablemente son la misma persona"""
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                SELECT id, matricula, nombre_completo, correo, telefono, diplomado_clave, status
+                FROM alumnos
+            ''')
+            alumnos = cursor.fetchall()
+        return duplicados.buscar_duplicados(alumnos, umbral)
+    
+    @cacheado('alumnos')
     def get_alumnos_por_diplomado_clave(self, clave: str) -> List[Tuple]:
         """Obtener todos los alumnos de un diplomado específico"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            SELECT id, matricula, nombre_completo, mensualidad 
-            FROM alumnos 
-            WHERE diplomado_clave = {ph} AND status='Activo'
-            ORDER BY nombre_completo
-        ''', (clave,))
-        alumnos = cursor.fetchall()
-        cursor.close()
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT id, matricula, nombre_completo, mensualidad 
+                FROM alumnos 
+                WHERE diplomado_clave = {ph} AND status='Activo'
+                ORDER BY nombre_completo
+            ''', (clave,))
+            return cursor.fetchall()
+    
+    @cacheado('alumnos', 'pagos')
+    def get_alumnos_con_pago_mensualidad(self, clave: str, num_mensualidad: int) -> List[Tuple]:
+        """Obtener los alumnos activos de un diplomado junto con su pago de una mensualidad
+        
+        Cada fila es (id, matricula, nombre_completo, mensualidad, monto, fecha_pago, metodo_pago);
+        las tres últimas columnas son None si el alumno no ha pagado esa mensualidad.
+        """
+        ph = self.get_placeholder()
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT a.id, a.matricula, a.nombre_completo, a.mensualidad,
+                       p.monto, p.fecha_pago, p.metodo_pago
+                FROM alumnos a
+                LEFT JOIN pagos p ON p.alumno_id = a.id AND p.num_mensualidad = {ph}
+                WHERE a.diplomado_clave = {ph} AND a.status='Activo'
+                ORDER BY a.nombre_completo, a.id, p.id
+            ''', (num_mensualidad, clave))
+            filas = cursor.fetchall()
+        
+        # Si una mensualidad se registró dos veces, conservar sólo el primer pago
+        alumnos = []
+        vistos = set()
+        for fila in filas:
+            if fila[0] not in vistos:
+                vistos.add(fila[0])
+                alumnos.append(fila)
         return alumnos
     
     # ========================================================================
     # FUNCIONES PARA PAGOS
     # ========================================================================
     
+    @invalida('pagos', 'alumnos')
     def add_pago(self, alumno_id: int, num_mensualidad: int, monto: float,
                 fecha_pago: str, metodo_pago: str) -> bool:
-        """Registrar un nuevo pago"""
+        """Registrar un nuevo pago (y sumarlo al saldo del alumno y a resumen_mensual en la misma transacción)"""
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                INSERT INTO pagos (alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago)
-                VALUES ({ph}, {ph}, {ph}, {ph}, {ph})
-            ''', (alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago))
-            conn.commit()
-            cursor.close()
+            with self.transaccion() as cursor:
+                cursor.execute(f'''
+                    INSERT INTO pagos (alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago)
+                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph})
+                ''', (alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago))
+                self._acumular_saldo(cursor, alumno_id, num_mensualidad, monto)
+                self._acumular_resumen(cursor, f"SELECT {ph}, diplomado_clave, {ph}, {ph}, 0, 1 FROM alumnos WHERE id = {ph}",
+                                       (str(fecha_pago)[:7], metodo_pago, monto, alumno_id))
             return True
         except Exception as e:
             print(f"Error al registrar pago: {e}")
             return False
     
+    @invalida('pagos', 'alumnos')
+    def add_pagos_bulk(self, pagos: List[Tuple]) -> Optional[int]:
+        """Registrar varios pagos en una sola transacción; devuelve cuántos se insertaron (None si falla)
+        
+        Cada tupla es (alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago). Es
+        idempotente: se omiten las mensualidades que el alumno ya tiene pagadas y las
+        repetidas en la lista, de modo que reenviar el mismo lote no duplica pagos.
+        Saldos de alumnos y resumen_mensual se actualizan en la misma transacción.
+        """
+        ph = self.get_placeholder()
+        # Una mensualidad por alumno; gana la primera aparición
+        unicos = {}
+        for pago in pagos:
+            unicos.setdefault((pago[0], pago[1]), pago)
+        if not unicos:
+            return 0
+        
+        try:
+            with self.transaccion() as cursor:
+                ids = list(dict.fromkeys(alumno_id for alumno_id, _ in unicos))
+                claves = {}
+                pagadas = set()
+                for i in range(0, len(ids), 1000):
+                    lote = ids[i:i + 1000]
+                    marcadores = ', '.join([ph] * len(lote))
+                    cursor.execute(f'SELECT id, diplomado_clave FROM alumnos WHERE id IN ({marcadores})', lote)
+                    claves.update(cursor.fetchall())
+                    cursor.execute(f'''
+                        SELECT DISTINCT alumno_id, num_mensualidad FROM pagos
+                        WHERE alumno_id IN ({marcadores})
+                    ''', lote)
+                    pagadas.update((f[0], f[1]) for f in cursor.fetchall())
+                
+                faltantes = [i for i in ids if i not in claves]
+                if faltantes:
+                    raise ValueError(f"alumnos inexistentes: {', '.join(map(str, faltantes))}")
+                
+                nuevos = [p for llave, p in unicos.items() if llave not in pagadas]
+                if not nuevos:
+                    return 0
+                
+                cursor.executemany(f'''
+                    INSERT INTO pagos (alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago)
+                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph})
+                ''', nuevos)
+                
+                # Saldos: cada pago nuevo es una mensualidad que el alumno no tenía pagada
+                saldos = {}
+                resumen = {}
+                for alumno_id, _, monto, fecha_pago, metodo_pago in nuevos:
+                    total, cuantas = saldos.get(alumno_id, (0, 0))
+                    saldos[alumno_id] = (total + monto, cuantas + 1)
+                    llave = (str(fecha_pago)[:7], claves[alumno_id], metodo_pago)
+                    ingresos, num_pagos = resumen.get(llave, (0, 0))
+                    resumen[llave] = (ingresos + monto, num_pagos + 1)
+                
+                cursor.executemany(f'''
+                    UPDATE alumnos
+                    SET total_pagado = total_pagado + {ph}, saldo = saldo - {ph},
+                        mensualidades_pagadas = mensualidades_pagadas + {ph}
+                    WHERE id = {ph}
+                ''', [(total, total, cuantas, alumno_id) for alumno_id, (total, cuantas) in saldos.items()])
+                
+                cursor.executemany(
+                    self.backend.sql_acumular('resumen_mensual', COLUMNAS_RESUMEN, CLAVES_RESUMEN,
+                                              f"VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph})"),
+                    [llave + (ingresos, 0, num_pagos) for llave, (ingresos, num_pagos) in resumen.items()])
+            return len(nuevos)
+        except Exception as e:
+            print(f"Error al registrar pagos: {e}")
+            return None
+    
+    @cacheado('pagos')
     def verificar_pago_mensualidad(self, alumno_id: int, num_mensualidad: int) -> bool:
         """Verificar si un alumno ya pagó una mensualidad específica"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            SELECT COUNT(*) FROM pagos 
-            WHERE alumno_id = {ph} AND num_mensualidad = {ph}
-        ''', (alumno_id, num_mensualidad))
-        count = cursor.fetchone()[0]
-        cursor.close()
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM pagos 
+                WHERE alumno_id = {ph} AND num_mensualidad = {ph}
+            ''', (alumno_id, num_mensualidad))
+            count = cursor.fetchone()[0]
         return count > 0
     
+    @cacheado('pagos')
     def get_detalle_pago(self, alumno_id: int, num_mensualidad: int) -> Optional[Tuple]:
         """Obtener detalles de un pago específico"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            SELECT monto, fecha_pago, metodo_pago 
-            FROM pagos 
-            WHERE alumno_id = {ph} AND num_mensualidad = {ph}
-        ''', (alumno_id, num_mensualidad))
-        pago = cursor.fetchone()
-        cursor.close()
-        return pago
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT monto, fecha_pago, metodo_pago 
+                FROM pagos 
+                WHERE alumno_id = {ph} AND num_mensualidad = {ph}
+            ''', (alumno_id, num_mensualidad))
+            return cursor.fetchone()
     
+    @cacheado('pagos')
     def get_pagos_alumno(self, alumno_id: int) -> List[Tuple]:
         """Obtener todos los pagos de un alumno"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            SELECT num_mensualidad, monto, fecha_pago, metodo_pago 
-            FROM pagos 
-            WHERE alumno_id = {ph}
-            ORDER BY num_mensualidad
-        ''', (alumno_id,))
-        pagos = cursor.fetchall()
-        cursor.close()
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT num_mensualidad, monto, fecha_pago, metodo_pago 
+                FROM pagos 
+                WHERE alumno_id = {ph}
+                ORDER BY num_mensualidad
+            ''', (alumno_id,))
+            return cursor.fetchall()
+    
+    @cacheado('pagos')
+    def get_pagos_alumnos(self, alumno_ids: List[int]) -> Dict[int, List[Tuple]]:
+        """Obtener los pagos de varios alumnos a la vez, agrupados por alumno_id
+        
+        Cada lista tiene el mismo formato que get_pagos_alumno; los alumnos sin pagos
+        no aparecen en el diccionario.
+        """
+        ph = self.get_placeholder()
+        ids = list(dict.fromkeys(alumno_ids))
+        pagos = {}
+        if not ids:
+            return pagos
+        
+        with self.get_cursor() as cursor:
+            # Lotes acotados para no exceder el tamaño máximo de la consulta
+            for i in range(0, len(ids), 1000):
+                lote = ids[i:i + 1000]
+                marcadores = ', '.join([ph] * len(lote))
+                cursor.execute(f'''
+                    SELECT alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago 
+                    FROM pagos 
+                    WHERE alumno_id IN ({marcadores})
+                    ORDER BY alumno_id, num_mensualidad
+                ''', lote)
+                for fila in cursor.fetchall():
+                    pagos.setdefault(fila[0], []).append(fila[1:])
         return pagos
     
-    def get_pagos_filtrados(self, fecha_inicio: str, fecha_fin: str, 
-                           diplomado_clave: str = None) -> List[Tuple]:
-        """Obtener pagos con filtros de fecha y diplomado"""
+    @cacheado('alumnos', 'diplomados')
+    def get_alumnos_con_saldo(self) -> List[Tuple]:
+        """Alumnos activos que aún deben algo, con los datos para esperar su siguiente pago
+        
+        Cada fila es (id, matricula, nombre_completo, diplomado_clave, mensualidad,
+        num_mensualidades, fecha_inicio del diplomado).
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                SELECT a.id, a.matricula, a.nombre_completo, a.diplomado_clave, a.mensualidad,
+                       a.num_mensualidades, d.fecha_inicio
+                FROM alumnos a
+                JOIN diplomados d ON d.id = a.diplomado_id
+                WHERE a.status = 'Activo' AND a.saldo > 0
+            ''')
+            return cursor.fetchall()
+    
+    def _consulta_pagos_filtrados(self, fecha_inicio: str, fecha_fin: str,
+                                  diplomado_clave: str = None) -> Tuple[str, List]:
+        """SQL y parámetros de get_pagos_filtrados (también para exportar)"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
         
         query = f'''
             SELECT a.matricula, a.nombre_completo, a.diplomado_clave, p.num_mensualidad,
@@ -589,279 +1015,649 @@ class DatabaseManager:
             params.append(diplomado_clave)
         
         query += ' ORDER BY p.fecha_pago DESC'
+        return query, params
+    
+    @cacheado('pagos', 'alumnos')
+    def get_pagos_filtrados(self, fecha_inicio: str, fecha_fin: str, 
+                           diplomado_clave: str = None) -> List[Tuple]:
+        """Obtener pagos con filtros de fecha y diplomado"""
+        query, params = self._consulta_pagos_filtrados(fecha_inicio, fecha_fin, diplomado_clave)
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
+    def iterar_pagos_filtrados(self, fecha_inicio: str, fecha_fin: str, diplomado_clave: str = None,
+                               tamano_lote: int = 5000) -> Iterator[List[Tuple]]:
+        """Las filas de get_pagos_filtrados en lotes, sin cargarlas todas (para exportar)"""
+        query, params = self._consulta_pagos_filtrados(fecha_inicio, fecha_fin, diplomado_clave)
+        return self.iterar_consulta(query, params, tamano_lote)
+    
+    @cacheado('pagos', 'alumnos')
+    def get_pagos_pagina(self, fecha_inicio: str, fecha_fin: str, diplomado_clave: str = None,
+                         despues: Optional[Tuple] = None, limite: int = 50) -> Tuple[List[Tuple], Optional[Tuple]]:
+        """Una página de get_pagos_filtrados con paginación por llave (fecha_pago, id)
         
-        cursor.execute(query, params)
-        pagos = cursor.fetchall()
-        cursor.close()
-        return pagos
+        `despues` es la llave devuelta con la página anterior (None para la primera).
+        Devuelve (filas, llave de la página siguiente o None si es la última); cada fila
+        trae las columnas de get_pagos_filtrados. Cualquier página cuesta lo mismo
+        que la primera: el índice de fecha_pago se recorre desde la llave, sin OFFSET.
+        """
+        ph = self.get_placeholder()
+        query = f'''
+            SELECT a.matricula, a.nombre_completo, a.diplomado_clave, p.num_mensualidad,
+                   p.monto, p.fecha_pago, p.metodo_pago, p.id
+            FROM pagos p
+            JOIN alumnos a ON p.alumno_id = a.id
+            WHERE p.fecha_pago BETWEEN {ph} AND {ph}
+        '''
+        params = [fecha_inicio, fecha_fin]
+        
+        if diplomado_clave:
+            query += f' AND a.diplomado_clave = {ph}'
+            params.append(diplomado_clave)
+        
+        if despues:
+            # Equivale a (fecha_pago, id) < despues, escrito para que el rango use el índice
+            query += f' AND p.fecha_pago <= {ph} AND (p.fecha_pago < {ph} OR p.id < {ph})'
+            params.extend([despues[0], despues[0], despues[1]])
+        
+        query += f' ORDER BY p.fecha_pago DESC, p.id DESC LIMIT {ph}'
+        params.append(int(limite) + 1)
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            filas = cursor.fetchall()
+        
+        siguiente = (filas[limite - 1][5], filas[limite - 1][7]) if len(filas) > limite else None
+        return [f[:7] for f in filas[:limite]], siguiente
     
-    def get_reporte_pagos_diplomado(self, diplomado_clave: str, fecha_inicio: str, 
-                                   fecha_fin: str) -> List[Tuple]:
-        """Obtener reporte de pagos por diplomado"""
+    @cacheado('pagos', 'alumnos')
+    def get_totales_pagos(self, fecha_inicio: str, fecha_fin: str, diplomado_clave: str = None) -> Tuple[int, float]:
+        """Número de pagos y monto total del periodo (para acompañar a get_pagos_pagina)"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'''
+        params = [fecha_inicio, fecha_fin]
+        if diplomado_clave:
+            query = f'''
+                SELECT COUNT(*), COALESCE(SUM(p.monto), 0)
+                FROM pagos p
+                JOIN alumnos a ON p.alumno_id = a.id
+                WHERE p.fecha_pago BETWEEN {ph} AND {ph} AND a.diplomado_clave = {ph}
+            '''
+            params.append(diplomado_clave)
+        else:
+            query = f'SELECT COUNT(*), COALESCE(SUM(monto), 0) FROM pagos WHERE fecha_pago BETWEEN {ph} AND {ph}'
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            cantidad, total = cursor.fetchone()
+        return cantidad, float(total)
+    
+    def _consulta_reporte_pagos_diplomado(self, diplomado_clave: str, fecha_inicio: str,
+                                          fecha_fin: str) -> Tuple[str, Tuple]:
+        """SQL y parámetros de get_reporte_pagos_diplomado (también para exportar)"""
+        ph = self.get_placeholder()
+        return f'''
             SELECT a.matricula, a.nombre_completo, p.num_mensualidad, p.monto, 
                    p.fecha_pago, p.metodo_pago
             FROM pagos p
             JOIN alumnos a ON p.alumno_id = a.id
             WHERE a.diplomado_clave={ph} AND p.fecha_pago BETWEEN {ph} AND {ph}
-            ORDER BY a.nombre_completo, p.num_mensualidad
-        ''', (diplomado_clave, fecha_inicio, fecha_fin))
-        pagos = cursor.fetchall()
-        cursor.close()
-        return pagos
+            ORDER BY a.nombre_completo, a.id, p.num_mensualidad, p.id
+        ''', (diplomado_clave, fecha_inicio, fecha_fin)
+    
+    @cacheado('pagos', 'alumnos')
+    def get_reporte_pagos_diplomado(self, diplomado_clave: str, fecha_inicio: str, 
+                                   fecha_fin: str) -> List[Tuple]:
+        """Obtener reporte de pagos por diplomado"""
+        query, params = self._consulta_reporte_pagos_diplomado(diplomado_clave, fecha_inicio, fecha_fin)
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
+    @cacheado('pagos', 'alumnos')
+    def get_reporte_pagos_diplomado_pagina(self, diplomado_clave: str, fecha_inicio: str, fecha_fin: str,
+                                           despues: Optional[Tuple] = None,
+                                           limite: int = 50) -> Tuple[List[Tuple], Optional[Tuple]]:
+        """Una página de get_reporte_pagos_diplomado, en el mismo orden que su CSV
+        
+        Paginación por llave (nombre_completo, alumno id, num_mensualidad, pago id);
+        `despues` es la llave devuelta con la página anterior (None para la primera).
+        Devuelve (filas, llave de la página siguiente o None si es la última); cada
+        fila trae las columnas de get_reporte_pagos_diplomado.
+        """
+        ph = self.get_placeholder()
+        query = f'''
+            SELECT a.matricula, a.nombre_completo, p.num_mensualidad, p.monto,
+                   p.fecha_pago, p.metodo_pago, a.id, p.id
+            FROM pagos p
+            JOIN alumnos a ON p.alumno_id = a.id
+            WHERE a.diplomado_clave = {ph} AND p.fecha_pago BETWEEN {ph} AND {ph}
+        '''
+        params = [diplomado_clave, fecha_inicio, fecha_fin]
+        
+        if despues:
+            # Equivale a (nombre_completo, a.id, num_mensualidad, p.id) > despues, escrito para
+            # que el recorrido de idx_alumnos_diplomado_nombre empiece en la llave
+            query += f'''
+                AND a.nombre_completo >= {ph}
+                AND (a.nombre_completo > {ph} OR a.id > {ph}
+                     OR (a.id = {ph} AND (p.num_mensualidad > {ph}
+                                          OR (p.num_mensualidad = {ph} AND p.id > {ph}))))
+            '''
+            nombre, alumno_id, mensualidad, pago_id = despues
+            params.extend([nombre, nombre, alumno_id, alumno_id, mensualidad, mensualidad, pago_id])
+        
+        query += f' ORDER BY a.nombre_completo, a.id, p.num_mensualidad, p.id LIMIT {ph}'
+        params.append(int(limite) + 1)
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            filas = cursor.fetchall()
+        
+        if len(filas) > limite:
+            ultima = filas[limite - 1]
+            siguiente = (ultima[1], ultima[6], ultima[2], ultima[7])
+        else:
+            siguiente = None
+        return [f[:6] for f in filas[:limite]], siguiente
+    
+    def iterar_reporte_pagos_diplomado(self, diplomado_clave: str, fecha_inicio: str, fecha_fin: str,
+                                       tamano_lote: int = 5000) -> Iterator[List[Tuple]]:
+        """Las filas de get_reporte_pagos_diplomado en lotes, sin cargarlas todas (para exportar)"""
+        query, params = self._consulta_reporte_pagos_diplomado(diplomado_clave, fecha_inicio, fecha_fin)
+        return self.iterar_consulta(query, params, tamano_lote)
     
     # ========================================================================
     # FUNCIONES PARA GASTOS
     # ========================================================================
     
+    @invalida('gastos')
     def add_gasto(self, fecha: str, concepto: str, monto: float) -> bool:
-        """Registrar un nuevo gasto"""
+        """Registrar un nuevo gasto (y sumarlo a resumen_mensual en la misma transacción)"""
+        ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                INSERT INTO gastos (fecha, concepto, monto)
-                VALUES ({ph}, {ph}, {ph})
-            ''', (fecha, concepto, monto))
-            conn.commit()
-            cursor.close()
+            with self.transaccion() as cursor:
+                cursor.execute(f'''
+                    INSERT INTO gastos (fecha, concepto, monto)
+                    VALUES ({ph}, {ph}, {ph})
+                ''', (fecha, concepto, monto))
+                self._acumular_resumen(cursor, f"VALUES ({ph}, '', '', 0, {ph}, 0)", (str(fecha)[:7], monto))
             return True
         except Exception as e:
             print(f"Error al registrar gasto: {e}")
             return False
     
+    @cacheado('gastos')
     def get_gastos_filtrados(self, fecha_inicio: str, fecha_fin: str) -> List[Tuple]:
         """Obtener gastos filtrados por fecha"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            SELECT * FROM gastos 
-            WHERE fecha BETWEEN {ph} AND {ph}
-            ORDER BY fecha DESC
-        ''', (fecha_inicio, fecha_fin))
-        gastos = cursor.fetchall()
-        cursor.close()
-        return gastos
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT * FROM gastos 
+                WHERE fecha BETWEEN {ph} AND {ph}
+                ORDER BY fecha DESC
+            ''', (fecha_inicio, fecha_fin))
+            return cursor.fetchall()
+    
+    @cacheado('gastos')
+    def get_gastos_pagina(self, fecha_inicio: str, fecha_fin: str, despues: Optional[Tuple] = None,
+                          limite: int = 50) -> Tuple[List[Tuple], Optional[Tuple]]:
+        """Una página de get_gastos_filtrados con paginación por llave (fecha, id)
+        
+        Igual que get_pagos_pagina: devuelve (filas, llave de la página siguiente o None).
+        """
+        ph = self.get_placeholder()
+        query = f'SELECT * FROM gastos WHERE fecha BETWEEN {ph} AND {ph}'
+        params = [fecha_inicio, fecha_fin]
+        
+        if despues:
+            query += f' AND fecha <= {ph} AND (fecha < {ph} OR id < {ph})'
+            params.extend([despues[0], despues[0], despues[1]])
+        
+        query += f' ORDER BY fecha DESC, id DESC LIMIT {ph}'
+        params.append(int(limite) + 1)
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            filas = cursor.fetchall()
+        
+        siguiente = (filas[limite - 1][1], filas[limite - 1][0]) if len(filas) > limite else None
+        return filas[:limite], siguiente
+    
+    @cacheado('gastos')
+    def get_totales_gastos(self, fecha_inicio: str, fecha_fin: str) -> Tuple[int, float]:
+        """Número de gastos y monto total del periodo (para acompañar a get_gastos_pagina)"""
+        ph = self.get_placeholder()
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT COUNT(*), COALESCE(SUM(monto), 0) FROM gastos
+                WHERE fecha BETWEEN {ph} AND {ph}
+            ''', (fecha_inicio, fecha_fin))
+            cantidad, total = cursor.fetchone()
+        return cantidad, float(total)
     
+    @invalida('gastos')
     def delete_gasto(self, id: int) -> bool:
-        """Eliminar un gasto"""
+        """Eliminar un gasto (y restarlo de resumen_mensual en la misma transacción)"""
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f'DELETE FROM gastos WHERE id = {ph}', (id,))
-            conn.commit()
-            cursor.close()
+            with self.transaccion() as cursor:
+                cursor.execute(f'SELECT fecha, monto FROM gastos WHERE id = {ph}', (id,))
+                gasto = cursor.fetchone()
+                if not gasto:
+                    return False
+                
+                cursor.execute(f'DELETE FROM gastos WHERE id = {ph}', (id,))
+                self._acumular_resumen(cursor, f"VALUES ({ph}, '', '', 0, {ph}, 0)", (str(gasto[0])[:7], -gasto[1]))
             return True
         except Exception as e:
             print(f"Error al eliminar gasto: {e}")
             return False
     
+    # ========================================================================
+    # FUNCIONES PARA SALDOS DE ALUMNOS
+    # ========================================================================
+    
+    def _acumular_saldo(self, cursor, alumno_id: int, num_mensualidad: int, monto: float):
+        """Sumar un pago ya insertado a total_pagado, mensualidades_pagadas y saldo del alumno"""
+        ph = self.get_placeholder()
+        # La mensualidad cuenta como pagada sólo con su primer pago (los abonos no suman)
+        cursor.execute(f'''
+            UPDATE alumnos
+            SET total_pagado = total_pagado + {ph},
+                saldo = saldo - {ph},
+                mensualidades_pagadas = mensualidades_pagadas + (
+                    SELECT CASE WHEN COUNT(*) = 1 THEN 1 ELSE 0 END
+                    FROM pagos WHERE alumno_id = {ph} AND num_mensualidad = {ph})
+            WHERE id = {ph}
+        ''', (monto, monto, alumno_id, num_mensualidad, alumno_id))
+    
+    @cacheado('alumnos')
+    def get_saldo_alumno(self, alumno_id: int) -> Optional[Dict[str, float]]:
+        """total_pagado, mensualidades_pagadas y saldo de un alumno, leídos por nombre de columna
+        
+        No se leen por posición de SELECT *: la migración 5 agrega las columnas al final
+        de la tabla y su índice depende de cómo se creó (con o sin curp).
+        """
+        ph = self.get_placeholder()
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT total_pagado, mensualidades_pagadas, saldo
+                FROM alumnos WHERE id = {ph}
+            ''', (alumno_id,))
+            fila = cursor.fetchone()
+        if fila is None:
+            return None
+        return {'total_pagado': fila[0], 'mensualidades_pagadas': fila[1], 'saldo': fila[2]}
+    
+    def verificar_saldos(self, limite: int = 100) -> List[Tuple]:
+        """Alumnos cuyo saldo guardado no coincide con sus pagos
+        
+        Devuelve (id, matrícula, total_pagado, total_pagado_real, mensualidades_pagadas,
+        mensualidades_pagadas_real, saldo, saldo_real); vacío si no hay desviaciones.
+        """
+        ph = self.get_placeholder()
+        real = 'a.total_diplomado - a.pago_inscripcion - COALESCE(p.pagado, 0)'
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT a.id, a.matricula,
+                       a.total_pagado, COALESCE(p.pagado, 0),
+                       a.mensualidades_pagadas, COALESCE(p.mensualidades, 0),
+                       a.saldo, {real}
+                FROM alumnos a
+                LEFT JOIN (
+                    SELECT alumno_id, SUM(monto) as pagado, COUNT(DISTINCT num_mensualidad) as mensualidades
+                    FROM pagos
+                    GROUP BY alumno_id
+                ) p ON p.alumno_id = a.id
+                WHERE ABS(a.total_pagado - COALESCE(p.pagado, 0)) > 0.005
+                OR a.mensualidades_pagadas <> COALESCE(p.mensualidades, 0)
+                OR ABS(a.saldo - ({real})) > 0.005
+                ORDER BY a.id
+                LIMIT {ph}
+            ''', (int(limite),))
+            return cursor.fetchall()
+    
+    @invalida('alumnos')
+    def reconciliar_saldos(self) -> bool:
+        """Recalcular los saldos de todos los alumnos desde pagos (p. ej. tras cargas masivas)"""
+        try:
+            with self.transaccion() as cursor:
+                migrations.llenar_saldos_alumnos(self, cursor)
+            return True
+        except Exception as e:
+            print(f"Error al reconciliar saldos: {e}")
+            return False
+    
+    # ========================================================================
+    # FUNCIONES PARA RESUMEN MENSUAL
+    # ========================================================================
+    
+    def _acumular_resumen(self, cursor, origen: str, params):
+        """Sumar a resumen_mensual las filas de `origen` (VALUES o SELECT con las columnas del resumen)"""
+        cursor.execute(self.backend.sql_acumular('resumen_mensual', COLUMNAS_RESUMEN,
+                                                 CLAVES_RESUMEN, origen), params)
+    
+    def _acumular_resumen_pagos_alumno(self, cursor, alumno_id: int, signo: int):
+        """Sumar (signo=1) o restar (signo=-1) del resumen todos los pagos de un alumno"""
+        ph = self.get_placeholder()
+        mes_pago = self.backend.sql_mes('p.fecha_pago')
+        self._acumular_resumen(cursor, f'''
+            SELECT {mes_pago}, a.diplomado_clave, p.metodo_pago, {ph} * SUM(p.monto), 0, {ph} * COUNT(*)
+            FROM pagos p
+            JOIN alumnos a ON p.alumno_id = a.id
+            WHERE p.alumno_id = {ph}
+            GROUP BY {mes_pago}, a.diplomado_clave, p.metodo_pago
+        ''', (signo, signo, alumno_id))
+    
+    @invalida('pagos', 'gastos')
+    def reconstruir_resumen_mensual(self) -> bool:
+        """Recalcular resumen_mensual desde pagos y gastos (p. ej. tras cargas masivas)"""
+        try:
+            with self.transaccion() as cursor:
+                migrations.llenar_resumen_mensual(self, cursor)
+            return True
+        except Exception as e:
+            print(f"Error al reconstruir resumen mensual: {e}")
+            return False
+    
+    @staticmethod
+    def _dividir_periodo(fecha_inicio, fecha_fin) -> Tuple[Optional[Tuple[str, str]], List[Tuple[str, str]]]:
+        """Separar [fecha_inicio, fecha_fin] en meses completos ('AAAA-MM', 'AAAA-MM') y días sueltos"""
+        inicio = date.fromisoformat(str(fecha_inicio)[:10])
+        fin = date.fromisoformat(str(fecha_fin)[:10])
+        if inicio > fin:
+            return None, []
+        
+        # Primer día del primer mes completo y primer día después del último mes completo
+        primer_mes = inicio if inicio.day == 1 else (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+        dia_siguiente = fin + timedelta(days=1)
+        fin_meses = dia_siguiente if dia_siguiente.day == 1 else fin.replace(day=1)
+        
+        if primer_mes >= fin_meses:
+            return None, [(inicio.isoformat(), fin.isoformat())]
+        
+        meses = (primer_mes.strftime('%Y-%m'), (fin_meses - timedelta(days=1)).strftime('%Y-%m'))
+        tramos = []
+        if inicio < primer_mes:
+            tramos.append((inicio.isoformat(), (primer_mes - timedelta(days=1)).isoformat()))
+        if fin_meses <= fin:
+            tramos.append((fin_meses.isoformat(), fin.isoformat()))
+        return meses, tramos
+    
+    @cacheado('pagos', 'gastos', 'alumnos')
+    def get_resumen_financiero(self, fecha_inicio: str, fecha_fin: str) -> Dict:
+        """Obtener ingresos, gastos y número de pagos de un periodo, por diplomado y método
+        
+        Los meses completos se leen de resumen_mensual; sólo los días sueltos de los
+        extremos se suman desde pagos y gastos. Devuelve un dict con ingresos, gastos,
+        num_pagos, por_diplomado {clave: ingresos} y por_metodo {método: ingresos}.
+        """
+        ph = self.get_placeholder()
+        meses, tramos = self._dividir_periodo(fecha_inicio, fecha_fin)
+        
+        partes = []
+        params = []
+        if meses:
+            partes.append(f'''
+                SELECT diplomado_clave, metodo_pago, SUM(ingresos), SUM(gastos), SUM(num_pagos)
+                FROM resumen_mensual
+                WHERE mes BETWEEN {ph} AND {ph}
+                GROUP BY diplomado_clave, metodo_pago
+            ''')
+            params.extend(meses)
+        if tramos:
+            rangos_pagos = ' OR '.join(f'p.fecha_pago BETWEEN {ph} AND {ph}' for _ in tramos)
+            partes.append(f'''
+                SELECT a.diplomado_clave, p.metodo_pago, SUM(p.monto), 0, COUNT(*)
+                FROM pagos p
+                JOIN alumnos a ON p.alumno_id = a.id
+                WHERE {rangos_pagos}
+                GROUP BY a.diplomado_clave, p.metodo_pago
+            ''')
+            params.extend(f for tramo in tramos for f in tramo)
+            rangos_gastos = ' OR '.join(f'fecha BETWEEN {ph} AND {ph}' for _ in tramos)
+            partes.append(f'''
+                SELECT '', '', 0, COALESCE(SUM(monto), 0), 0
+                FROM gastos
+                WHERE {rangos_gastos}
+            ''')
+            params.extend(f for tramo in tramos for f in tramo)
+        
+        resumen = {'ingresos': 0, 'gastos': 0, 'num_pagos': 0, 'por_diplomado': {}, 'por_metodo': {}}
+        if not partes:
+            return resumen
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(' UNION ALL '.join(partes), params)
+            filas = cursor.fetchall()
+        
+        for clave, metodo, ingresos, gastos, num_pagos in filas:
+            resumen['ingresos'] += ingresos
+            resumen['gastos'] += gastos
+            resumen['num_pagos'] += int(num_pagos)
+            if clave and ingresos:
+                resumen['por_diplomado'][clave] = resumen['por_diplomado'].get(clave, 0) + ingresos
+            if metodo and ingresos:
+                resumen['por_metodo'][metodo] = resumen['por_metodo'].get(metodo, 0) + ingresos
+        return resumen
+    
     # ========================================================================
     # FUNCIONES PARA DASHBOARD Y ESTADÍSTICAS
     # ========================================================================
     
+    @cacheado('alumnos')
     def get_total_alumnos(self) -> int:
         """Obtener total de alumnos"""
-        ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM alumnos')
-        total = cursor.fetchone()[0]
-        cursor.close()
-        return total
+        with self.get_cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM alumnos')
+            return cursor.fetchone()[0]
     
+    @cacheado('alumnos')
     def get_alumnos_activos(self) -> int:
         """Obtener total de alumnos activos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM alumnos WHERE status='Activo'")
-        total = cursor.fetchone()[0]
-        cursor.close()
-        return total
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM alumnos WHERE status='Activo'")
+            return cursor.fetchone()[0]
     
+    @cacheado('diplomados')
     def get_total_diplomados(self) -> int:
         """Obtener total de diplomados"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM diplomados')
-        total = cursor.fetchone()[0]
-        cursor.close()
-        return total
+        with self.get_cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM diplomados')
+            return cursor.fetchone()[0]
     
+    @cacheado('pagos')
     def get_ingresos_mes_actual(self) -> float:
         """Obtener ingresos del mes actual"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
         ph = self.get_placeholder()
         
         fecha_actual = datetime.now()
         primer_dia = fecha_actual.replace(day=1).strftime('%Y-%m-%d')
         ultimo_dia = fecha_actual.strftime('%Y-%m-%d')
         
-        cursor.execute(f'''
-            SELECT COALESCE(SUM(monto), 0) FROM pagos 
-            WHERE fecha_pago BETWEEN {ph} AND {ph}
-        ''', (primer_dia, ultimo_dia))
-        total = cursor.fetchone()[0]
-        cursor.close()
-        return total
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(monto), 0) FROM pagos 
+                WHERE fecha_pago BETWEEN {ph} AND {ph}
+            ''', (primer_dia, ultimo_dia))
+            return cursor.fetchone()[0]
     
+    @cacheado('gastos')
     def get_gastos_mes_actual(self) -> float:
         """Obtener gastos del mes actual"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
         
         fecha_actual = datetime.now()
         primer_dia = fecha_actual.replace(day=1).strftime('%Y-%m-%d')
         ultimo_dia = fecha_actual.strftime('%Y-%m-%d')
         
-        cursor.execute(f'''
-            SELECT COALESCE(SUM(monto), 0) FROM gastos 
-            WHERE fecha BETWEEN {ph} AND {ph}
-        ''', (primer_dia, ultimo_dia))
-        total = cursor.fetchone()[0]
-        cursor.close()
-        return total
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(monto), 0) FROM gastos 
+                WHERE fecha BETWEEN {ph} AND {ph}
+            ''', (primer_dia, ultimo_dia))
+            return cursor.fetchone()[0]
+    
+    @cacheado('alumnos', 'diplomados', 'pagos', 'gastos', ttl=30)
+    def get_dashboard_snapshot(self) -> Dict[str, float]:
+        """Obtener todos los KPIs del Dashboard en una sola consulta"""
+        ph = self.get_placeholder()
+        
+        fecha_actual = datetime.now()
+        primer_dia = fecha_actual.replace(day=1).strftime('%Y-%m-%d')
+        ultimo_dia = fecha_actual.strftime('%Y-%m-%d')
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(f'''
+                SELECT a.total, a.activos, d.total, i.total, g.total
+                FROM (SELECT COUNT(*) AS total,
+                             COALESCE(SUM(CASE WHEN status='Activo' THEN 1 ELSE 0 END), 0) AS activos
+                      FROM alumnos) a
+                CROSS JOIN (SELECT COUNT(*) AS total FROM diplomados) d
+                CROSS JOIN (SELECT COALESCE(SUM(monto), 0) AS total FROM pagos
+                            WHERE fecha_pago BETWEEN {ph} AND {ph}) i
+                CROSS JOIN (SELECT COALESCE(SUM(monto), 0) AS total FROM gastos
+                            WHERE fecha BETWEEN {ph} AND {ph}) g
+            ''', (primer_dia, ultimo_dia, primer_dia, ultimo_dia))
+            fila = cursor.fetchone()
+        
+        return {
+            'total_alumnos': fila[0],
+            'alumnos_activos': int(fila[1]),
+            'total_diplomados': fila[2],
+            'ingresos_mes': fila[3],
+            'gastos_mes': fila[4]
+        }
     
+    @cacheado('alumnos')
     def get_alumnos_por_diplomado(self) -> List[Tuple]:
         """Obtener conteo de alumnos por diplomado"""
-        ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT diplomado_clave, COUNT(*) 
-            FROM alumnos 
-            WHERE status='Activo'
-            GROUP BY diplomado_clave
-        ''')
-        datos = cursor.fetchall()
-        cursor.close()
-        return datos
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                SELECT diplomado_clave, COUNT(*) 
+                FROM alumnos 
+                WHERE status='Activo'
+                GROUP BY diplomado_clave
+            ''')
+            return cursor.fetchall()
     
-    def get_ingresos_gastos_6_meses(self) -> List[Tuple]:
-        """Obtener ingresos y gastos de los últimos 6 meses"""
-        from datetime import timedelta
+    @cacheado('pagos', 'gastos')
+    def get_ingresos_gastos_meses(self, num_meses: int = 6) -> List[Tuple]:
+        """Obtener ingresos y gastos por mes de los últimos `num_meses` meses (desde resumen_mensual)"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
         
-        meses = []
+        # Meses del periodo, del más antiguo al actual
         fecha_actual = datetime.now()
+        indice_actual = fecha_actual.year * 12 + fecha_actual.month - 1
+        meses = [divmod(i, 12) for i in range(indice_actual - num_meses + 1, indice_actual + 1)]
         
-        for i in range(5, -1, -1):
-            # Calcular el primer día del mes
-            if fecha_actual.month - i <= 0:
-                mes = 12 + (fecha_actual.month - i)
-                año = fecha_actual.year - 1
-            else:
-                mes = fecha_actual.month - i
-                año = fecha_actual.year
-            
-            primer_dia = datetime(año, mes, 1).strftime('%Y-%m-%d')
-            
-            # Calcular el último día del mes
-            if mes == 12:
-                ultimo_dia = datetime(año, mes, 31).strftime('%Y-%m-%d')
-            else:
-                ultimo_dia = (datetime(año, mes + 1, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
-            
-            # Obtener ingresos
+        # Meses completos: se leen de resumen_mensual
+        with self.get_cursor() as cursor:
             cursor.execute(f'''
-                SELECT COALESCE(SUM(monto), 0) FROM pagos 
-                WHERE fecha_pago BETWEEN {ph} AND {ph}
-            ''', (primer_dia, ultimo_dia))
-            ingresos = cursor.fetchone()[0]
-            
-            # Obtener gastos
-            cursor.execute(f'''
-                SELECT COALESCE(SUM(monto), 0) FROM gastos 
-                WHERE fecha BETWEEN {ph} AND {ph}
-            ''', (primer_dia, ultimo_dia))
-            gastos = cursor.fetchone()[0]
-            
-            # Nombre del mes
-            nombres_meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 
-                           'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-            nombre_mes = nombres_meses[mes - 1]
-            
-            meses.append((nombre_mes, ingresos, gastos))
+                SELECT mes, SUM(ingresos), SUM(gastos)
+                FROM resumen_mensual
+                WHERE mes BETWEEN {ph} AND {ph}
+                GROUP BY mes
+            ''', (f"{meses[0][0]:04d}-{meses[0][1] + 1:02d}", f"{meses[-1][0]:04d}-{meses[-1][1] + 1:02d}"))
+            totales = {mes: (ingresos, gastos) for mes, ingresos, gastos in cursor.fetchall()}
         
-        cursor.close()
-        return meses
+        nombres_meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 
+                       'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+        resultado = []
+        for año, mes in meses:
+            clave = f"{año:04d}-{mes + 1:02d}"
+            # Con más de un año el nombre del mes se repetiría; agregar el año
+            nombre_mes = nombres_meses[mes] if num_meses <= 12 else f"{nombres_meses[mes]} {año % 100:02d}"
+            ingresos, gastos = totales.get(clave, (0, 0))
+            resultado.append((nombre_mes, ingresos, gastos))
+        return resultado
+    
+    def get_ingresos_gastos_6_meses(self) -> List[Tuple]:
+        """Obtener ingresos y gastos de los últimos 6 meses"""
+        return self.get_ingresos_gastos_meses(6)
     
-    def get_alumnos_con_adeudos(self) -> List[Tuple]:
-        """Obtener alumnos que tienen adeudos"""
+    @cacheado('alumnos')
+    def get_alumnos_con_adeudos(self, diplomado_clave: str = None, adeudo_minimo: float = None,
+                                limite: int = None) -> List[Tuple]:
+        """Obtener alumnos activos con adeudo, del mayor al menor
+        
+        Lee el saldo que mantienen add_pago y update_alumno, de modo que la consulta
+        recorre el índice (status, saldo) sin agregar pagos.
+        """
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT a.matricula, a.nombre_completo, a.diplomado_clave,
-                   (SELECT COUNT(*) FROM pagos WHERE alumno_id = a.id) as pagadas,
-                   a.num_mensualidades,
-                   (a.total_diplomado - a.pago_inscripcion - 
-                    COALESCE((SELECT SUM(monto) FROM pagos WHERE alumno_id = a.id), 0)) as adeudo
-            FROM alumnos a
-            WHERE status='Activo' 
-            AND (a.total_diplomado - a.pago_inscripcion - 
-                 COALESCE((SELECT SUM(monto) FROM pagos WHERE alumno_id = a.id), 0)) > 0
-            ORDER BY adeudo DESC
-        ''')
-        
-        alumnos = cursor.fetchall()
-        cursor.close()
-        return alumnos
+        params = []
+        
+        query = '''
+            SELECT matricula, nombre_completo, diplomado_clave,
+                   mensualidades_pagadas as pagadas,
+                   num_mensualidades,
+                   saldo as adeudo
+            FROM alumnos
+            WHERE status = 'Activo'
+            AND saldo > 0
+        '''
+        
+        if diplomado_clave:
+            query += f' AND diplomado_clave = {ph}'
+            params.append(diplomado_clave)
+        
+        if adeudo_minimo:
+            query += f' AND saldo >= {ph}'
+            params.append(adeudo_minimo)
+        
+        query += ' ORDER BY saldo DESC'
+        
+        if limite:
+            query += f' LIMIT {ph}'
+            params.append(int(limite))
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
     
     # ========================================================================
     # FUNCIONES PARA CALENDARIO
     # ========================================================================
     
+    @invalida('calendario')
     def add_evento_calendario(self, fecha: str, diplomado_clave: str, tipo: str, modulo: int) -> bool:
         """Agregar un nuevo evento al calendario"""
+        ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                INSERT INTO calendario (fecha, diplomado_clave, tipo, modulo)
-                VALUES ({ph}, {ph}, {ph}, {ph})
-            ''', (fecha, diplomado_clave, tipo, modulo))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f'''
+                    INSERT INTO calendario (fecha, diplomado_clave, tipo, modulo)
+                    VALUES ({ph}, {ph}, {ph}, {ph})
+                ''', (fecha, diplomado_clave, tipo, modulo))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al agregar evento: {e}")
             return False
     
+    @cacheado('calendario')
     def get_eventos_calendario(self, fecha_inicio: str = None, fecha_fin: str = None, 
                                diplomado_clave: str = None) -> List[Tuple]:
         """Obtener eventos del calendario con filtros opcionales"""
         ph = self.get_placeholder()
-        conn = self.get_connection()
-        cursor = conn.cursor()
         
         query = 'SELECT * FROM calendario WHERE 1=1'
         params = []
         
         if fecha_inicio and fecha_fin:
-            query += ' AND fecha BETWEEN ? AND ?'
+            query += f' AND fecha BETWEEN {ph} AND {ph}'
             params.extend([fecha_inicio, fecha_fin])
         
         if diplomado_clave:
-            query += ' AND diplomado_clave = {ph}'
+            query += f' AND diplomado_clave = {ph}'
             params.append(diplomado_clave)
         
         query += ' ORDER BY fecha'
         
-        cursor.execute(query, params)
-        eventos = cursor.fetchall()
-        cursor.close()
-        return eventos
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
     
     def get_eventos_mes(self, año: int, mes: int) -> List[Tuple]:
         """Obtener eventos de un mes específico"""
@@ -875,34 +1671,32 @@ class DatabaseManager:
         
         return self.get_eventos_calendario(primer_dia, ultimo_dia)
     
+    @invalida('calendario')
     def update_evento_calendario(self, id: int, fecha: str, diplomado_clave: str, 
                                  tipo: str, modulo: int) -> bool:
         """Actualizar un evento del calendario"""
+        ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            ph = self.get_placeholder()
-            cursor.execute(f'''
-                UPDATE calendario 
-                SET fecha={ph}, diplomado_clave={ph}, tipo={ph}, modulo={ph}
-                WHERE id = {ph}
-            ''', (fecha, diplomado_clave, tipo, modulo, id))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f'''
+                    UPDATE calendario 
+                    SET fecha={ph}, diplomado_clave={ph}, tipo={ph}, modulo={ph}
+                    WHERE id = {ph}
+                ''', (fecha, diplomado_clave, tipo, modulo, id))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al actualizar evento: {e}")
             return False
     
+    @invalida('calendario')
     def delete_evento_calendario(self, id: int) -> bool:
         """Eliminar un evento del calendario"""
         ph = self.get_placeholder()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f'DELETE FROM calendario WHERE id = {ph}', (id,))
-            conn.commit()
-            cursor.close()
+            with self.get_cursor() as cursor:
+                cursor.execute(f'DELETE FROM calendario WHERE id = {ph}', (id,))
+                cursor.connection.commit()
             return True
         except Exception as e:
             print(f"Error al eliminar evento: {e}")
@@ -0,0 +1,233 @@
+"""Detección de alumnos duplicados (la misma persona con otra matrícula o con su nombre mal escrito).
+
+Comparar a cada alumno contra todos los demás es O(n²). En su lugar cada
+alumno recibe unas pocas claves de bloqueo y sólo se comparan los alumnos
+que comparten alguna:
+
+- el correo normalizado (minúsculas, sin la etiqueta '+algo');
+- el teléfono (sólo dígitos);
+- la clave fonética de su nombre completo (sin acentos, en cualquier orden) y
+  la de cada par de palabras del nombre, para que una palabra mal escrita no
+  impida encontrarlo.
+
+Cada par candidato recibe un puntaje entre 0 y 1 (nombre parecido, mismo
+correo, mismo teléfono) y se reporta si llega a UMBRAL_DUPLICADO: el mismo
+nombre basta para revisar; un nombre con errores necesita además el mismo
+correo o teléfono. Los bloques con más de MAX_BLOQUE alumnos (un nombre muy
+común) no generan pares, de modo que el trabajo total crece casi linealmente
+con el número de alumnos.
+
+    python duplicados.py [--umbral 0.8]
+"""
+import argparse
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from search_index import normalizar
+
+# Peso de cada coincidencia en el puntaje (suman 1)
+PESOS = {'nombre': 0.7, 'correo': 0.2, 'telefono': 0.1}
+
+# Puntaje a partir del cual dos alumnos se consideran un posible duplicado
+UMBRAL_DUPLICADO = 0.7
+
+# Bloques más grandes que esto no se comparan por pares (nombres muy comunes)
+MAX_BLOQUE = 100
+
+# Alumnos de nombre parecido que se revisan al registrar uno nuevo
+MAX_CANDIDATOS_NOMBRE = 20
+
+# Palabras que no distinguen a una persona ("María de la Luz")
+PARTICULAS = {'de', 'del', 'la', 'las', 'los', 'y'}
+
+# Reglas fonéticas del español, en orden: letras que suenan igual se vuelven la misma
+REGLAS_FONETICAS = [
+    (re.compile(r'(?<!u)g(?=[ei])'), 'j'),
+    (re.compile(r'gu(?=[ei])'), 'g'),
+    (re.compile(r'ch'), 'x'),
+    (re.compile(r'll'), 'y'),
+    (re.compile(r'qu'), 'k'),
+    (re.compile(r'c(?=[ei])'), 's'),
+    (re.compile(r'c'), 'k'),
+    (re.compile(r'z'), 's'),
+    (re.compile(r'v'), 'b'),
+    (re.compile(r'h'), ''),
+    (re.compile(r'y$'), 'i'),
+    (re.compile(r'(.)\1+'), r'\1'),
+]
+
+
+class AlumnoDuplicadoError(Exception):
+    """El alumno que se quiere registrar se parece a uno o más alumnos ya registrados"""
+
+    def __init__(self, candidatos: List[Dict]):
+        self.candidatos = candidatos
+        nombres = ', '.join(f"{c['nombre']} ({c['matricula']})" for c in candidatos[:3])
+        super().__init__(f"Posible alumno duplicado: {nombres}")
+
+
+def clave_fonetica(palabra: str) -> str:
+    """'Hernández' y 'Hernandes' -> 'ernandes'; 'Giménez' y 'Jiménez' -> 'jimenes'"""
+    for patron, reemplazo in REGLAS_FONETICAS:
+        palabra = patron.sub(reemplazo, palabra)
+    return palabra
+
+
+def palabras_nombre(nombre: str) -> List[str]:
+    """Palabras del nombre sin acentos, mayúsculas ni partículas"""
+    return [p for p in normalizar(nombre).split() if p not in PARTICULAS]
+
+
+def normalizar_correo(correo: str) -> str:
+    """' Ana.Perez+curso@Correo.com ' -> 'ana.perez@correo.com'"""
+    correo = str(correo or '').strip().lower()
+    usuario, arroba, dominio = correo.partition('@')
+    return usuario.split('+')[0] + arroba + dominio
+
+
+def normalizar_telefono(telefono: str) -> str:
+    """Sólo los últimos 10 dígitos (sin lada internacional, espacios ni guiones)"""
+    return re.sub(r'\D', '', str(telefono or ''))[-10:]
+
+
+def claves_bloqueo(nombre: str, correo: str, telefono: str) -> Set[str]:
+    """Claves que comparten dos registros de la misma persona aunque uno tenga errores"""
+    claves = set()
+    correo = normalizar_correo(correo)
+    if '@' in correo:
+        claves.add('c:' + correo)
+    telefono = normalizar_telefono(telefono)
+    if len(telefono) >= 7:
+        claves.add('t:' + telefono)
+    fonetico = sorted({clave_fonetica(p) for p in palabras_nombre(nombre)})
+    if fonetico:
+        claves.add('n:' + ' '.join(fonetico))
+    for a, b in combinations(fonetico, 2):
+        claves.add(f'p:{a} {b}')
+    return claves
+
+
+def preparar(nombre: str, correo: str, telefono: str) -> Tuple[str, str, str]:
+    """Nombre (palabras ordenadas), correo y teléfono normalizados, listos para comparar"""
+    return ' '.join(sorted(palabras_nombre(nombre))), normalizar_correo(correo), normalizar_telefono(telefono)
+
+
+def similitud_nombre(a: str, b: str) -> float:
+    """Parecido de dos nombres entre 0 y 1, sin importar acentos ni el orden de las palabras"""
+    a, b = preparar(a, '', '')[0], preparar(b, '', '')[0]
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _puntaje(a: Tuple[str, str, str], b: Tuple[str, str, str],
+             umbral: float = 0.0) -> Optional[Tuple[float, List[str]]]:
+    """Puntaje y motivos de dos registros preparados; None si no pueden llegar al umbral"""
+    mismo_correo = '@' in a[1] and a[1] == b[1]
+    mismo_telefono = len(a[2]) >= 7 and a[2] == b[2]
+    contacto = PESOS['correo'] * mismo_correo + PESOS['telefono'] * mismo_telefono
+
+    if a[0] == b[0]:
+        nombre = 1.0 if a[0] else 0.0
+    elif not a[0] or not b[0]:
+        nombre = 0.0
+    elif contacto + PESOS['nombre'] <= umbral:
+        # Con nombres distintos el parecido es menor que 1: el par no alcanza el umbral
+        return None
+    else:
+        # Las cotas de SequenceMatcher son baratas: descartan el par sin calcular el parecido
+        comparador = SequenceMatcher(None, a[0], b[0])
+        if (contacto + PESOS['nombre'] * comparador.real_quick_ratio() < umbral
+                or contacto + PESOS['nombre'] * comparador.quick_ratio() < umbral):
+            return None
+        nombre = comparador.ratio()
+
+    puntaje = round(contacto + PESOS['nombre'] * nombre, 3)
+    if puntaje < umbral:
+        return None
+
+    motivos = []
+    if nombre >= 0.8:
+        motivos.append('mismo nombre' if nombre == 1 else f'nombre {nombre:.0%} parecido')
+    if mismo_correo:
+        motivos.append('mismo correo')
+    if mismo_telefono:
+        motivos.append('mismo teléfono')
+    return puntaje, motivos
+
+
+def comparar(a: Tuple, b: Tuple) -> Tuple[float, List[str]]:
+    """Puntaje y motivos de dos alumnos (id, matricula, nombre, correo, telefono, ...)"""
+    return _puntaje(preparar(*a[2:5]), preparar(*b[2:5]))
+
+
+def candidatos_duplicado(nuevo: Tuple, registrados: Iterable[Tuple],
+                         umbral: float = UMBRAL_DUPLICADO) -> List[Dict]:
+    """Alumnos registrados que probablemente son `nuevo`, del más al menos parecido
+
+    `registrados` son filas (id, matricula, nombre, correo, telefono, diplomado_clave, status)
+    ya filtradas por bloque (ver DatabaseManager.get_posibles_duplicados).
+    """
+    resultado = []
+    preparado = preparar(*nuevo[2:5])
+    for alumno in registrados:
+        comparacion = _puntaje(preparado, preparar(*alumno[2:5]), umbral)
+        if comparacion:
+            puntaje, motivos = comparacion
+            resultado.append({'id': alumno[0], 'matricula': alumno[1], 'nombre': alumno[2],
+                              'diplomado': alumno[5], 'status': alumno[6],
+                              'puntaje': puntaje, 'motivos': ', '.join(motivos)})
+    resultado.sort(key=lambda c: -c['puntaje'])
+    return resultado
+
+
+def buscar_duplicados(alumnos: List[Tuple], umbral: float = UMBRAL_DUPLICADO,
+                      max_bloque: int = MAX_BLOQUE) -> List[Dict]:
+    """Pares de alumnos que probablemente son la misma persona, del más al menos parecido
+
+    `alumnos` son filas (id, matricula, nombre, correo, telefono, diplomado_clave, status).
+    Sólo se comparan los pares que comparten una clave de bloqueo, y cada par una vez.
+    """
+    bloques = defaultdict(list)
+    preparados = []
+    for posicion, alumno in enumerate(alumnos):
+        for clave in claves_bloqueo(*alumno[2:5]):
+            bloques[clave].append(posicion)
+        preparados.append(preparar(*alumno[2:5]))
+
+    comparados = set()
+    pares = []
+    for miembros in bloques.values():
+        if len(miembros) < 2 or len(miembros) > max_bloque:
+            continue
+        for i, j in combinations(miembros, 2):
+            if (i, j) in comparados:
+                continue
+            comparados.add((i, j))
+            comparacion = _puntaje(preparados[i], preparados[j], umbral)
+            if comparacion:
+                puntaje, motivos = comparacion
+                a, b = alumnos[i], alumnos[j]
+                pares.append({'puntaje': puntaje, 'motivos': ', '.join(motivos),
+                              'id_a': a[0], 'matricula_a': a[1], 'nombre_a': a[2], 'diplomado_a': a[5],
+                              'id_b': b[0], 'matricula_b': b[1], 'nombre_b': b[2], 'diplomado_b': b[5]})
+    pares.sort(key=lambda p: (-p['puntaje'], p['nombre_a']))
+    return pares
+
+
+if __name__ == '__main__':
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Buscar alumnos duplicados en toda la tabla")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_DUPLICADO,
+                        help=f"Puntaje mínimo entre 0 y 1 (por omisión {UMBRAL_DUPLICADO})")
+    args = parser.parse_args()
+
+    pares = DatabaseManager().get_alumnos_duplicados(args.umbral)
+    for par in pares:
+        print(f"{par['puntaje']:.2f}  {par['matricula_a']} {par['nombre_a']}  ~  "
+              f"{par['matricula_b']} {par['nombre_b']}  ({par['motivos']})")
+    print(f"{len(pares):,} posibles duplicados")
@@ -0,0 +1,106 @@
+"""Exportación de reportes de pagos a CSV por partes.
+
+Las filas llegan de la base en lotes (cursor sin búfer, ver
+DatabaseManager.iterar_consulta) y cada lote se convierte en un trozo de
+CSV en bytes, de modo que nunca se tienen en memoria todas las filas ni un
+DataFrame. Desde la línea de comandos los trozos se escriben directamente a
+disco y la memoria no crece con el reporte:
+
+    python exportacion.py periodo 2023-01-01 2026-12-31 -o pagos.csv
+    python exportacion.py diplomado CLAVE 2023-01-01 2026-12-31 -o pagos_clave.csv
+
+Desde Streamlit los trozos se escriben a un archivo temporal cuando se pulsa
+"Descargar" (ver archivo_temporal), pero Streamlit lee ese archivo completo
+para servirlo: la descarga desde el navegador ocupa una vez el tamaño del CSV.
+"""
+import argparse
+import csv
+import io
+import sys
+import tempfile
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+COLUMNAS_PAGOS_PERIODO = ['Matrícula', 'Nombre', 'Diplomado', 'Mensualidad', 'Monto', 'Fecha', 'Método']
+COLUMNAS_PAGOS_DIPLOMADO = ['Matrícula', 'Nombre', 'Mensualidad', 'Monto', 'Fecha', 'Método']
+
+
+def csv_por_partes(columnas: List[str], lotes: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    """Encabezado y luego un trozo de CSV (UTF-8) por cada lote de filas"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    escritor.writerow(columnas)
+    for filas in lotes:
+        escritor.writerows(filas)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Sin filas: sólo el encabezado
+        yield buffer.getvalue().encode('utf-8')
+
+
+def csv_pagos_periodo(db, fecha_inicio: str, fecha_fin: str, diplomado_clave: str = None) -> Iterator[bytes]:
+    """CSV del reporte "Pagos por Periodo" por partes"""
+    return csv_por_partes(COLUMNAS_PAGOS_PERIODO,
+                          db.iterar_pagos_filtrados(fecha_inicio, fecha_fin, diplomado_clave))
+
+
+def csv_pagos_diplomado(db, diplomado_clave: str, fecha_inicio: str, fecha_fin: str) -> Iterator[bytes]:
+    """CSV del reporte "Pagos por Diplomado" por partes"""
+    return csv_por_partes(COLUMNAS_PAGOS_DIPLOMADO,
+                          db.iterar_reporte_pagos_diplomado(diplomado_clave, fecha_inicio, fecha_fin))
+
+
+def guardar(partes: Iterable[bytes], destino) -> int:
+    """Escribir los trozos en un archivo (ruta o binario abierto); devuelve los bytes escritos"""
+    if isinstance(destino, str):
+        with open(destino, 'wb') as archivo:
+            return guardar(partes, archivo)
+    total = 0
+    for parte in partes:
+        destino.write(parte)
+        total += len(parte)
+    return total
+
+
+def archivo_temporal(partes: Iterable[bytes]) -> BinaryIO:
+    """Escribir los trozos en un archivo temporal y devolverlo abierto desde el inicio
+    
+    Para st.download_button: el CSV se arma en disco en lugar de unir los trozos en
+    memoria. El archivo se borra al cerrarse.
+    """
+    # Sin búfer: Streamlit sólo acepta archivos binarios de lectura o io.RawIOBase
+    archivo = tempfile.TemporaryFile(buffering=0)
+    escritor = io.BufferedWriter(archivo)
+    guardar(partes, escritor)
+    escritor.flush()
+    escritor.detach()
+    archivo.seek(0)
+    return archivo
+
+
+if __name__ == '__main__':
+    from database import DatabaseManager
+    
+    parser = argparse.ArgumentParser(description="Exportar reportes de pagos a CSV sin cargarlos en memoria")
+    parser.add_argument('-o', '--salida', help="Archivo CSV de salida (por omisión, la salida estándar)")
+    reportes = parser.add_subparsers(dest='reporte', required=True)
+    periodo = reportes.add_parser('periodo', help="Pagos por periodo")
+    periodo.add_argument('desde')
+    periodo.add_argument('hasta')
+    periodo.add_argument('--diplomado', help="Clave del diplomado (opcional)")
+    diplomado = reportes.add_parser('diplomado', help="Pagos de un diplomado")
+    diplomado.add_argument('clave')
+    diplomado.add_argument('desde')
+    diplomado.add_argument('hasta')
+    args = parser.parse_args()
+    
+    db = DatabaseManager()
+    if args.reporte == 'periodo':
+        partes = csv_pagos_periodo(db, args.desde, args.hasta, args.diplomado)
+    else:
+        partes = csv_pagos_diplomado(db, args.clave, args.desde, args.hasta)
+    
+    escritos = guardar(partes, args.salida or sys.stdout.buffer)
+    if args.salida:
+        print(f"✅ {escritos:,} bytes escritos en {args.salida}")
@@ -0,0 +1,343 @@
+"""Generador de datos sintéticos para pruebas de escala.
+
+Llena diplomados, alumnos, pagos, gastos y calendario con distribuciones
+parecidas a las reales: bajas, abonos parciales, la mezcla de métodos del
+formulario de Pagos y fechas repartidas en varios años. Inserta por lotes
+dentro de transacciones, así que sembrar 2M de pagos toma minutos.
+
+    python generar_datos.py --escala x10 --sqlite bench.db --limpiar
+    python generar_datos.py --alumnos 100000 --pagos 2000000 --sqlite bench.db
+"""
+import argparse
+import random
+import string
+import time
+import unicodedata
+from datetime import date, timedelta
+from typing import Dict, List
+
+from database import DatabaseManager
+from backends import SQLiteBackend
+
+# Tamaños predefinidos: el volumen actual y 10x / 100x
+ESCALAS = {
+    'actual': {'diplomados': 20, 'alumnos': 1_000, 'pagos': 10_000, 'gastos': 1_000, 'eventos': 500},
+    'x10': {'diplomados': 50, 'alumnos': 10_000, 'pagos': 100_000, 'gastos': 5_000, 'eventos': 2_000},
+    'x100': {'diplomados': 200, 'alumnos': 100_000, 'pagos': 2_000_000, 'gastos': 20_000, 'eventos': 8_000},
+}
+
+TAMANO_LOTE = 5_000
+
+# Mezcla de métodos del formulario de Pagos
+METODOS_PAGO = ["Transferencia", "Efectivo", "Depósito", "Enlace", "Beca"]
+PESOS_METODOS = [50, 20, 15, 12, 3]
+
+MODALIDADES = ["Presencial", "Virtual", "Híbrida"]
+PESOS_MODALIDADES = [40, 40, 20]
+
+STATUS_ALUMNO = ["Activo", "Baja", "Baja temporal", "Prospecto"]
+PESOS_STATUS = [78, 12, 6, 4]
+
+MOTIVOS_BAJA = ["Motivos económicos", "Cambio de trabajo", "Motivos personales",
+                "Falta de tiempo", "Cambio de residencia", "Salud"]
+
+TEMAS = ["Terapia Cognitivo Conductual", "Psicología Clínica", "Neuropsicología",
+         "Tanatología", "Psicología Infantil", "Terapia de Pareja", "Educación Especial",
+         "Mindfulness", "Psicología Organizacional", "Criminología", "Sexología",
+         "Orientación Vocacional"]
+
+NOMBRES = ["María", "José", "Ana", "Juan", "Luis", "Sofía", "Carlos", "Lucía", "Jorge",
+           "Fernanda", "Andrés", "Valeria", "Raúl", "Mónica", "Héctor", "Ximena", "Ángel",
+           "Paola", "Ramón", "Itzel", "Óscar", "Daniela", "Iván", "Mariana", "Sebastián",
+           "Guadalupe", "Efraín", "Renata", "Martín", "Brenda"]
+
+APELLIDOS = ["Hernández", "García", "Martínez", "López", "González", "Pérez", "Rodríguez",
+             "Sánchez", "Ramírez", "Cruz", "Flores", "Gómez", "Morales", "Vázquez", "Jiménez",
+             "Reyes", "Díaz", "Torres", "Gutiérrez", "Ruiz", "Mendoza", "Aguilar", "Ortiz",
+             "Castillo", "Núñez", "Muñoz", "Chávez", "Ibáñez", "Álvarez", "Peña"]
+
+GASTOS = [("Renta", 8_000, 15_000), ("Luz", 800, 2_500), ("Internet", 600, 1_200),
+          ("Honorarios docentes", 3_000, 12_000), ("Papelería", 150, 1_500),
+          ("Publicidad", 1_000, 6_000), ("Mantenimiento", 500, 4_000),
+          ("Cafetería", 200, 1_200), ("Software", 300, 2_500), ("Viáticos", 400, 3_000)]
+
+TIPOS_EVENTO = ["Clase", "Examen", "Entrega de proyecto"]
+PESOS_EVENTO = [80, 12, 8]
+
+
+def _sumar_meses(fecha: date, meses: int) -> date:
+    año, mes = divmod(fecha.year * 12 + fecha.month - 1 + meses, 12)
+    return date(año, mes + 1, min(fecha.day, 28))
+
+
+def _insertar_lotes(db: DatabaseManager, query: str, filas, tamano_lote: int = TAMANO_LOTE) -> int:
+    """Insertar filas (iterable) con executemany, una transacción por lote"""
+    total = 0
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            with db.transaccion() as cursor:
+                cursor.executemany(query, lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        with db.transaccion() as cursor:
+            cursor.executemany(query, lote)
+        total += len(lote)
+    return total
+
+
+def limpiar(db: DatabaseManager):
+    """Borrar todos los datos (respetando las llaves foráneas)"""
+    with db.transaccion() as cursor:
+        for tabla in ('resumen_mensual', 'pagos', 'calendario', 'alumnos', 'gastos', 'diplomados'):
+            cursor.execute(f'DELETE FROM {tabla}')
+    db.cache.limpiar()
+
+
+def generar_diplomados(db: DatabaseManager, rnd: random.Random, cantidad: int,
+                       hoy: date, años: int) -> List[Dict]:
+    """Diplomados con inicios repartidos en los últimos `años` años"""
+    ph = db.get_placeholder()
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM diplomados')
+        id_previo = cursor.fetchone()[0]
+
+    diplomados = []
+    for i in range(cantidad):
+        num_mensualidades = rnd.choice([6, 8, 10, 12])
+        inicio = hoy - timedelta(days=rnd.randint(0, años * 365))
+        fin = _sumar_meses(inicio, num_mensualidades)
+        tema = rnd.choice(TEMAS)
+        modalidad = rnd.choices(MODALIDADES, PESOS_MODALIDADES)[0]
+        diplomados.append({
+            'nombre': f"Diplomado en {tema}",
+            'clave': f"{''.join(p[0] for p in tema.split() if p[0].isupper())}-{id_previo + i + 1:04d}-{modalidad[0]}",
+            'modalidad': modalidad,
+            'inicio': inicio,
+            'fin': fin,
+            'num_mensualidades': num_mensualidades,
+            'mensualidad': rnd.choice([1_200, 1_500, 1_800, 2_200, 2_500]),
+            'status': 'Activo' if fin >= hoy or rnd.random() < 0.3 else 'Archivado',
+            # Popularidad: unos pocos diplomados concentran la mayoría de los alumnos
+            'peso': rnd.paretovariate(1.5),
+        })
+
+    _insertar_lotes(db, f'''
+        INSERT INTO diplomados (nombre, clave, modalidad, fecha_inicio, fecha_fin,
+                                num_mensualidades, alumnos_inscritos, status)
+        VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, 0, {ph})
+    ''', ((d['nombre'], d['clave'], d['modalidad'], d['inicio'].isoformat(), d['fin'].isoformat(),
+           d['num_mensualidades'], d['status']) for d in diplomados))
+
+    with db.get_cursor() as cursor:
+        cursor.execute(f'SELECT id, clave FROM diplomados WHERE id > {ph}', (id_previo,))
+        ids = {clave: id for id, clave in cursor.fetchall()}
+    for d in diplomados:
+        d['id'] = ids[d['clave']]
+    return diplomados
+
+
+def generar_alumnos(db: DatabaseManager, rnd: random.Random, cantidad: int,
+                    diplomados: List[Dict], hoy: date) -> List[Dict]:
+    """Alumnos repartidos entre diplomados según su popularidad, con bajas"""
+    ph = db.get_placeholder()
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM alumnos')
+        id_previo = cursor.fetchone()[0]
+
+    pesos = [d['peso'] for d in diplomados]
+    asignados = rnd.choices(diplomados, pesos, k=cantidad)
+    alumnos = []
+    for i, dip in enumerate(asignados):
+        nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+        inscripcion = min(dip['inicio'] + timedelta(days=rnd.randint(-30, 15)), hoy)
+        status = rnd.choices(STATUS_ALUMNO, PESOS_STATUS)[0]
+        mensualidad = dip['mensualidad'] * (0.8 if rnd.random() < 0.1 else 1)  # becas parciales
+        pago_inscripcion = rnd.choice([0, 500, 1_000, 1_500])
+        fecha_baja = motivo_baja = None
+        if status == 'Baja':
+            limite = max((min(dip['fin'], hoy) - inscripcion).days, 1)
+            fecha_baja = (inscripcion + timedelta(days=rnd.randint(1, limite))).isoformat()
+            motivo_baja = rnd.choice(MOTIVOS_BAJA)
+        alumnos.append({
+            'matricula': f"{inscripcion.year}{id_previo + i + 1:06d}",
+            'nombre': nombre,
+            'status': status,
+            'diplomado': dip,
+            'inscripcion': inscripcion,
+            'pago_inscripcion': pago_inscripcion,
+            'mensualidad': mensualidad,
+            'fecha_baja': fecha_baja,
+            'motivo_baja': motivo_baja,
+            'curp': ''.join(rnd.choices(string.ascii_uppercase, k=4)) + inscripcion.strftime('%y%m%d')
+                    + ''.join(rnd.choices(string.ascii_uppercase + string.digits, k=8)),
+        })
+
+    def filas():
+        for a in alumnos:
+            dip = a['diplomado']
+            usuario = unicodedata.normalize('NFKD', a['nombre'].split()[0].lower()).encode('ascii', 'ignore').decode()
+            yield (a['matricula'], a['nombre'], a['status'], dip['id'], dip['clave'],
+                   f"55{rnd.randint(10_000_000, 99_999_999)}", f"{usuario}.{a['matricula']}@correo.com",
+                   a['inscripcion'].isoformat(), a['pago_inscripcion'], a['mensualidad'],
+                   dip['num_mensualidades'],
+                   a['pago_inscripcion'] + a['mensualidad'] * dip['num_mensualidades'],
+                   a['curp'], a['fecha_baja'], a['motivo_baja'])
+
+    _insertar_lotes(db, f'''
+        INSERT INTO alumnos (matricula, nombre_completo, status, diplomado_id, diplomado_clave,
+                             telefono, correo, fecha_inscripcion, pago_inscripcion, mensualidad,
+                             num_mensualidades, total_diplomado, curp, fecha_baja, motivo_baja)
+        VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+    ''', filas())
+
+    with db.get_cursor() as cursor:
+        cursor.execute(f'SELECT id, matricula FROM alumnos WHERE id > {ph}', (id_previo,))
+        ids = {matricula: id for id, matricula in cursor.fetchall()}
+    for a in alumnos:
+        a['id'] = ids[a['matricula']]
+
+    # La carga masiva no pasa por add_alumno: recalcular el contador de inscritos
+    db.reconciliar_alumnos_inscritos()
+    return alumnos
+
+
+def _mensualidades_pagables(alumno: Dict, hoy: date) -> int:
+    """Mensualidades vencidas hasta hoy (o hasta la baja)"""
+    if alumno['status'] == 'Prospecto':
+        return 0
+    dip = alumno['diplomado']
+    corte = date.fromisoformat(alumno['fecha_baja']) if alumno['fecha_baja'] else hoy
+    meses = (corte.year - dip['inicio'].year) * 12 + corte.month - dip['inicio'].month + 1
+    return max(0, min(meses, dip['num_mensualidades']))
+
+
+def generar_pagos(db: DatabaseManager, rnd: random.Random, cantidad: int,
+                  alumnos: List[Dict], hoy: date) -> int:
+    """Pagos de las mensualidades vencidas; abonos parciales y atrasos para acercarse a `cantidad`"""
+    ph = db.get_placeholder()
+    pagables = [_mensualidades_pagables(a, hoy) for a in alumnos]
+    base = sum(pagables)
+    if not base or not cantidad:
+        return 0
+    # Menos pagos que mensualidades vencidas: adeudos; más: abonos parciales
+    razon = cantidad / base
+
+    def filas():
+        for alumno, meses in zip(alumnos, pagables):
+            inicio = alumno['diplomado']['inicio']
+            metodo_habitual = rnd.choices(METODOS_PAGO, PESOS_METODOS)[0]
+            for num in range(1, meses + 1):
+                if razon < 1:
+                    abonos = 1 if rnd.random() < razon else 0
+                else:
+                    abonos = int(razon) + (1 if rnd.random() < razon - int(razon) else 0)
+                if not abonos:
+                    continue
+                vencimiento = _sumar_meses(inicio, num - 1)
+                for k in range(abonos):
+                    # La mayoría paga cerca del vencimiento, algunos con semanas de atraso
+                    fecha = min(vencimiento + timedelta(days=int(rnd.expovariate(1 / 6)) + k * 7), hoy)
+                    metodo = metodo_habitual if rnd.random() < 0.8 else rnd.choices(METODOS_PAGO, PESOS_METODOS)[0]
+                    yield (alumno['id'], num, round(alumno['mensualidad'] / abonos, 2),
+                           fecha.isoformat(), metodo)
+
+    return _insertar_lotes(db, f'''
+        INSERT INTO pagos (alumno_id, num_mensualidad, monto, fecha_pago, metodo_pago)
+        VALUES ({ph}, {ph}, {ph}, {ph}, {ph})
+    ''', filas())
+
+
+def generar_gastos(db: DatabaseManager, rnd: random.Random, cantidad: int,
+                   hoy: date, años: int) -> int:
+    """Gastos con conceptos y montos típicos, repartidos en los últimos `años` años"""
+    ph = db.get_placeholder()
+
+    def filas():
+        for _ in range(cantidad):
+            concepto, minimo, maximo = rnd.choice(GASTOS)
+            fecha = hoy - timedelta(days=rnd.randint(0, años * 365))
+            yield (fecha.isoformat(), concepto, round(rnd.uniform(minimo, maximo), 2))
+
+    return _insertar_lotes(db, f'''
+        INSERT INTO gastos (fecha, concepto, monto) VALUES ({ph}, {ph}, {ph})
+    ''', filas())
+
+
+def generar_eventos(db: DatabaseManager, rnd: random.Random, cantidad: int,
+                    diplomados: List[Dict]) -> int:
+    """Clases, exámenes y entregas dentro del periodo de cada diplomado"""
+    ph = db.get_placeholder()
+
+    def filas():
+        for dip in rnd.choices(diplomados, k=cantidad):
+            dias = max((dip['fin'] - dip['inicio']).days, 1)
+            desfase = rnd.randint(0, dias)
+            modulo = min(desfase * dip['num_mensualidades'] // dias + 1, dip['num_mensualidades'])
+            yield ((dip['inicio'] + timedelta(days=desfase)).isoformat(), dip['clave'],
+                   rnd.choices(TIPOS_EVENTO, PESOS_EVENTO)[0], modulo)
+
+    return _insertar_lotes(db, f'''
+        INSERT INTO calendario (fecha, diplomado_clave, tipo, modulo) VALUES ({ph}, {ph}, {ph}, {ph})
+    ''', filas())
+
+
+def generar(db: DatabaseManager, diplomados: int, alumnos: int, pagos: int, gastos: int,
+            eventos: int, años: int = 4, semilla: int = 42, verbose: bool = True) -> Dict[str, int]:
+    """Sembrar la base de datos; devuelve las filas insertadas por tabla"""
+    rnd = random.Random(semilla)
+    hoy = date.today()
+    insertadas = {}
+
+    def paso(nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        insertadas[nombre] = resultado if isinstance(resultado, int) else len(resultado)
+        if verbose:
+            print(f"  ✅ {nombre}: {insertadas[nombre]:,} filas en {time.perf_counter() - inicio:.1f} s")
+        return resultado
+
+    lista_diplomados = paso('diplomados', lambda: generar_diplomados(db, rnd, diplomados, hoy, años))
+    lista_alumnos = paso('alumnos', lambda: generar_alumnos(db, rnd, alumnos, lista_diplomados, hoy))
+    paso('pagos', lambda: generar_pagos(db, rnd, pagos, lista_alumnos, hoy))
+    paso('gastos', lambda: generar_gastos(db, rnd, gastos, hoy, años))
+    paso('calendario', lambda: generar_eventos(db, rnd, eventos, lista_diplomados))
+
+    # Las cargas masivas no pasan por add_pago/add_gasto: recalcular resumen y saldos
+    db.reconstruir_resumen_mensual()
+    db.reconciliar_saldos()
+    db.cache.limpiar()
+    return insertadas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos para pruebas de escala")
+    parser.add_argument('--escala', choices=sorted(ESCALAS), default='actual',
+                        help="Tamaños predefinidos (se pueden sobrescribir uno por uno)")
+    for tabla in ESCALAS['actual']:
+        parser.add_argument(f'--{tabla}', type=int, help=f"Número de {tabla}")
+    parser.add_argument('--años', type=int, default=4, help="Años que abarcan las fechas")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--sqlite', help="Archivo SQLite local (si no, la base configurada)")
+    parser.add_argument('--limpiar', action='store_true', help="Borrar los datos existentes antes")
+    args = parser.parse_args()
+
+    tamanos = dict(ESCALAS[args.escala])
+    for tabla in tamanos:
+        if getattr(args, tabla) is not None:
+            tamanos[tabla] = getattr(args, tabla)
+
+    print(f"🔧 Generando datos sintéticos ({', '.join(f'{t}={n:,}' for t, n in tamanos.items())})...")
+
+    try:
+        db = DatabaseManager(backend=SQLiteBackend(args.sqlite)) if args.sqlite else DatabaseManager()
+        if args.limpiar:
+            limpiar(db)
+            print("🧹 Datos anteriores eliminados")
+        inicio = time.perf_counter()
+        generar(db, años=args.años, semilla=args.semilla, **tamanos)
+        print(f"\n✅ Listo en {time.perf_counter() - inicio:.1f} s")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
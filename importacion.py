@@ -0,0 +1,164 @@
+"""Importación masiva de alumnos desde un archivo CSV o XLSX.
+
+Todas las filas se validan de una vez con operaciones de pandas (sin un
+ciclo por fila) contra las mismas reglas del formulario "Agregar Alumno".
+Las filas válidas se insertan con DatabaseManager.add_alumnos_bulk en una
+sola transacción y las inválidas se devuelven como reporte de errores con
+su número de fila en el archivo.
+"""
+import unicodedata
+from datetime import date
+from typing import List, Tuple
+
+import pandas as pd
+
+STATUS_ALUMNO = ["Activo", "Baja", "Baja temporal", "Prospecto"]
+
+# Columnas del archivo (encabezados normalizados: minúsculas, sin acentos, '_' por espacios)
+COLUMNAS = ['matricula', 'nombre_completo', 'telefono', 'correo', 'status', 'diplomado_clave',
+            'fecha_inscripcion', 'pago_inscripcion', 'mensualidad']
+OBLIGATORIAS = ['matricula', 'nombre_completo', 'telefono', 'correo', 'diplomado_clave',
+                'pago_inscripcion', 'mensualidad']
+
+# Encabezados alternativos aceptados
+ALIAS = {
+    'nombre': 'nombre_completo',
+    'diplomado': 'diplomado_clave',
+    'clave': 'diplomado_clave',
+    'clave_diplomado': 'diplomado_clave',
+    'email': 'correo',
+    'correo_electronico': 'correo',
+    'fecha': 'fecha_inscripcion',
+    'inscripcion': 'pago_inscripcion',
+}
+
+PATRON_CORREO = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+PATRON_10_DIGITOS = r'^\d{10}$'
+
+
+def normalizar_encabezado(nombre, alias: dict = ALIAS) -> str:
+    """'Matrícula ' -> 'matricula', 'Nombre Completo' -> 'nombre_completo' (y luego `alias`)"""
+    texto = unicodedata.normalize('NFKD', str(nombre).strip().lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = '_'.join(texto.split())
+    return alias.get(texto, texto)
+
+
+def plantilla_csv() -> bytes:
+    """Archivo de ejemplo con los encabezados esperados"""
+    ejemplo = pd.DataFrame([{
+        'matricula': '2026000001', 'nombre_completo': 'Nombre Apellido Apellido',
+        'telefono': '5512345678', 'correo': 'alumno@correo.com', 'status': 'Activo',
+        'diplomado_clave': 'CLAVE', 'fecha_inscripcion': date.today().strftime('%Y-%m-%d'),
+        'pago_inscripcion': 1000, 'mensualidad': 2500,
+    }], columns=COLUMNAS)
+    return ejemplo.to_csv(index=False).encode('utf-8')
+
+
+def leer_archivo(archivo, nombre: str = None) -> pd.DataFrame:
+    """Leer un CSV o XLSX como texto (conserva ceros a la izquierda) con encabezados normalizados
+
+    `archivo` puede ser una ruta o un objeto tipo archivo (p. ej. el de st.file_uploader).
+    """
+    nombre = (nombre or getattr(archivo, 'name', None) or str(archivo)).lower()
+    if nombre.endswith(('.xlsx', '.xls')):
+        try:
+            df = pd.read_excel(archivo, dtype=str)
+        except ImportError:
+            raise ImportError("Para leer archivos de Excel instala openpyxl (pip install openpyxl)")
+    else:
+        df = pd.read_csv(archivo, dtype=str, encoding='utf-8-sig')
+    df.columns = [normalizar_encabezado(c) for c in df.columns]
+    return df
+
+
+def preparar(df: pd.DataFrame) -> pd.DataFrame:
+    """Sólo las columnas conocidas, como texto sin espacios y con status 'Activo' por omisión"""
+    faltantes = [c for c in OBLIGATORIAS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+
+    datos = pd.DataFrame(index=df.index)
+    for columna in COLUMNAS:
+        valores = df[columna] if columna in df.columns else pd.Series('', index=df.index)
+        datos[columna] = valores.fillna('').astype(str).str.strip()
+    # Excel guarda los números como '5512345678.0' al leerlos como texto
+    for columna in ('matricula', 'telefono'):
+        datos[columna] = datos[columna].str.replace(r'\.0$', '', regex=True)
+    datos['status'] = datos['status'].replace('', 'Activo')
+    datos['diplomado_clave'] = datos['diplomado_clave'].str.upper()
+    return datos
+
+
+def validar_alumnos(df: pd.DataFrame, diplomados: List[Tuple],
+                    matriculas_existentes: set = frozenset()) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Validar todas las filas a la vez
+
+    `diplomados` son las filas de get_all_diplomados. Devuelve (validos, errores):
+    `validos` trae las columnas listas para add_alumnos_bulk y `errores` las
+    columnas fila, matricula, nombre_completo y errores (mensajes separados por '; ').
+    """
+    datos = preparar(df)
+
+    mensualidades = {d[2].upper(): (d[2], d[6]) for d in diplomados}
+    fechas = pd.to_datetime(datos['fecha_inscripcion'].replace('', date.today().isoformat()),
+                            errors='coerce', dayfirst=False)
+    pago_inscripcion = pd.to_numeric(datos['pago_inscripcion'], errors='coerce')
+    mensualidad = pd.to_numeric(datos['mensualidad'], errors='coerce')
+
+    reglas = [
+        (datos['nombre_completo'] == '', "nombre vacío"),
+        (~datos['matricula'].str.match(PATRON_10_DIGITOS), "la matrícula debe tener 10 dígitos"),
+        (datos['matricula'].duplicated(keep=False) & (datos['matricula'] != ''),
+         "matrícula repetida en el archivo"),
+        (datos['matricula'].isin(matriculas_existentes), "la matrícula ya está registrada"),
+        (~datos['telefono'].str.match(PATRON_10_DIGITOS), "el teléfono debe tener 10 dígitos"),
+        (~datos['correo'].str.match(PATRON_CORREO), "correo inválido"),
+        (~datos['status'].isin(STATUS_ALUMNO), f"status debe ser uno de: {', '.join(STATUS_ALUMNO)}"),
+        (~datos['diplomado_clave'].isin(mensualidades.keys()), "el diplomado no existe"),
+        (fechas.isna(), "fecha de inscripción inválida"),
+        (pago_inscripcion.isna() | (pago_inscripcion < 0), "pago de inscripción inválido"),
+        (mensualidad.isna() | (mensualidad < 0), "mensualidad inválida"),
+    ]
+
+    mensajes = pd.Series('', index=datos.index)
+    for mascara, mensaje in reglas:
+        mensajes = mensajes.mask(mascara, mensajes + mensaje + '; ')
+    invalidas = mensajes != ''
+
+    errores = pd.DataFrame({
+        # Número de fila como se ve en el archivo (el encabezado es la fila 1)
+        'fila': datos.index[invalidas] + 2,
+        'matricula': datos.loc[invalidas, 'matricula'],
+        'nombre_completo': datos.loc[invalidas, 'nombre_completo'],
+        'errores': mensajes[invalidas].str.rstrip('; '),
+    }).reset_index(drop=True)
+
+    validos = datos.loc[~invalidas].copy()
+    diplomado = validos['diplomado_clave'].map(mensualidades)
+    validos['diplomado_clave'] = diplomado.str[0]
+    validos['num_mensualidades'] = diplomado.str[1].astype(int)
+    validos['fecha_inscripcion'] = fechas[~invalidas].dt.strftime('%Y-%m-%d')
+    validos['pago_inscripcion'] = pago_inscripcion[~invalidas].astype(float)
+    validos['mensualidad'] = mensualidad[~invalidas].astype(float)
+    validos['total_diplomado'] = validos['pago_inscripcion'] + validos['mensualidad'] * validos['num_mensualidades']
+    return validos, errores
+
+
+def importar_alumnos(db, df: pd.DataFrame) -> Tuple[int, pd.DataFrame]:
+    """Validar e insertar las filas válidas; devuelve (alumnos insertados, reporte de errores)
+
+    Si la inserción falla no se guarda ninguna fila (una sola transacción) y se
+    devuelve 0 junto con el reporte de validación.
+    """
+    datos = preparar(df)
+    existentes = db.get_matriculas_existentes(datos['matricula'][datos['matricula'] != ''].tolist())
+    validos, errores = validar_alumnos(datos, db.get_all_diplomados(), existentes)
+
+    # astype(object): tipos de Python (int, float) que entienden pymysql y sqlite3
+    filas = list(validos[['matricula', 'nombre_completo', 'status', 'diplomado_clave', 'telefono', 'correo',
+                          'fecha_inscripcion', 'pago_inscripcion', 'mensualidad', 'num_mensualidades',
+                          'total_diplomado']].astype(object).itertuples(index=False, name=None))
+    if filas and not db.add_alumnos_bulk(filas):
+        return 0, errores
+    return len(filas), errores
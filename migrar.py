@@ -0,0 +1,26 @@
+from database import DatabaseManager
+
+print("🔧 Aplicando migraciones de esquema...")
+
+try:
+    db = DatabaseManager(skip_init=True)
+    
+    aplicadas = db.aplicar_migraciones()
+    if aplicadas:
+        print(f"✅ Migraciones aplicadas: {', '.join(str(v) for v in aplicadas)}")
+    else:
+        print("✅ El esquema ya estaba al día")
+    
+    # Revisar que las consultas frecuentes usen índices
+    print("\n🔍 Revisando planes de las consultas frecuentes...")
+    problemas = db.verificar_indices()
+    if problemas:
+        print("⚠️  Consultas que leen tablas completas:")
+        for consulta, tabla, tipo, filas in problemas:
+            print(f"  - {consulta}: {tabla} ({tipo}, ~{filas} filas)")
+        print("\n💡 En tablas con pocas filas MySQL puede preferir leerlas completas aunque exista el índice.")
+    else:
+        print("✅ Todas las consultas frecuentes usan índice")
+
+except Exception as e:
+    print(f"\n❌ Error: {e}")
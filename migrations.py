@@ -0,0 +1,306 @@
+"""Migraciones versionadas del esquema de AcademiApp.
+
+Cada migración es (version, descripcion, funcion). La función recibe el
+DatabaseManager y un cursor, y debe poder repetirse sin error si quedó a
+medias (en MySQL los DDL no son transaccionales). Los tipos de columna y
+las consultas de catálogo vienen del motor (`db.backend`). Las versiones aplicadas
+se registran en la tabla schema_version.
+"""
+from datetime import datetime
+from typing import List, Tuple
+
+
+# ============================================================================
+# UTILIDADES
+# ============================================================================
+
+def existe_indice(db, cursor, tabla: str, nombre: str) -> bool:
+    """¿Existe el índice `nombre` en `tabla`?"""
+    return db.backend.existe_indice(cursor, tabla, nombre)
+
+
+def existe_columna(db, cursor, tabla: str, columna: str) -> bool:
+    """¿Existe la columna `columna` en `tabla`?"""
+    return db.backend.existe_columna(cursor, tabla, columna)
+
+
+def agregar_columna(db, cursor, tabla: str, columna: str, definicion: str):
+    """Agregar una columna sólo si no existe todavía"""
+    if not existe_columna(db, cursor, tabla, columna):
+        cursor.execute(f'ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}')
+
+
+def crear_indice(db, cursor, tabla: str, nombre: str, columnas: str):
+    """Crear un índice sólo si no existe todavía"""
+    if not existe_indice(db, cursor, tabla, nombre):
+        cursor.execute(f'CREATE INDEX {nombre} ON {tabla} ({columnas})')
+
+
+# ============================================================================
+# MIGRACIONES
+# ============================================================================
+
+def _esquema_base(db, cursor):
+    """Tablas principales"""
+    # Tipos de datos del motor (MySQL o SQLite)
+    tipos = db.backend.tipos
+    pk = tipos['pk']
+    integer = tipos['integer']
+    real = tipos['real']
+    text_type = tipos['text']
+    varchar_50 = tipos['varchar_50']
+    varchar_255 = tipos['varchar_255']
+    date_type = tipos['date']
+
+    # Tabla de Diplomados
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS diplomados (
+            id {pk},
+            nombre {varchar_255} NOT NULL,
+            clave {varchar_50} UNIQUE NOT NULL,
+            modalidad {varchar_50} NOT NULL,
+            fecha_inicio {date_type} NOT NULL,
+            fecha_fin {date_type} NOT NULL,
+            num_mensualidades {integer} NOT NULL,
+            alumnos_inscritos {integer} DEFAULT 0,
+            status {varchar_50} DEFAULT 'Activo'
+        )
+    ''')
+
+    # Tabla de Alumnos
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS alumnos (
+            id {pk},
+            matricula {varchar_50} NOT NULL,
+            nombre_completo {varchar_255} NOT NULL,
+            status {varchar_50} NOT NULL,
+            diplomado_id {integer},
+            diplomado_clave {varchar_50} NOT NULL,
+            telefono {varchar_50} NOT NULL,
+            correo {varchar_255} NOT NULL,
+            fecha_inscripcion {date_type} NOT NULL,
+            pago_inscripcion {real} NOT NULL,
+            mensualidad {real} NOT NULL,
+            num_mensualidades {integer} NOT NULL,
+            total_diplomado {real} NOT NULL,
+            curp {varchar_50} DEFAULT '',
+            fecha_baja {date_type},
+            motivo_baja {text_type},
+            FOREIGN KEY (diplomado_id) REFERENCES diplomados(id)
+        )
+    ''')
+
+    # Tabla de Pagos
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS pagos (
+            id {pk},
+            alumno_id {integer} NOT NULL,
+            num_mensualidad {integer} NOT NULL,
+            monto {real} NOT NULL,
+            fecha_pago {date_type} NOT NULL,
+            metodo_pago {varchar_50} NOT NULL,
+            FOREIGN KEY (alumno_id) REFERENCES alumnos(id)
+        )
+    ''')
+
+    # Tabla de Gastos
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS gastos (
+            id {pk},
+            fecha {date_type} NOT NULL,
+            concepto {varchar_255} NOT NULL,
+            monto {real} NOT NULL
+        )
+    ''')
+
+    # Tabla de Calendario
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS calendario (
+            id {pk},
+            fecha {date_type} NOT NULL,
+            diplomado_clave {varchar_50} NOT NULL,
+            tipo {varchar_50} NOT NULL,
+            modulo {integer} NOT NULL,
+            FOREIGN KEY (diplomado_clave) REFERENCES diplomados(clave)
+        )
+    ''')
+
+
+# Índices de las columnas por las que filtran las consultas frecuentes
+INDICES_FILTROS = [
+    ('alumnos', 'idx_alumnos_matricula', 'matricula'),
+    ('alumnos', 'idx_alumnos_diplomado_status', 'diplomado_clave, status'),
+    ('pagos', 'idx_pagos_alumno_mensualidad', 'alumno_id, num_mensualidad'),
+    ('pagos', 'idx_pagos_fecha', 'fecha_pago'),
+    ('gastos', 'idx_gastos_fecha', 'fecha'),
+    ('calendario', 'idx_calendario_fecha', 'fecha'),
+]
+
+
+def _indices_filtros(db, cursor):
+    """Índices para matrícula, diplomado+status, pagos por alumno y fechas"""
+    for tabla, nombre, columnas in INDICES_FILTROS:
+        crear_indice(db, cursor, tabla, nombre, columnas)
+
+
+def _columnas_status_y_baja(db, cursor):
+    """Columnas agregadas después de la primera versión (bases de datos antiguas)"""
+    tipos = db.backend.tipos
+    agregar_columna(db, cursor, 'diplomados', 'status', "VARCHAR(20) DEFAULT 'Activo'")
+    agregar_columna(db, cursor, 'alumnos', 'fecha_baja', tipos['date'])
+    agregar_columna(db, cursor, 'alumnos', 'motivo_baja', tipos['text'])
+
+
+def llenar_resumen_mensual(db, cursor):
+    """Recalcular resumen_mensual completo desde pagos y gastos"""
+    cursor.execute('DELETE FROM resumen_mensual')
+    mes_pago = db.backend.sql_mes('p.fecha_pago')
+    cursor.execute(f'''
+        INSERT INTO resumen_mensual (mes, diplomado_clave, metodo_pago, ingresos, gastos, num_pagos)
+        SELECT {mes_pago}, a.diplomado_clave, p.metodo_pago, SUM(p.monto), 0, COUNT(*)
+        FROM pagos p
+        JOIN alumnos a ON p.alumno_id = a.id
+        GROUP BY {mes_pago}, a.diplomado_clave, p.metodo_pago
+    ''', ())
+    mes_gasto = db.backend.sql_mes('fecha')
+    cursor.execute(f'''
+        INSERT INTO resumen_mensual (mes, diplomado_clave, metodo_pago, ingresos, gastos, num_pagos)
+        SELECT {mes_gasto}, '', '', 0, SUM(monto), 0
+        FROM gastos
+        GROUP BY {mes_gasto}
+    ''', ())
+
+
+def _resumen_mensual(db, cursor):
+    """Tabla resumen_mensual (mes × diplomado × método de pago) y su llenado inicial"""
+    tipos = db.backend.tipos
+    # Los gastos no tienen diplomado ni método: se guardan con clave y método vacíos
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS resumen_mensual (
+            mes VARCHAR(7) NOT NULL,
+            diplomado_clave {tipos['varchar_50']} NOT NULL DEFAULT '',
+            metodo_pago {tipos['varchar_50']} NOT NULL DEFAULT '',
+            ingresos {tipos['total']} NOT NULL DEFAULT 0,
+            gastos {tipos['total']} NOT NULL DEFAULT 0,
+            num_pagos {tipos['integer']} NOT NULL DEFAULT 0,
+            PRIMARY KEY (mes, diplomado_clave, metodo_pago)
+        )
+    ''')
+    llenar_resumen_mensual(db, cursor)
+
+
+def llenar_saldos_alumnos(db, cursor):
+    """Recalcular total_pagado, mensualidades_pagadas y saldo de todos los alumnos desde pagos"""
+    cursor.execute('''
+        UPDATE alumnos
+        SET total_pagado = COALESCE((SELECT SUM(monto) FROM pagos WHERE alumno_id = alumnos.id), 0),
+            mensualidades_pagadas = (SELECT COUNT(DISTINCT num_mensualidad) FROM pagos WHERE alumno_id = alumnos.id),
+            saldo = total_diplomado - pago_inscripcion
+                    - COALESCE((SELECT SUM(monto) FROM pagos WHERE alumno_id = alumnos.id), 0)
+    ''', ())
+
+
+def _saldos_alumnos(db, cursor):
+    """Columnas total_pagado, mensualidades_pagadas y saldo en alumnos, con su llenado inicial"""
+    tipos = db.backend.tipos
+    # Al final de la tabla: las posiciones de las columnas existentes no cambian
+    agregar_columna(db, cursor, 'alumnos', 'total_pagado', f"{tipos['total']} NOT NULL DEFAULT 0")
+    agregar_columna(db, cursor, 'alumnos', 'mensualidades_pagadas', f"{tipos['integer']} NOT NULL DEFAULT 0")
+    agregar_columna(db, cursor, 'alumnos', 'saldo', f"{tipos['total']} NOT NULL DEFAULT 0")
+    llenar_saldos_alumnos(db, cursor)
+    # Adeudos de alumnos activos ordenados por saldo sin recorrer la tabla
+    crear_indice(db, cursor, 'alumnos', 'idx_alumnos_status_saldo', 'status, saldo')
+
+
+def llenar_alumnos_inscritos(db, cursor):
+    """Recalcular alumnos_inscritos de todos los diplomados en una sola sentencia"""
+    cursor.execute('''
+        UPDATE diplomados
+        SET alumnos_inscritos = (SELECT COUNT(*) FROM alumnos WHERE alumnos.diplomado_id = diplomados.id)
+    ''', ())
+
+
+# El directorio de alumnos se recorre por (nombre_completo, id), con o sin filtro de diplomado
+INDICES_DIRECTORIO = [
+    ('alumnos', 'idx_alumnos_nombre', 'nombre_completo, id'),
+    ('alumnos', 'idx_alumnos_diplomado_nombre', 'diplomado_clave, nombre_completo, id'),
+]
+
+
+def _indices_directorio(db, cursor):
+    """Índices para paginar el directorio de alumnos por llave"""
+    for tabla, nombre, columnas in INDICES_DIRECTORIO:
+        crear_indice(db, cursor, tabla, nombre, columnas)
+
+
+def _indices_duplicados(db, cursor):
+    """Índices para buscar alumnos con el mismo correo o teléfono al registrar uno nuevo"""
+    crear_indice(db, cursor, 'alumnos', 'idx_alumnos_correo', 'correo')
+    crear_indice(db, cursor, 'alumnos', 'idx_alumnos_telefono', 'telefono')
+
+
+MIGRACIONES = [
+    (1, 'Esquema base', _esquema_base),
+    (2, 'Índices para columnas de filtro frecuentes', _indices_filtros),
+    (3, 'Columnas status, fecha_baja y motivo_baja', _columnas_status_y_baja),
+    (4, 'Tabla resumen_mensual', _resumen_mensual),
+    (5, 'Saldos por alumno (total_pagado, mensualidades_pagadas, saldo)', _saldos_alumnos),
+    # A partir de aquí el contador se mantiene con incrementos; se corrige la desviación histórica
+    (6, 'Reconciliar alumnos_inscritos', llenar_alumnos_inscritos),
+    (7, 'Índices del directorio de alumnos por nombre', _indices_directorio),
+    (8, 'Índices de correo y teléfono de alumnos', _indices_duplicados),
+]
+
+
+# ============================================================================
+# EJECUCIÓN
+# ============================================================================
+
+CANDADO_MIGRACIONES = 'academiapp_migraciones'
+
+
+def get_version(db, cursor) -> int:
+    """Versión actual del esquema (0 si nunca se migró); crea schema_version si falta"""
+    try:
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        return cursor.fetchone()[0]
+    except db.backend.TablaInexistenteError:
+        tipos = db.backend.tipos
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version {tipos['integer']} PRIMARY KEY,
+                descripcion {tipos['varchar_255']} NOT NULL,
+                aplicada_en {tipos['datetime']} NOT NULL
+            )
+        ''')
+        return 0
+
+
+def get_pendientes(version_actual: int) -> List[Tuple]:
+    """Migraciones con versión mayor a la actual, en orden"""
+    return [m for m in MIGRACIONES if m[0] > version_actual]
+
+
+def aplicar_migraciones(db, cursor) -> List[int]:
+    """Aplicar las migraciones pendientes en orden; devuelve las versiones aplicadas
+
+    Con el esquema al día sólo cuesta una lectura de schema_version. Si hay
+    pendientes, se toma un candado con nombre para que dos procesos que
+    arrancan a la vez no apliquen la misma migración.
+    """
+    if not get_pendientes(get_version(db, cursor)):
+        return []
+
+    ph = db.get_placeholder()
+    aplicadas = []
+    with db.backend.candado(cursor, CANDADO_MIGRACIONES):
+        # Releer la versión: otro proceso pudo migrar mientras esperábamos
+        for version, descripcion, migracion in get_pendientes(get_version(db, cursor)):
+            migracion(db, cursor)
+            cursor.execute(f'''
+                INSERT INTO schema_version (version, descripcion, aplicada_en)
+                VALUES ({ph}, {ph}, {ph})
+            ''', (version, descripcion, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            cursor.connection.commit()
+            aplicadas.append(version)
+    return aplicadas
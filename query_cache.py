@@ -0,0 +1,155 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+# Segundos que vive un resultado según las tablas que consulta (se usa el menor)
+TTL_POR_TABLA = {
+    'diplomados': 300,
+    'alumnos': 120,
+    'pagos': 60,
+    'gastos': 120,
+    'calendario': 300,
+}
+
+
+class QueryCache:
+    """Cache LRU de resultados de consultas, con TTL por tabla.
+
+    Cada entrada recuerda las tablas que leyó; `invalidar` borra exactamente
+    las entradas que dependen de las tablas escritas. Un contador de
+    generación por tabla evita guardar un resultado que se leyó antes de una
+    escritura concurrente y terminó después de ella.
+    """
+
+    def __init__(self, max_entradas: int = 512, ttl_por_tabla: Dict[str, int] = None,
+                 ttl_default: int = 60):
+        self.max_entradas = max_entradas
+        self.ttl_por_tabla = dict(TTL_POR_TABLA, **(ttl_por_tabla or {}))
+        self.ttl_default = ttl_default
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (valor, expira, tablas)
+        self._por_tabla = {}  # tabla -> claves que dependen de ella
+        self._generacion = {}  # tabla -> número de escrituras
+        self._stats = {'aciertos': 0, 'fallos': 0, 'expiradas': 0, 'desalojadas': 0,
+                       'invalidadas': 0}
+
+    def get(self, clave):
+        """Devuelve (encontrado, valor)"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self._stats['fallos'] += 1
+                return False, None
+            valor, expira, tablas = entrada
+            if expira <= time.monotonic():
+                self._quitar(clave)
+                self._stats['expiradas'] += 1
+                self._stats['fallos'] += 1
+                return False, None
+            self._entradas.move_to_end(clave)
+            self._stats['aciertos'] += 1
+            return True, valor
+
+    def generaciones(self, tablas: Iterable[str]) -> tuple:
+        """Generación actual de cada tabla (tomarla antes de consultar)"""
+        with self._lock:
+            return tuple(self._generacion.get(t, 0) for t in tablas)
+
+    def set(self, clave, valor, tablas: tuple, generaciones: tuple, ttl: int = None):
+        """Guardar un resultado si ninguna de sus tablas se escribió mientras se consultaba"""
+        if ttl is None:
+            ttl = min((self.ttl_por_tabla.get(t, self.ttl_default) for t in tablas),
+                      default=self.ttl_default)
+        with self._lock:
+            if tuple(self._generacion.get(t, 0) for t in tablas) != generaciones:
+                return
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (valor, time.monotonic() + ttl, tablas)
+            for tabla in tablas:
+                self._por_tabla.setdefault(tabla, set()).add(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._quitar(next(iter(self._entradas)))
+                self._stats['desalojadas'] += 1
+
+    def invalidar(self, *tablas: str):
+        """Borrar los resultados que dependen de alguna de las tablas"""
+        with self._lock:
+            for tabla in tablas:
+                self._generacion[tabla] = self._generacion.get(tabla, 0) + 1
+                for clave in list(self._por_tabla.get(tabla, ())):
+                    self._quitar(clave)
+                    self._stats['invalidadas'] += 1
+
+    def limpiar(self):
+        """Vaciar la cache completa"""
+        with self._lock:
+            for tabla in list(self._por_tabla):
+                self._generacion[tabla] = self._generacion.get(tabla, 0) + 1
+            self._entradas.clear()
+            self._por_tabla.clear()
+
+    def _quitar(self, clave):
+        """Quitar una entrada y sus referencias por tabla (requiere el lock)"""
+        _, _, tablas = self._entradas.pop(clave)
+        for tabla in tablas:
+            claves = self._por_tabla.get(tabla)
+            if claves is not None:
+                claves.discard(clave)
+
+    def stats(self) -> dict:
+        """Aciertos, fallos y tamaño de la cache"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entradas'] = len(self._entradas)
+        consultas = stats['aciertos'] + stats['fallos']
+        stats['tasa_aciertos'] = stats['aciertos'] / consultas if consultas else 0.0
+        return stats
+
+
+def _clave_hashable(valor):
+    """Convertir listas/dicts de los argumentos a tuplas para usarlos como clave"""
+    if isinstance(valor, (list, tuple, set)):
+        return tuple(_clave_hashable(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _clave_hashable(v)) for k, v in valor.items()))
+    return valor
+
+
+def cacheado(*tablas: str, ttl: int = None):
+    """Decorador para métodos de lectura de DatabaseManager: cachea por método y argumentos"""
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(self, *args, **kwargs):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+            clave = (func.__name__, _clave_hashable(args), _clave_hashable(kwargs))
+            encontrado, valor = cache.get(clave)
+            if encontrado:
+                return valor
+            generaciones = cache.generaciones(tablas)
+            valor = func(self, *args, **kwargs)
+            cache.set(clave, valor, tablas, generaciones, ttl)
+            return valor
+        envoltura.tablas = tablas  # tablas de las que depende el resultado
+        return envoltura
+    return decorador
+
+
+def invalida(*tablas: str):
+    """Decorador para métodos de escritura: invalida las tablas que modifican"""
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                cache = getattr(self, 'cache', None)
+                if cache is not None:
+                    cache.invalidar(*tablas)
+        return envoltura
+    return decorador
@@ -0,0 +1,179 @@
+import logging
+import logging.handlers
+import re
+import threading
+import weakref
+
+# Sentencias que se registran por recarga (los totales se cuentan siempre)
+MAX_SENTENCIAS_POR_RERUN = 500
+
+# rowcount de pymysql con un cursor sin búfer (SSCursor)
+FILAS_DESCONOCIDAS = 2 ** 64 - 1
+
+
+class ResultadoSinBuferAbiertoError(Exception):
+    """Se intentó ejecutar otra sentencia en una conexión con un resultado sin búfer a medio leer"""
+
+
+def forma_parametros(params) -> str:
+    """Describir los parámetros sin exponer sus valores: 'tuple[3]', 'list[1000]', '-'"""
+    if params is None:
+        return '-'
+    if isinstance(params, (list, tuple)):
+        return f"{type(params).__name__}[{len(params)}]"
+    if isinstance(params, dict):
+        return f"dict[{len(params)}]"
+    return type(params).__name__
+
+
+def normalizar_sql(query: str, max_largo: int = 300) -> str:
+    """SQL en una sola línea y recortado"""
+    sql = re.sub(r'\s+', ' ', query).strip()
+    return sql if len(sql) <= max_largo else sql[:max_largo] + '…'
+
+
+class QueryLog:
+    """Instrumentación de las sentencias ejecutadas por DatabaseManager.
+    
+    Cada `execute` se registra con su SQL, la forma de sus parámetros, las
+    filas devueltas o afectadas y la latencia. Los registros se acumulan por
+    hilo, de modo que cada recarga (rerun) de Streamlit ve sólo los suyos.
+    Las sentencias que tardan más de `umbral_lento_ms` van a un log rotativo
+    junto con su EXPLAIN.
+    
+    También vigila los cursores sin búfer (`sin_bufer = True`): mientras uno
+    tenga su resultado abierto, cualquier otra sentencia en la misma conexión
+    se rechaza con ResultadoSinBuferAbiertoError, porque pymysql descartaría
+    en silencio las filas pendientes.
+    """
+    
+    def __init__(self, umbral_lento_ms: int = 500, archivo_lento: str = 'slow_queries.log',
+                 max_bytes: int = 1_000_000, respaldos: int = 5, prefijo_explain: str = 'EXPLAIN '):
+        self.umbral_lento_ms = umbral_lento_ms
+        self.prefijo_explain = prefijo_explain
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._totales = {'sentencias': 0, 'segundos': 0.0, 'filas': 0, 'lentas': 0}
+        self._sin_bufer = {}  # id(conexión) -> weakref del cursor sin búfer con resultado abierto
+        
+        self.logger = logging.getLogger('academiapp.consultas_lentas')
+        if archivo_lento and not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                archivo_lento, maxBytes=max_bytes, backupCount=respaldos, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+    
+    # ------------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------------
+    
+    def iniciar_rerun(self):
+        """Reiniciar los registros del hilo actual"""
+        self._local.sentencias = []
+        self._local.totales = {'sentencias': 0, 'segundos': 0.0, 'filas': 0, 'lentas': 0}
+    
+    def verificar(self, cursor):
+        """Rechazar la sentencia si otro cursor sin búfer de la conexión no ha terminado (antes de ejecutar)"""
+        with self._lock:
+            ref = self._sin_bufer.get(id(cursor.connection))
+            abierto = ref() if ref is not None else None
+            if abierto is None:
+                self._sin_bufer.pop(id(cursor.connection), None)
+                return
+        if abierto is not cursor:
+            raise ResultadoSinBuferAbiertoError(
+                "La conexión tiene un resultado sin búfer a medio leer; "
+                "termine de leerlo o cierre su cursor antes de ejecutar otra sentencia")
+    
+    def liberar(self, cursor):
+        """El cursor sin búfer cerró su resultado: la conexión vuelve a aceptar sentencias"""
+        with self._lock:
+            ref = self._sin_bufer.get(id(cursor.connection))
+            if ref is not None and ref() in (cursor, None):
+                del self._sin_bufer[id(cursor.connection)]
+    
+    def registrar(self, cursor, query: str, params, segundos: float):
+        """Registrar una sentencia ejecutada (se llama desde el cursor)"""
+        if getattr(self._local, 'explicando', False):
+            return
+        
+        sin_bufer = getattr(cursor, 'sin_bufer', False)
+        if sin_bufer and cursor.description is not None:
+            with self._lock:
+                self._sin_bufer[id(cursor.connection)] = weakref.ref(cursor)
+        
+        # Los cursores sin búfer no conocen el total al ejecutar (pymysql informa 2**64 - 1)
+        filas = cursor.rowcount if cursor.rowcount is not None and 0 <= cursor.rowcount < FILAS_DESCONOCIDAS else 0
+        ms = segundos * 1000
+        lenta = ms >= self.umbral_lento_ms
+        
+        with self._lock:
+            self._totales['sentencias'] += 1
+            self._totales['segundos'] += segundos
+            self._totales['filas'] += filas
+            self._totales['lentas'] += lenta
+        
+        totales = getattr(self._local, 'totales', None)
+        if totales is not None:
+            totales['sentencias'] += 1
+            totales['segundos'] += segundos
+            totales['filas'] += filas
+            totales['lentas'] += lenta
+            if len(self._local.sentencias) < MAX_SENTENCIAS_POR_RERUN:
+                self._local.sentencias.append({
+                    'sql': normalizar_sql(query),
+                    'params': forma_parametros(params),
+                    'filas': filas,
+                    'ms': round(ms, 2),
+                })
+        
+        if lenta:
+            self._registrar_lenta(cursor, query, params, ms, filas, sin_bufer)
+    
+    def _registrar_lenta(self, cursor, query: str, params, ms: float, filas: int, sin_bufer: bool = False):
+        """Escribir una sentencia lenta y su plan en el log rotativo"""
+        plan = ''
+        if sin_bufer:
+            # Un EXPLAIN en la misma conexión descartaría las filas que aún no se leen
+            plan = "    (EXPLAIN omitido: cursor sin búfer)"
+        elif query.lstrip()[:6].upper() == 'SELECT':
+            self._local.explicando = True
+            try:
+                explain = cursor.connection.cursor()
+                try:
+                    if params is None:
+                        explain.execute(self.prefijo_explain + query)
+                    else:
+                        explain.execute(self.prefijo_explain + query, params)
+                    columnas = [d[0] for d in explain.description]
+                    plan = '\n'.join(
+                        '    ' + ', '.join(f"{c}={v}" for c, v in zip(columnas, fila))
+                        for fila in explain.fetchall())
+                finally:
+                    explain.close()
+            except Exception as e:
+                plan = f"    (EXPLAIN falló: {e})"
+            finally:
+                self._local.explicando = False
+        
+        self.logger.info(f"{ms:.1f} ms | {filas} filas | params {forma_parametros(params)} | "
+                         f"{normalizar_sql(query, 2000)}" + (f"\n{plan}" if plan else ''))
+    
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    
+    def rerun_stats(self) -> dict:
+        """Totales y sentencias de la recarga actual del hilo"""
+        totales = dict(getattr(self._local, 'totales', None) or
+                       {'sentencias': 0, 'segundos': 0.0, 'filas': 0, 'lentas': 0})
+        totales['detalle'] = list(getattr(self._local, 'sentencias', None) or [])
+        return totales
+    
+    def stats(self) -> dict:
+        """Totales acumulados del proceso"""
+        with self._lock:
+            return dict(self._totales)
+
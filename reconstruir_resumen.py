@@ -0,0 +1,17 @@
+from database import DatabaseManager
+
+print("🔧 Reconstruyendo resumen_mensual desde pagos y gastos...")
+
+try:
+    db = DatabaseManager()
+    
+    if db.reconstruir_resumen_mensual():
+        with db.get_cursor() as cursor:
+            cursor.execute('SELECT COUNT(*), MIN(mes), MAX(mes) FROM resumen_mensual')
+            filas, desde, hasta = cursor.fetchone()
+        print(f"✅ Resumen reconstruido: {filas} filas ({desde} a {hasta})")
+    else:
+        print("❌ No se pudo reconstruir el resumen")
+
+except Exception as e:
+    print(f"\n❌ Error: {e}")
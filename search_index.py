@@ -0,0 +1,248 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Segundos que dura el índice antes de reconstruirse (cubre escrituras de otros procesos)
+MAX_EDAD_INDICE = 600
+
+# En la búsqueda aproximada, fracción de los gramas de la consulta que debe compartir un alumno
+MIN_COINCIDENCIA_APROXIMADA = 0.5
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto) -> str:
+    """'  José  MUÑOZ-Peña ' -> 'jose munoz pena' (sin acentos, minúsculas, sólo letras y dígitos)"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').casefold())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+def gramas_palabra(palabra: str) -> Set[str]:
+    """Prefijos de 1 y 2 letras (marcados con '^') y trigramas de una palabra normalizada"""
+    gramas = {'^' + palabra[:1], '^' + palabra[:2]}
+    gramas.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return gramas
+
+
+def gramas_termino(termino: str) -> Set[str]:
+    """Gramas que debe tener un alumno para contener el término
+
+    Un término de 1 o 2 letras se busca como inicio de palabra; uno más largo,
+    en cualquier parte de una palabra (todos sus trigramas).
+    """
+    if len(termino) < 3:
+        return {'^' + termino}
+    return {termino[i:i + 3] for i in range(len(termino) - 2)}
+
+
+class SearchIndex:
+    """Índice invertido en memoria de alumnos por nombre y matrícula.
+
+    Cada alumno se indexa por los trigramas y los prefijos de 1-2 letras de las
+    palabras de su nombre y de su matrícula, sin acentos ni mayúsculas (José y
+    jose son lo mismo). Una búsqueda intersecta las listas de los gramas de la
+    consulta empezando por la más corta, así que sólo toca a los candidatos.
+
+    El índice se construye con una sola lectura de la tabla la primera vez que
+    se usa (o cuando pasan `max_edad` segundos) y después se mantiene con
+    `agregar` y `quitar` desde las escrituras de DatabaseManager.
+    """
+
+    def __init__(self, max_edad: int = MAX_EDAD_INDICE):
+        self.max_edad = max_edad
+
+        self._lock = threading.Lock()
+        self._construido_en = None  # time.monotonic() de la última construcción
+        self._alumnos = {}  # id -> (nombre normalizado, palabras, matrícula, diplomado, (num. gramas, nombre))
+        self._gramas = defaultdict(set)  # grama -> ids
+        self._exactos = defaultdict(set)  # nombre normalizado o matrícula -> ids
+        self._stats = {'construcciones': 0, 'busquedas': 0, 'aproximadas': 0}
+
+    @property
+    def listo(self) -> bool:
+        """True si el índice está construido y no ha caducado"""
+        return (self._construido_en is not None
+                and time.monotonic() - self._construido_en < self.max_edad)
+
+    def asegurar(self, cargar: Callable[[], Iterable[Tuple]]):
+        """Construir el índice si hace falta; `cargar` devuelve (id, nombre, matrícula, diplomado_clave)"""
+        if self.listo:
+            return
+        with self._lock:
+            if self.listo:
+                return
+            # La lectura ocurre con el lock tomado: una escritura concurrente espera y no se pierde
+            self._alumnos = {}
+            self._gramas = defaultdict(set)
+            self._exactos = defaultdict(set)
+            for alumno_id, nombre, matricula, diplomado_clave in cargar():
+                self._agregar(alumno_id, nombre, matricula, diplomado_clave)
+            self._construido_en = time.monotonic()
+            self._stats['construcciones'] += 1
+
+    def invalidar(self):
+        """Descartar el índice; se reconstruye en la siguiente búsqueda"""
+        with self._lock:
+            self._construido_en = None
+            self._alumnos = {}
+            self._gramas = defaultdict(set)
+            self._exactos = defaultdict(set)
+
+    def agregar(self, alumno_id: int, nombre: str, matricula: str, diplomado_clave: str = None):
+        """Indexar un alumno nuevo o reemplazar los datos de uno existente"""
+        with self._lock:
+            if self._construido_en is None:
+                return  # Aún no se construye: la construcción lo leerá de la base
+            self._quitar(alumno_id)
+            self._agregar(alumno_id, nombre, matricula, diplomado_clave)
+
+    def quitar(self, alumno_id: int):
+        """Sacar a un alumno del índice"""
+        with self._lock:
+            self._quitar(alumno_id)
+
+    def _agregar(self, alumno_id: int, nombre: str, matricula: str, diplomado_clave: str):
+        """Agregar al alumno a las listas de sus gramas (requiere el lock)"""
+        nombre = normalizar(nombre)
+        matricula = str(matricula or '')
+        palabras = tuple(f'{nombre} {normalizar(matricula)}'.split())
+        gramas = set()
+        for palabra in palabras:
+            gramas |= gramas_palabra(palabra)
+        for grama in gramas:
+            self._gramas[grama].add(alumno_id)
+        self._exactos[nombre].add(alumno_id)
+        self._exactos[matricula].add(alumno_id)
+        self._alumnos[alumno_id] = (nombre, palabras, matricula, diplomado_clave, (len(gramas), nombre))
+
+    def _quitar(self, alumno_id: int):
+        """Quitar al alumno de las listas de sus gramas (requiere el lock)"""
+        datos = self._alumnos.pop(alumno_id, None)
+        if datos is None:
+            return
+        for palabra in datos[1]:
+            for grama in gramas_palabra(palabra):
+                self._descartar(self._gramas, grama, alumno_id)
+        self._descartar(self._exactos, datos[0], alumno_id)
+        self._descartar(self._exactos, datos[2], alumno_id)
+
+    @staticmethod
+    def _descartar(indice: dict, llave: str, alumno_id: int):
+        """Quitar un id de la lista de una llave y borrar la llave si queda vacía"""
+        ids = indice.get(llave)
+        if ids is not None:
+            ids.discard(alumno_id)
+            if not ids:
+                del indice[llave]
+
+    def buscar(self, consulta: str, diplomado_clave: str = None, limite: Optional[int] = None) -> List[int]:
+        """Ids de los alumnos que contienen todos los términos de la consulta, del más al menos parecido
+
+        Orden: primero la matrícula o el nombre exactos, luego los alumnos donde cada
+        término es inicio de palabra y al final los que lo contienen a media palabra;
+        los empates se ordenan por similitud de gramas (coeficiente de Dice) y nombre.
+        Si ningún alumno contiene todos los términos (p. ej. un error de dedo en un
+        nombre), se devuelven los que comparten al menos la mitad de los gramas.
+        """
+        texto = normalizar(consulta)
+        terminos = texto.split()
+        if not terminos:
+            return []
+
+        with self._lock:
+            self._stats['busquedas'] += 1
+            alumnos = self._alumnos
+            candidatos = self._candidatos(terminos)
+            if diplomado_clave is not None:
+                candidatos = {a for a in candidatos if alumnos[a][3] == diplomado_clave}
+
+            if not candidatos:
+                self._stats['aproximadas'] += 1
+                return self._aproximados(terminos, diplomado_clave, limite)
+
+            exactos = candidatos & (self._exactos.get(texto, set()) | self._exactos.get(texto.replace(' ', ''), set()))
+            candidatos -= exactos
+
+            # Todos los gramas de la consulta están en cada candidato, así que Dice = 2|Q| / (|Q| + |A|):
+            # a igual nivel gana el alumno con menos gramas (la llave precalculada en el índice)
+            largos = [t for t in terminos if len(t) >= 3]
+            if largos:
+                def orden(alumno_id):
+                    _, palabras, _, _, llave = alumnos[alumno_id]
+                    a_media_palabra = not all(any(p.startswith(t) for p in palabras) for t in largos)
+                    return a_media_palabra, llave
+            else:
+                # Los términos de 1-2 letras ya se buscaron como inicio de palabra
+                def orden(alumno_id):
+                    return alumnos[alumno_id][4]
+
+            primeros = sorted(exactos, key=lambda a: alumnos[a][4])
+            if limite is None:
+                return primeros + sorted(candidatos, key=orden)
+            return (primeros + heapq.nsmallest(limite, candidatos, key=orden))[:limite]
+
+    def _candidatos(self, terminos: List[str]) -> Set[int]:
+        """Alumnos que contienen todos los términos (requiere el lock)"""
+        # Empezar por el término con el grama más raro: el resto se intersecta con un conjunto chico
+        por_termino = sorted(((t, sorted((self._gramas.get(g, ()) for g in gramas_termino(t)), key=len))
+                              for t in terminos), key=lambda x: len(x[1][0]))
+        resultado = None
+        for termino, listas in por_termino:
+            if resultado is not None:
+                listas.insert(0, resultado)
+            ids = set(listas[0])
+            for lista in listas[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(lista)
+            if len(termino) > 3:
+                # Los trigramas pueden venir de palabras distintas: confirmar la subcadena
+                ids = {a for a in ids if any(termino in p for p in self._alumnos[a][1])}
+            if not ids:
+                return set()
+            resultado = ids
+        return resultado
+
+    def _aproximados(self, terminos: List[str], diplomado_clave: str, limite: Optional[int]) -> List[int]:
+        """Alumnos que comparten al menos la mitad de los gramas de la consulta (requiere el lock)
+
+        Sólo se usan los términos con letras: una matrícula con un dígito distinto es
+        otra matrícula, no un error de dedo.
+        """
+        gramas_consulta = set()
+        for termino in terminos:
+            if not termino.isdigit():
+                gramas_consulta |= gramas_termino(termino)
+        if not gramas_consulta:
+            return []
+
+        compartidos: Dict[int, int] = defaultdict(int)
+        for grama in gramas_consulta:
+            for alumno_id in self._gramas.get(grama, ()):
+                compartidos[alumno_id] += 1
+
+        minimo = max(1, MIN_COINCIDENCIA_APROXIMADA * len(gramas_consulta))
+        candidatos = [a for a, n in compartidos.items()
+                      if n >= minimo and (diplomado_clave is None or self._alumnos[a][3] == diplomado_clave)]
+
+        def orden(alumno_id):
+            num_gramas, nombre = self._alumnos[alumno_id][4]
+            return -2 * compartidos[alumno_id] / (len(gramas_consulta) + num_gramas), nombre
+
+        if limite is None:
+            return sorted(candidatos, key=orden)
+        return heapq.nsmallest(limite, candidatos, key=orden)
+
+    def stats(self) -> dict:
+        """Alumnos indexados, gramas distintos y número de búsquedas"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['alumnos'] = len(self._alumnos)
+            stats['gramas'] = len(self._gramas)
+        return stats
+
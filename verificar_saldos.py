@@ -0,0 +1,31 @@
+import sys
+
+from database import DatabaseManager
+
+# Uso: python verificar_saldos.py [--corregir]
+corregir = '--corregir' in sys.argv[1:]
+
+print("🔍 Verificando saldos de alumnos contra pagos...")
+
+try:
+    db = DatabaseManager()
+    
+    desviados = db.verificar_saldos()
+    if not desviados:
+        print("✅ Todos los saldos coinciden con los pagos")
+    else:
+        print(f"⚠️  {len(desviados)} alumno(s) con saldo desviado (máx. 100 mostrados):")
+        for id, matricula, pagado, pagado_real, mens, mens_real, saldo, saldo_real in desviados:
+            print(f"   {matricula} (id {id}): pagado {pagado} vs {pagado_real}, "
+                  f"mensualidades {mens} vs {mens_real}, saldo {saldo} vs {saldo_real}")
+        
+        if corregir:
+            if db.reconciliar_saldos() and not db.verificar_saldos():
+                print("✅ Saldos recalculados desde pagos")
+            else:
+                print("❌ No se pudieron corregir los saldos")
+        else:
+            print("   Ejecuta con --corregir para recalcularlos desde pagos")
+
+except Exception as e:
+    print(f"\n❌ Error: {e}")